@@ -1,2 +1,4 @@
 from ._table_to_ooxml_workbook import table_to_ooxml_workbook
-from ._table_to_csv import table_to_csv
\ No newline at end of file
+from ._table_to_csv import table_to_csv
+from ._export_workspace import export_workspace
+from ._table_to_columnar import table_to_arrow_ipc, table_to_parquet
@@ -0,0 +1,243 @@
+# coding=utf-8
+"""This module exports every table in a workspace, fanned out across a pool of worker processes."""
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+# Standard library imports
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import time
+
+# Third-party imports
+import arcpy
+
+# Local imports
+from ._table_to_columnar import table_to_arrow_ipc, table_to_parquet
+from ._table_to_csv import table_to_csv
+from ._table_to_ooxml_workbook import table_to_ooxml_workbook
+
+# Output file extension and export function for each format
+EXPORT_FORMATS = {
+    "csv": (".csv", table_to_csv),
+    "csv.gz": (".csv.gz", table_to_csv),
+    "xlsx": (".xlsx", table_to_ooxml_workbook),
+    "parquet": (".parquet", table_to_parquet),
+    "arrow": (".arrow", table_to_arrow_ipc)
+}
+
+MANIFEST_FILE_NAME = "manifest.json"
+
+
+def export_workspace(workspace, output_dir, output_format="csv", workers=None, force=False, **kwargs):
+    """Exports every table and feature class in a workspace to files in an output directory, in parallel.
+
+    Each table is written to a file named after the table, with the extension of the output format ('csv', 'csv.gz', 'xlsx',
+    'parquet' or 'arrow').  Any other keyword arguments are passed on to the export function for the format (e.g.
+    table_to_csv).
+
+    A manifest of the export is written to 'manifest.json' in the output directory.  On the next export with the same
+    format and export options (the other keyword arguments), a table is skipped if its signature (its fields, row count
+    and, when editor tracking is enabled, latest edit date) matches the manifest and its output file still exists,
+    unless force is True.  Edits to a table without editor tracking that don't change its row count are therefore only
+    picked up with force.  Changing the format or any export option (e.g. the where_clause) exports every table again.
+
+    A table that fails to export doesn't stop the others, the failure is recorded in the manifest instead.  The
+    manifest is returned, with an entry for each table:
+
+    .. code-block:: python
+
+        {
+            "workspace": "path/to/database.gdb",
+            "format": "csv",
+            "options": "...",       # a signature of the export options
+            "tables": {
+                "Countries": {
+                    "table": "path/to/database.gdb/Countries",
+                    "outputFile": "path/to/output/Countries.csv",
+                    "status": "exported",   # or "skipped" or "failed"
+                    "signature": "...",
+                    "rows": 250,
+                    "bytes": 12345,
+                    "duration": 1.23,       # seconds taken to export (or check) the table
+                    "error": None
+                }
+            }
+        }
+
+    Worker processes are started with the multiprocessing module, so on Windows the calling script must be guarded
+    with an ``if __name__ == "__main__":`` block.
+
+    :param workspace: Path to the workspace (e.g. a file geodatabase or .sde connection file)
+    :type workspace: str
+    :param output_dir: Directory to write the exported files and manifest to, created if it doesn't exist
+    :type output_dir: str
+    :param output_format: One of 'csv', 'csv.gz', 'xlsx', 'parquet' or 'arrow'
+    :type output_format: str
+    :param workers: Number of worker processes to use, defaults to the number of CPUs.  With one worker (or less),
+        tables are exported one at a time in the current process.
+    :type workers: int
+    :param force: Whether to export tables that haven't changed since the last export
+    :type force: bool
+    :returns: the manifest dictionary
+    """
+    if output_format not in EXPORT_FORMATS:
+        raise ValueError("Unknown output format '{}', expected one of: {}".format(
+            output_format, ", ".join(sorted(EXPORT_FORMATS))))
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    logger = _get_logger()
+
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE_NAME)
+    options = get_options_signature(kwargs)
+    previous_tables = {} if force else _read_manifest(manifest_path, workspace, output_format, options)
+
+    extension = EXPORT_FORMATS[output_format][0]
+    tasks = []
+    for name, table in list_tables(workspace):
+        previous = previous_tables.get(name)
+        tasks.append((name, table, os.path.join(output_dir, name + extension), output_format, previous, kwargs))
+
+    manifest = {"workspace": workspace, "format": output_format, "options": options, "tables": {}}
+
+    if workers <= 1 or len(tasks) <= 1:
+        for name, record in map(_export_table_worker, tasks):
+            manifest["tables"][name] = record
+    else:
+        pool = multiprocessing.Pool(min(workers, len(tasks)))
+        try:
+            for name, record in pool.imap_unordered(_export_table_worker, tasks):
+                manifest["tables"][name] = record
+        finally:
+            pool.terminate()
+            pool.join()
+
+    _write_manifest(manifest_path, manifest)
+
+    counts = {}
+    for record in manifest["tables"].values():
+        counts[record["status"]] = counts.get(record["status"], 0) + 1
+    logger.info("Exported workspace %s to %s: %s", workspace, output_dir,
+                ", ".join("{} {}".format(v, k) for k, v in sorted(counts.items())) or "no tables")
+
+    return manifest
+
+
+def list_tables(workspace):
+    """Lists the (name, path) of every table and feature class in a workspace, including those in feature datasets."""
+    tables = []
+    for dirpath, _, filenames in arcpy.da.Walk(workspace, datatype=["Table", "FeatureClass"]):
+        for filename in filenames:
+            tables.append((filename, os.path.join(dirpath, filename)))
+    return sorted(tables)
+
+
+def get_table_signature(table):
+    """Gets a signature of a table that changes when its fields, row count or (with editor tracking) edits change."""
+    description = arcpy.Describe(table)
+    parts = [[f.name, f.type, f.length] for f in description.fields]
+    parts.append(int(arcpy.GetCount_management(table).getOutput(0)))
+
+    edit_date_field = getattr(description, "editedAtFieldName", None) \
+        if getattr(description, "editorTrackingEnabled", False) else None
+    if edit_date_field:
+        # the database sorts the edit dates, only the latest is read
+        with arcpy.da.SearchCursor(table, [edit_date_field],
+                                   where_clause="{} IS NOT NULL".format(edit_date_field),
+                                   sql_clause=(None, "ORDER BY {} DESC".format(edit_date_field))) as cursor:
+            latest = next(iter(cursor), (None, ))[0]
+        parts.append(str(latest))
+
+    return hashlib.sha1(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+def get_options_signature(options):
+    """Gets a signature of the export options (keyword arguments) passed on to an export function."""
+    # values that aren't JSON serializable (e.g. a function) are represented by their repr, which may change between
+    # runs, in which case every table is exported again
+    return hashlib.sha1(json.dumps(options, sort_keys=True, default=repr).encode("utf-8")).hexdigest()
+
+
+def _export_table_worker(task):
+    """Exports a single table, unless it matches the previous export, capturing any error and timing it."""
+    name, table, output_path, output_format, previous, kwargs = task
+
+    logger = _get_logger()
+    start_time = time.time()
+    record = {
+        "table": table,
+        "outputFile": output_path,
+        "status": None,
+        "signature": None,
+        "rows": None,
+        "bytes": None,
+        "duration": None,
+        "error": None
+    }
+
+    try:
+        record["signature"] = get_table_signature(table)
+
+        if previous and previous.get("status") != "failed" and previous.get("signature") == record["signature"] \
+                and os.path.exists(output_path):
+            record["status"] = "skipped"
+            record["rows"] = previous.get("rows")
+        else:
+            stats = EXPORT_FORMATS[output_format][1](table, output_path, **kwargs)
+            record["status"] = "exported"
+            record["rows"] = stats["rows"]
+
+        record["bytes"] = os.path.getsize(output_path)
+    except Exception as e:
+        logger.exception("An error occured exporting '%s'.", table)
+        record["status"] = "failed"
+        record["error"] = "{}: {}".format(e.__class__.__name__, e)
+
+    record["duration"] = time.time() - start_time
+    logger.debug("%s '%s' in %2.2f sec", record["status"].capitalize(), table, record["duration"])
+
+    return name, record
+
+
+def _read_manifest(manifest_path, workspace, output_format, options):
+    """Reads the tables of a previous export's manifest, if it exported the same workspace to the same format, with the
+    same export options."""
+    if not os.path.exists(manifest_path):
+        return {}
+
+    try:
+        with io.open(manifest_path, "r", encoding="utf-8") as fp:
+            manifest = json.load(fp)
+    except ValueError:
+        _get_logger().warning("Ignoring unreadable manifest '%s'.", manifest_path, exc_info=True)
+        return {}
+
+    if manifest.get("workspace") != workspace or manifest.get("format") != output_format \
+            or manifest.get("options") != options:
+        return {}
+
+    return manifest.get("tables", {})
+
+
+def _write_manifest(manifest_path, manifest):
+    with io.open(manifest_path, "w", encoding="utf-8") as fp:
+        fp.write(json.dumps(manifest, indent=2, sort_keys=True))
+
+
+def _get_logger():
+    return logging.getLogger("arcpyext.conversion")
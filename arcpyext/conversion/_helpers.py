@@ -10,11 +10,28 @@ from future.standard_library import install_aliases
 install_aliases()
 # pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
 
+# Third-party imports
 import arcpy
 
-def get_textual_fields(table):
-    """Get fields of a table, filter out ones that can't be written to human-readable text."""
+# Field types that can't be written to human-readable text
+NON_TEXTUAL_FIELD_TYPES = ("Blob", "Geometry")
+
+
+def get_fields(table, field_names=None):
+    """Get fields of a table, optionally limited to the given field names (ignoring case), in table order."""
     all_fields = arcpy.ListFields(table)
-    shape_field_names = [f.name for f in arcpy.ListFields(table, field_type = "Geometry")]
-    blob_field_names = [f.name for f in arcpy.ListFields(table, field_type = "BLOB")]
-    return [f for f in all_fields if f.name not in shape_field_names and f.name not in blob_field_names]
\ No newline at end of file
+
+    if field_names is None:
+        return all_fields
+
+    lower_field_names = set(n.lower() for n in field_names)
+    missing_field_names = lower_field_names - set(f.name.lower() for f in all_fields)
+    if missing_field_names:
+        raise ValueError("Fields not found in table: {}".format(", ".join(sorted(missing_field_names))))
+
+    return [f for f in all_fields if f.name.lower() in lower_field_names]
+
+
+def get_textual_fields(table, field_names=None):
+    """Get fields of a table, filter out ones that can't be written to human-readable text."""
+    return [f for f in get_fields(table, field_names) if f.type not in NON_TEXTUAL_FIELD_TYPES]
@@ -0,0 +1,161 @@
+# coding=utf-8
+"""This module converts tables to columnar formats (Apache Parquet and the Arrow IPC file format)."""
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+# Standard library imports
+import logging
+import time
+
+# Third-party imports
+import arcpy
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Local imports
+from ._helpers import get_fields, get_textual_fields
+from .._utils import iter_chunks
+
+# Number of rows in each Parquet row group / Arrow record batch
+DEFAULT_ROW_GROUP_SIZE = 100000
+
+# Arrow type of each arcpy field type, field types not listed are written as strings
+_ARROW_TYPES = {
+    "OID": lambda: pyarrow.int64(),
+    "SmallInteger": lambda: pyarrow.int16(),
+    "Integer": lambda: pyarrow.int32(),
+    "BigInteger": lambda: pyarrow.int64(),
+    "Single": lambda: pyarrow.float32(),
+    "Double": lambda: pyarrow.float64(),
+    "Date": lambda: pyarrow.timestamp("us"),
+    "DateOnly": lambda: pyarrow.date32(),
+    "TimeOnly": lambda: pyarrow.time64("us")
+}
+
+
+def table_to_parquet(table,
+                     output_file_path,
+                     use_field_alias_as_column_header=False,
+                     where_clause=None,
+                     field_names=None,
+                     include_geometry=False,
+                     row_group_size=DEFAULT_ROW_GROUP_SIZE,
+                     compression="snappy"):
+    """Writes the textual fields of a table to an Apache Parquet file, returning statistics about the export.
+
+    Each column is typed from its field type.  Rows are read from the table in chunks of row_group_size rows, each
+    written as one row group.  With include_geometry, the table's geometry is written as a binary column of WKB.
+    Rows can be filtered with a where_clause, and fields limited to a list of field_names.  Requires pyarrow.
+
+    The statistics are returned as a dictionary with the keys 'rows', 'duration' (in seconds) and 'rowsPerSecond'.
+    """
+    _check_pyarrow()
+
+    def open_writer(schema):
+        return pyarrow.parquet.ParquetWriter(output_file_path, schema, compression=compression)
+
+    def write(writer, batch):
+        writer.write_table(pyarrow.Table.from_batches([batch]), row_group_size=row_group_size)
+
+    return _write_columnar(table, output_file_path, open_writer, write, use_field_alias_as_column_header, where_clause,
+                           field_names, include_geometry, row_group_size)
+
+
+def table_to_arrow_ipc(table,
+                       output_file_path,
+                       use_field_alias_as_column_header=False,
+                       where_clause=None,
+                       field_names=None,
+                       include_geometry=False,
+                       row_group_size=DEFAULT_ROW_GROUP_SIZE):
+    """Writes the textual fields of a table to an Arrow IPC (Feather v2) file, returning statistics about the export.
+
+    Works as table_to_parquet, with each chunk of row_group_size rows written as one record batch.  Requires pyarrow.
+    """
+    _check_pyarrow()
+
+    def open_writer(schema):
+        return pyarrow.ipc.new_file(output_file_path, schema)
+
+    def write(writer, batch):
+        writer.write_batch(batch)
+
+    return _write_columnar(table, output_file_path, open_writer, write, use_field_alias_as_column_header, where_clause,
+                           field_names, include_geometry, row_group_size)
+
+
+def _write_columnar(table, output_file_path, open_writer, write, use_field_alias_as_column_header, where_clause,
+                    field_names, include_geometry, chunk_size):
+    """Reads a table in chunks, writing each chunk to a columnar file as a record batch."""
+    logger = _get_logger()
+    start_time = time.time()
+
+    fields = get_textual_fields(table, field_names)
+
+    header_attr = "name" if use_field_alias_as_column_header == False else "aliasName"
+    schema_fields = [pyarrow.field(getattr(f, header_attr), _ARROW_TYPES.get(f.type, pyarrow.string)()) for f in fields]
+    cursor_fields = [f.name for f in fields]
+
+    if include_geometry:
+        geometry_field = next((f for f in get_fields(table) if f.type == "Geometry"), None)
+        if geometry_field is None:
+            raise ValueError("Table has no geometry field: {}".format(table))
+        schema_fields.append(pyarrow.field(getattr(geometry_field, header_attr), pyarrow.binary()))
+        cursor_fields.append("SHAPE@WKB")
+
+    schema = pyarrow.schema(schema_fields)
+    row_count = 0
+
+    writer = open_writer(schema)
+    try:
+        with arcpy.da.SearchCursor(table, cursor_fields, where_clause=where_clause) as cursor:
+            for chunk in iter_chunks(cursor, chunk_size):
+                write(writer, _to_record_batch(chunk, schema))
+                row_count += len(chunk)
+                logger.debug("%s rows written to %s", row_count, output_file_path)
+
+        # an empty table still gets its schema written
+        if row_count == 0:
+            write(writer, _to_record_batch([], schema))
+    finally:
+        writer.close()
+
+    duration = time.time() - start_time
+    rows_per_second = row_count / duration if duration > 0 else None
+    logger.info("%s rows written to %s in %.2fs (%s rows/sec)", row_count, output_file_path, duration,
+                "{:.0f}".format(rows_per_second) if rows_per_second is not None else "-")
+
+    return {"rows": row_count, "duration": duration, "rowsPerSecond": rows_per_second}
+
+
+def _to_record_batch(rows, schema):
+    """Transposes a list of rows into typed column arrays."""
+    columns = list(zip(*rows)) if rows else [[] for _ in schema]
+    arrays = []
+    for column, field in zip(columns, schema):
+        if field.type == pyarrow.binary():
+            # WKB is returned as a bytearray
+            column = [bytes(v) if v is not None else None for v in column]
+        arrays.append(pyarrow.array(column, type=field.type))
+    return pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _check_pyarrow():
+    if pyarrow is None:
+        raise ImportError("pyarrow is required to write Parquet and Arrow IPC files.")
+
+
+def _get_logger():
+    return logging.getLogger("arcpyext.conversion")
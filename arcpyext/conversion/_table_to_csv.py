@@ -8,34 +8,92 @@ from future.builtins.disabled import *
 from future.builtins import *
 from future.standard_library import install_aliases
 install_aliases()
+from future.utils import PY2
 # pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
 
+# Standard library imports
 import csv
+import gzip
+import logging
+import time
 
+# Third-party imports
 import arcpy
 
+# Local imports
 from ._helpers import get_textual_fields
+from .._utils import iter_chunks
 
-def table_to_csv(table, output_file_path, use_field_alias_as_column_header = False):
-    fields = get_textual_fields(table)
+# Number of rows read from the cursor and written at a time
+DEFAULT_CHUNK_SIZE = 10000
+
+# Size of the output file buffer, in bytes
+BUFFER_SIZE = 1024 * 1024
+
+
+def table_to_csv(table,
+                 output_file_path,
+                 use_field_alias_as_column_header=False,
+                 where_clause=None,
+                 field_names=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE):
+    """Writes the textual fields of a table to a CSV file, returning statistics about the export.
+
+    Rows are read from the table and written to the file in chunks of chunk_size rows.  If the output file path ends
+    with '.gz', the file is gzip compressed.  Rows can be filtered with a where_clause, and fields limited to a list of
+    field_names.
+
+    The statistics are returned as a dictionary with the keys 'rows', 'duration' (in seconds) and 'rowsPerSecond'.
+    """
+    logger = _get_logger()
+    start_time = time.time()
+
+    fields = get_textual_fields(table, field_names)
 
     header_attr = "name" if use_field_alias_as_column_header == False else "aliasName"
     headers = [getattr(f, header_attr) for f in fields]
 
+    row_count = 0
+
     # setup csv, write column headings
     with open_output_file(output_file_path) as csvfile:
         csvwriter = csv.writer(csvfile, dialect="excel")
-        csvwriter.writerow(str(headers))
+        csvwriter.writerow(_encode_csv_row(headers))
 
         # write data
-        with arcpy.da.SearchCursor(table, [f.name for f in fields]) as cursor:
-            for row in cursor:
-                csvwriter.writerow(row)
+        with arcpy.da.SearchCursor(table, [f.name for f in fields], where_clause=where_clause) as cursor:
+            for chunk in iter_chunks(cursor, chunk_size):
+                csvwriter.writerows([_encode_csv_row(row) for row in chunk] if PY2 else chunk)
+                row_count += len(chunk)
+                logger.debug("%s rows written to %s", row_count, output_file_path)
+
+    duration = time.time() - start_time
+    rows_per_second = row_count / duration if duration > 0 else None
+    logger.info("%s rows written to %s in %.2fs (%s rows/sec)", row_count, output_file_path, duration,
+                "{:.0f}".format(rows_per_second) if rows_per_second is not None else "-")
+
+    return {"rows": row_count, "duration": duration, "rowsPerSecond": rows_per_second}
+
 
 def open_output_file(output_file_path):
+    """Opens a CSV file for writing, gzip compressed if the path ends with '.gz'."""
+    is_gzip = output_file_path.lower().endswith(".gz")
+
     # Required for py2 -> py3
-    try:
-        if unicode:
-            return open(output_file_path, "wb")
-    except NameError:
-        return open(output_file_path, "w", encoding='utf8')
+    if PY2:
+        return gzip.open(output_file_path, "wb") if is_gzip else open(output_file_path, "wb", buffering=BUFFER_SIZE)
+
+    if is_gzip:
+        return gzip.open(output_file_path, "wt", encoding="utf8", newline="")
+    return open(output_file_path, "w", encoding="utf8", newline="", buffering=BUFFER_SIZE)
+
+
+def _encode_csv_row(row):
+    """Encodes the text values of a row for the Python 2 csv module, which only writes bytes."""
+    if not PY2:
+        return row
+    return [v.encode("utf8") if isinstance(v, str) else v for v in row]
+
+
+def _get_logger():
+    return logging.getLogger("arcpyext.conversion")
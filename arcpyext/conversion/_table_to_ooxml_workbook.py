@@ -10,6 +10,10 @@ from future.standard_library import install_aliases
 install_aliases()
 # pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
 
+# Standard library imports
+import logging
+import time
+
 # Third-party imports
 import arcpy
 import xlsxwriter
@@ -17,24 +21,95 @@ import xlsxwriter
 # Local imports
 from ._helpers import get_textual_fields
 
-def table_to_ooxml_workbook(table, output_file_path, use_field_alias_as_column_header = False):
+# Maximum number of rows in an Excel worksheet, including the header row
+MAX_ROWS_PER_SHEET = 1048576
+
+
+def table_to_ooxml_workbook(table,
+                            output_file_path,
+                            use_field_alias_as_column_header=False,
+                            constant_memory=False,
+                            max_rows_per_sheet=MAX_ROWS_PER_SHEET):
+    """Writes the textual fields of a table to an Excel workbook, returning statistics about the export.
+
+    Rows that don't fit on a worksheet (max_rows_per_sheet rows, including the header row) roll over onto a new
+    worksheet, each laid out as its own table.
+
+    With constant_memory, each row is flushed to disk as it is written, so memory use doesn't grow with the size of
+    the table.  xlsxwriter doesn't support tables in this mode, so each worksheet instead gets a bold header row with
+    an autofilter over its rows.
+
+    The statistics are returned as a dictionary with the keys 'rows', 'sheets', 'duration' (in seconds) and
+    'rowsPerSecond'.
+    """
+    if max_rows_per_sheet < 2 or max_rows_per_sheet > MAX_ROWS_PER_SHEET:
+        raise ValueError("max_rows_per_sheet must be between 2 and {}".format(MAX_ROWS_PER_SHEET))
+
+    logger = _get_logger()
+    start_time = time.time()
+
     fields = get_textual_fields(table)
 
-    # setup workbook, write column headings
-    workbook = xlsxwriter.Workbook(output_file_path)
-    worksheet = workbook.add_worksheet()
+    header_attr = "name" if use_field_alias_as_column_header == False else "aliasName"
+    headers = [getattr(f, header_attr) for f in fields]
+
+    # setup workbook
+    workbook = xlsxwriter.Workbook(output_file_path, {"constant_memory": constant_memory})
+    header_format = workbook.add_format({"bold": True}) if constant_memory else None
+
+    worksheet = None
+    sheet_row_no = max_rows_per_sheet
+    row_count = 0
+    sheet_count = 0
 
     # write data
     with arcpy.da.SearchCursor(table, [f.name for f in fields]) as cursor:
-        row_no = 1
         for row in cursor:
-            worksheet.write_row(row_no, 0, row)
-            row_no += 1
+            if sheet_row_no == max_rows_per_sheet:
+                if worksheet is not None:
+                    _finish_worksheet(worksheet, sheet_row_no - 1, headers, constant_memory)
+                worksheet = _start_worksheet(workbook, headers, header_format)
+                sheet_row_no = 1
+                sheet_count += 1
+
+            worksheet.write_row(sheet_row_no, 0, row)
+            sheet_row_no += 1
+            row_count += 1
+
+    # an empty table still gets a worksheet with its headers
+    if worksheet is None:
+        worksheet = _start_worksheet(workbook, headers, header_format)
+        sheet_row_no = 1
+        sheet_count += 1
+    _finish_worksheet(worksheet, sheet_row_no - 1, headers, constant_memory)
+
+    workbook.close()
+
+    duration = time.time() - start_time
+    rows_per_second = row_count / duration if duration > 0 else None
+    logger.info("%s rows written to %s (%s sheets) in %.2fs (%s rows/sec)", row_count, output_file_path, sheet_count,
+                duration, "{:.0f}".format(rows_per_second) if rows_per_second is not None else "-")
+
+    return {"rows": row_count, "sheets": sheet_count, "duration": duration, "rowsPerSecond": rows_per_second}
+
+
+def _start_worksheet(workbook, headers, header_format):
+    """Adds a worksheet, writing the header row up front when rows are flushed as they're written."""
+    worksheet = workbook.add_worksheet()
+    if header_format is not None:
+        worksheet.write_row(0, 0, headers, header_format)
+    return worksheet
+
+
+def _finish_worksheet(worksheet, last_row_no, headers, constant_memory):
+    """Lays out the rows of a worksheet (from the header row to last_row_no) as a table, or an autofilter."""
+    if constant_memory:
+        worksheet.autofilter(0, 0, last_row_no, len(headers) - 1)
+        worksheet.freeze_panes(1, 0)
+        return
+
+    worksheet.add_table(0, 0, last_row_no, len(headers) - 1, {"columns": [{"header": h} for h in headers]})
 
-    # create table layout
-    header_attr = "name" if use_field_alias_as_column_header == False else "aliasName"
-    worksheet.add_table(0, 0, row_no - 1, len(fields) - 1, {
-        "columns": [{"header": getattr(f, header_attr)} for f in fields]
-    })
 
-    workbook.close()
\ No newline at end of file
+def _get_logger():
+    return logging.getLogger("arcpyext.conversion")
@@ -1 +1,3 @@
-from ._data_management import create_rows, delete_rows, read_rows, update_rows_func
\ No newline at end of file
+from ._data_management import create_rows, delete_rows, read_rows, update_rows_func
+from ._bulk_edits import create_rows_chunked, delete_rows_by_oids, merge_rows, update_rows_func_chunked
+from ._row_readers import iter_row_chunks, iter_rows, read_array
@@ -0,0 +1,378 @@
+# coding=utf-8
+"""This module contains functions for editing large numbers of rows, in chunks of edit operations."""
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+from future.utils import string_types
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+# Standard library imports
+import itertools
+import logging
+import time
+
+# Third-party imports
+import arcpy
+
+# Local imports
+from ._data_management import _delete_rows, _edit_handler
+from .._utils import iter_chunks
+from ..exceptions import BulkEditError
+
+# Number of rows edited in each edit operation
+DEFAULT_CHUNK_SIZE = 10000
+
+# Number of object IDs in each IN (...) list, the most some databases (e.g. Oracle) allow
+DEFAULT_OID_BATCH_SIZE = 1000
+
+
+def create_rows_chunked(edit_session,
+                        in_table,
+                        rows,
+                        field_names="*",
+                        chunk_size=DEFAULT_CHUNK_SIZE,
+                        skip_rows=0,
+                        progress_callback=None):
+    """Inserts rows into a table, committing each chunk of chunk_size rows in its own edit operation.
+
+    Rows can be any iterable, including a generator, and are consumed one chunk at a time.  If a chunk fails, its edit
+    operation is aborted and a BulkEditError raised; the chunks before it stay committed.  The error's stats record the
+    number of rows committed, so the load can be resumed by passing that as skip_rows along with the same rows.
+
+    :param edit_session: The edit session (arcpy.da.Editor) to edit in, already started
+    :param in_table: The table to insert rows into
+    :type in_table: str
+    :param rows: The rows to insert
+    :type rows: iterable of list or tuple
+    :param field_names: The fields of the rows, as for arcpy.da.InsertCursor
+    :param chunk_size: Number of rows to insert in each edit operation
+    :type chunk_size: int
+    :param skip_rows: Number of rows at the start of rows to skip, i.e. rows committed by an earlier attempt
+    :type skip_rows: int
+    :param progress_callback: Called with the stats after each chunk is committed
+    :type progress_callback: callable
+    :returns: dict of stats, with the keys 'rows', 'chunks', 'duration' (in seconds) and 'rowsPerSecond'
+    """
+    progress = _Progress(in_table, progress_callback, rows=skip_rows)
+
+    for chunk in iter_chunks(itertools.islice(rows, skip_rows, None), chunk_size):
+        try:
+            _insert_chunk(edit_session, in_table, field_names, chunk)
+        except Exception as e:
+            raise BulkEditError("Inserting rows into '{}' failed after {} rows.".format(in_table, progress.rows),
+                                progress.stats(), e)
+        progress.add_chunk(len(chunk))
+
+    return progress.finish()
+
+
+def update_rows_func_chunked(edit_session,
+                             in_table,
+                             update_func,
+                             where_clause=None,
+                             field_names="*",
+                             chunk_size=DEFAULT_CHUNK_SIZE,
+                             after_oid=None,
+                             progress_callback=None):
+    """Updates rows in a table with a function, committing each chunk of chunk_size rows in its own edit operation.
+
+    Rows are updated in object ID order, each chunk with its own cursor limited to the object IDs after the previous
+    chunk, so the table must support ORDER BY (e.g. a geodatabase table).  If a chunk fails, its edit operation is
+    aborted and a BulkEditError raised; the chunks before it stay committed.  The error's stats record the last object
+    ID committed ('lastOID'), so the update can be resumed by passing that as after_oid.
+
+    :param edit_session: The edit session (arcpy.da.Editor) to edit in, already started
+    :param in_table: The table to update rows in
+    :type in_table: str
+    :param update_func: Function given each row (as a list) that returns the updated row
+    :type update_func: callable
+    :param where_clause: Limits the rows to update
+    :type where_clause: str
+    :param field_names: The fields of the rows, as for arcpy.da.UpdateCursor
+    :param chunk_size: Number of rows to update in each edit operation
+    :type chunk_size: int
+    :param after_oid: Only update rows with an object ID greater than this, i.e. those not committed by an earlier
+        attempt
+    :type after_oid: int
+    :param progress_callback: Called with the stats after each chunk is committed
+    :type progress_callback: callable
+    :returns: dict of stats, with the keys 'rows', 'chunks', 'lastOID', 'duration' (in seconds) and 'rowsPerSecond'
+    """
+    oid_field_name = arcpy.Describe(in_table).OIDFieldName
+    oid_field = arcpy.AddFieldDelimiters(in_table, oid_field_name)
+
+    # the object ID is needed to carry on from the last chunk, add it to the end of the row if it's not already there
+    if field_names == "*":
+        cursor_fields = field_names
+        oid_index = [f.name for f in arcpy.ListFields(in_table)].index(oid_field_name)
+        func = update_func
+    else:
+        cursor_fields = ([field_names] if isinstance(field_names, string_types) else list(field_names)) + ["OID@"]
+        oid_index = -1
+        func = lambda row: list(update_func(row[:-1])) + [row[-1]]
+
+    progress = _Progress(in_table, progress_callback, last_oid=after_oid, track_oid=True)
+
+    while True:
+        chunk_where_clause = where_clause
+        if progress.last_oid is not None:
+            chunk_where_clause = "{} > {}".format(oid_field, progress.last_oid)
+            if where_clause:
+                chunk_where_clause = "({}) AND {}".format(where_clause, chunk_where_clause)
+
+        try:
+            row_count, last_oid = _update_chunk(edit_session, in_table, func, chunk_where_clause, cursor_fields,
+                                                (None, "ORDER BY {}".format(oid_field)), oid_index, chunk_size)
+        except Exception as e:
+            raise BulkEditError("Updating rows in '{}' failed after {} rows.".format(in_table, progress.rows),
+                                progress.stats(), e)
+
+        if row_count == 0:
+            break
+        progress.add_chunk(row_count, last_oid)
+
+    return progress.finish()
+
+
+def delete_rows_by_oids(edit_session,
+                        in_table,
+                        oids,
+                        batch_size=DEFAULT_OID_BATCH_SIZE,
+                        progress_callback=None):
+    """Deletes rows from a table by object ID, in batches of batch_size object IDs, each in its own edit operation.
+
+    Each batch is selected with an 'IN (...)' where clause, and only the object ID is read from each row.  If a batch
+    fails, its edit operation is aborted and a BulkEditError raised; the batches before it stay committed.  As deleted
+    rows are no longer found, the delete can be resumed by passing the same object IDs again.
+
+    :param edit_session: The edit session (arcpy.da.Editor) to edit in, already started
+    :param in_table: The table to delete rows from
+    :type in_table: str
+    :param oids: The object IDs of the rows to delete
+    :type oids: iterable of int
+    :param batch_size: Number of object IDs to delete in each edit operation
+    :type batch_size: int
+    :param progress_callback: Called with the stats after each batch is committed
+    :type progress_callback: callable
+    :returns: dict of stats, with the keys 'rows' (the number of rows deleted), 'chunks', 'duration' (in seconds) and
+        'rowsPerSecond'
+    """
+    oid_field = arcpy.AddFieldDelimiters(in_table, arcpy.Describe(in_table).OIDFieldName)
+    progress = _Progress(in_table, progress_callback)
+
+    for batch in iter_chunks(oids, batch_size):
+        where_clause = "{} IN ({})".format(oid_field, ", ".join(str(int(oid)) for oid in batch))
+        try:
+            deleted_count = _delete_rows(edit_session, in_table, where_clause, ["OID@"])
+        except Exception as e:
+            raise BulkEditError("Deleting rows from '{}' failed after {} rows.".format(in_table, progress.rows),
+                                progress.stats(), e)
+        progress.add_chunk(deleted_count)
+
+    return progress.finish()
+
+
+def merge_rows(edit_session,
+               in_table,
+               rows,
+               key_fields,
+               field_names,
+               delete_missing=True,
+               chunk_size=DEFAULT_CHUNK_SIZE):
+    """Merges rows into a table by key, inserting new rows, updating changed rows and deleting missing rows.
+
+    The rows are indexed by the values of their key_fields, then the table is read once to find the rows to change.
+    A table row whose key is in the rows is updated if any of its values differ (geometries are compared with their
+    equals method, so differ only when their shapes do); a row in the rows whose key isn't in the table is inserted;
+    and, with delete_missing, a table row whose key isn't in the rows is deleted.  Inserts are committed in chunks of
+    chunk_size rows, and updates and deletes in batches of object IDs, each in its own edit operation (see
+    create_rows_chunked and delete_rows_by_oids).  A failure raises a BulkEditError, with the operations of earlier
+    chunks committed.
+
+    :param edit_session: The edit session (arcpy.da.Editor) to edit in, already started
+    :param in_table: The table to merge rows into
+    :type in_table: str
+    :param rows: The rows to merge, each with a unique key
+    :type rows: iterable of list or tuple
+    :param key_fields: The fields identifying a row, which must be in field_names
+    :type key_fields: list of str
+    :param field_names: The fields of the rows
+    :type field_names: list of str
+    :param delete_missing: Whether to delete rows from the table whose keys aren't in the rows
+    :type delete_missing: bool
+    :param chunk_size: Number of rows to insert in each edit operation
+    :type chunk_size: int
+    :returns: dict of counts of rows 'inserted', 'updated', 'deleted' and 'unchanged', and the 'duration' (in seconds)
+    """
+    start_time = time.time()
+
+    field_names = [field_names] if isinstance(field_names, string_types) else list(field_names)
+    key_fields = [key_fields] if isinstance(key_fields, string_types) else list(key_fields)
+    lower_field_names = [n.lower() for n in field_names]
+    try:
+        key_indexes = [lower_field_names.index(k.lower()) for k in key_fields]
+    except ValueError:
+        raise ValueError("Key fields must be in the field names: {}".format(", ".join(key_fields)))
+
+    # index the new rows by key
+    new_rows = {}
+    for row in rows:
+        row = tuple(row)
+        key = tuple(row[i] for i in key_indexes)
+        if key in new_rows:
+            raise ValueError("Duplicate key in rows: {}".format(key))
+        new_rows[key] = row
+
+    # one pass over the table finds the rows to update or delete, and the keys already in the table
+    updates = {}
+    deletes = []
+    existing_keys = set()
+    unchanged_count = 0
+    with arcpy.da.SearchCursor(in_table, ["OID@"] + field_names) as cursor:
+        for row in cursor:
+            oid, values = row[0], tuple(row[1:])
+            key = tuple(values[i] for i in key_indexes)
+            new_row = new_rows.get(key)
+            if new_row is None:
+                if delete_missing:
+                    deletes.append(oid)
+                continue
+
+            existing_keys.add(key)
+            if not _rows_equal(new_row, values):
+                updates[oid] = new_row
+            else:
+                unchanged_count += 1
+
+    inserts = (row for key, row in new_rows.items() if key not in existing_keys)
+
+    counts = {
+        "inserted": create_rows_chunked(edit_session, in_table, inserts, field_names, chunk_size)["rows"],
+        "updated": _update_rows_by_oids(edit_session, in_table, field_names, updates),
+        "deleted": delete_rows_by_oids(edit_session, in_table, deletes)["rows"],
+        "unchanged": unchanged_count,
+        "duration": time.time() - start_time
+    }
+    _get_logger().info("Merged rows into %s in %.2fs: %s inserted, %s updated, %s deleted, %s unchanged", in_table,
+                       counts["duration"], counts["inserted"], counts["updated"], counts["deleted"],
+                       counts["unchanged"])
+
+    return counts
+
+
+###############################################################################
+# PRIVATE FUNCTIONS
+###############################################################################
+def _rows_equal(row, other_row):
+    """Tests whether two rows have equal values, comparing geometries by shape rather than by identity."""
+    for value, other_value in zip(row, other_row):
+        if isinstance(value, arcpy.Geometry) and isinstance(other_value, arcpy.Geometry):
+            if not value.equals(other_value):
+                return False
+        elif value != other_value:
+            return False
+    return True
+
+
+@_edit_handler
+def _insert_chunk(edit_session, in_table, field_names, chunk):
+    with arcpy.da.InsertCursor(in_table, field_names) as cursor:
+        for row in chunk:
+            cursor.insertRow(row)
+
+
+@_edit_handler
+def _update_chunk(edit_session, in_table, update_func, where_clause, field_names, sql_clause, oid_index, chunk_size):
+    """Updates the first chunk_size rows, returning the number of rows updated and the last object ID."""
+    row_count = 0
+    last_oid = None
+    with arcpy.da.UpdateCursor(in_table, field_names, where_clause, sql_clause=sql_clause) as cursor:
+        for row in cursor:
+            last_oid = row[oid_index]
+            cursor.updateRow(update_func(row))
+            row_count += 1
+            if row_count == chunk_size:
+                break
+    return row_count, last_oid
+
+
+@_edit_handler
+def _update_oid_batch(edit_session, in_table, cursor_fields, where_clause, rows_by_oid):
+    updated_count = 0
+    with arcpy.da.UpdateCursor(in_table, cursor_fields, where_clause) as cursor:
+        for row in cursor:
+            cursor.updateRow((row[0], ) + rows_by_oid[row[0]])
+            updated_count += 1
+    return updated_count
+
+
+def _update_rows_by_oids(edit_session, in_table, field_names, rows_by_oid, batch_size=DEFAULT_OID_BATCH_SIZE):
+    """Updates rows to new values by object ID, in batches of batch_size object IDs, returning the number updated."""
+    oid_field = arcpy.AddFieldDelimiters(in_table, arcpy.Describe(in_table).OIDFieldName)
+    cursor_fields = ["OID@"] + field_names
+    progress = _Progress(in_table, None)
+
+    for batch in iter_chunks(sorted(rows_by_oid), batch_size):
+        where_clause = "{} IN ({})".format(oid_field, ", ".join(str(int(oid)) for oid in batch))
+        try:
+            updated_count = _update_oid_batch(edit_session, in_table, cursor_fields, where_clause, rows_by_oid)
+        except Exception as e:
+            raise BulkEditError("Updating rows in '{}' failed after {} rows.".format(in_table, progress.rows),
+                                progress.stats(), e)
+        progress.add_chunk(updated_count)
+
+    return progress.rows
+
+
+class _Progress(object):
+    """Tracks the rows and chunks committed by a chunked edit, logging and reporting progress as chunks complete."""
+
+    def __init__(self, in_table, callback, rows=0, last_oid=None, track_oid=False):
+        self._in_table = in_table
+        self._callback = callback
+        self._start_time = time.time()
+        self._track_oid = track_oid
+        self.rows = rows
+        self.chunks = 0
+        self.new_rows = 0
+        self.last_oid = last_oid
+
+    def add_chunk(self, row_count, last_oid=None):
+        self.rows += row_count
+        self.new_rows += row_count
+        self.chunks += 1
+        if last_oid is not None:
+            self.last_oid = last_oid
+
+        stats = self.stats()
+        _get_logger().debug("%s rows committed to %s (%s rows/sec)", self.rows, self._in_table,
+                            "{:.0f}".format(stats["rowsPerSecond"]) if stats["rowsPerSecond"] is not None else "-")
+        if self._callback:
+            self._callback(stats)
+
+    def finish(self):
+        stats = self.stats()
+        _get_logger().info("%s rows committed to %s in %s chunks in %.2fs", self.rows, self._in_table, self.chunks,
+                           stats["duration"])
+        return stats
+
+    def stats(self):
+        duration = time.time() - self._start_time
+        stats = {
+            "rows": self.rows,
+            "chunks": self.chunks,
+            "duration": duration,
+            "rowsPerSecond": self.new_rows / duration if duration > 0 else None
+        }
+        if self._track_oid:
+            stats["lastOID"] = self.last_oid
+        return stats
+
+
+def _get_logger():
+    return logging.getLogger("arcpyext.data")
@@ -15,8 +15,11 @@ import arcpy
 def create_rows(edit_session, in_table, rows, field_names = "*"):
     _create_rows(edit_session, in_table, rows, field_names)
 
-def delete_rows(edit_session, in_table, where_clause = None, field_names = "*"):
-    _delete_rows(edit_session, in_table, where_clause, field_names)
+def delete_rows(edit_session, in_table, where_clause = None, field_names = None):
+    """Deletes the rows matching a where clause, returning the number of rows deleted.
+
+    Only the object ID is read from each row, unless field_names are given."""
+    return _delete_rows(edit_session, in_table, where_clause, field_names or ["OID@"])
 
 def read_rows(in_table, where_clause = None, field_names = "*"):
     with arcpy.da.SearchCursor(in_table, field_names, where_clause) as cursor:
@@ -36,12 +39,13 @@ def _edit_handler(func):
         edit_session.startOperation()
 
         try:
-            func(*args)
+            result = func(*args)
         except Exception:
             edit_session.abortOperation()
             raise
 
         edit_session.stopOperation()
+        return result
 
     return wrapper
 
@@ -53,9 +57,12 @@ def _create_rows(edit_session, in_table, rows, field_names):
 
 @_edit_handler
 def _delete_rows(edit_session, in_table, where_clause, field_names):
+    deleted_count = 0
     with arcpy.da.UpdateCursor(in_table, field_names, where_clause) as cursor:
         for row in cursor:
             cursor.deleteRow()
+            deleted_count += 1
+    return deleted_count
 
 @_edit_handler
 def _update_rows_func(edit_session, in_table, update_func, where_clause, field_names):
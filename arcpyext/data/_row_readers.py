@@ -0,0 +1,259 @@
+# coding=utf-8
+"""This module contains functions for reading rows lazily, one row or one chunk of rows at a time."""
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+from future.utils import native_str, string_types
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+# Standard library imports
+import collections
+
+# Third-party imports
+import arcpy
+import numpy
+
+# Local imports
+from .._utils import iter_chunks
+
+ROW_TYPES = ("tuple", "dict", "namedtuple")
+
+# Number of rows read_array allocates space for at first, and reads from the cursor at a time
+DEFAULT_ARRAY_CHUNK_SIZE = 65536
+
+# NumPy type of each arcpy field type, field types not listed are stored as Python objects
+_FIELD_DTYPES = {
+    "OID": "<i8",
+    "SmallInteger": "<i2",
+    "Integer": "<i4",
+    "BigInteger": "<i8",
+    "Single": "<f4",
+    "Double": "<f8",
+    "Date": "<M8[us]",
+    "Guid": "<U38",
+    "GlobalID": "<U38"
+}
+
+# NumPy type of each cursor token
+_TOKEN_DTYPES = {
+    "OID@": ("<i8", ),
+    "SHAPE@X": ("<f8", ),
+    "SHAPE@Y": ("<f8", ),
+    "SHAPE@Z": ("<f8", ),
+    "SHAPE@M": ("<f8", ),
+    "SHAPE@AREA": ("<f8", ),
+    "SHAPE@LENGTH": ("<f8", ),
+    "SHAPE@XY": ("<f8", 2),
+    "SHAPE@TRUECENTROID": ("<f8", 2)
+}
+
+
+def iter_rows(in_table, field_names, where_clause=None, row_type="tuple", sql_clause=(None, None)):
+    """Yields the rows of a table one at a time, without reading the whole table into memory.
+
+    Only the given fields (or cursor tokens, e.g. 'OID@') are read.  Rows are yielded as tuples, or as dicts or
+    namedtuples keyed on the field names, depending on row_type.  Field names that aren't valid Python identifiers
+    (e.g. tokens) are renamed in namedtuples to their position, e.g. '_0'.
+
+    :param in_table: The table to read
+    :type in_table: str
+    :param field_names: The fields to read
+    :type field_names: list of str
+    :param where_clause: Limits the rows read
+    :type where_clause: str
+    :param row_type: One of 'tuple', 'dict' or 'namedtuple'
+    :type row_type: str
+    :param sql_clause: Prefix and postfix SQL clauses, as for arcpy.da.SearchCursor
+    :type sql_clause: tuple
+    :returns: generator of rows
+    """
+    field_names = _get_field_names(field_names)
+    make_row = _get_row_factory(field_names, row_type)
+
+    with arcpy.da.SearchCursor(in_table, field_names, where_clause, sql_clause=sql_clause) as cursor:
+        for row in cursor:
+            yield make_row(row)
+
+
+def iter_row_chunks(in_table,
+                    field_names,
+                    chunk_size,
+                    where_clause=None,
+                    row_type="tuple",
+                    sql_clause=(None, None),
+                    null_value=None):
+    """Yields the rows of a table in chunks of (at most) chunk_size rows.
+
+    Each chunk is a list of rows, as for iter_rows, or with a row_type of 'array' a NumPy structured array.  Array
+    columns are typed from their fields: numbers, dates and GUIDs get NumPy types, strings are sized to their field's
+    length, and anything else (e.g. a geometry) is stored as an object.  Nulls in number and date fields become NaN
+    and NaT; nulls in string fields become an empty string; nulls in integer fields need a null_value, either a single
+    value or a dict of values by field name.
+
+    :param in_table: The table to read
+    :type in_table: str
+    :param field_names: The fields to read
+    :type field_names: list of str
+    :param chunk_size: Maximum number of rows in each chunk
+    :type chunk_size: int
+    :param where_clause: Limits the rows read
+    :type where_clause: str
+    :param row_type: One of 'tuple', 'dict', 'namedtuple' or 'array'
+    :type row_type: str
+    :param sql_clause: Prefix and postfix SQL clauses, as for arcpy.da.SearchCursor
+    :type sql_clause: tuple
+    :param null_value: Value to replace nulls with in arrays
+    :returns: generator of lists or arrays
+    """
+    field_names = _get_field_names(field_names)
+
+    if row_type == "array":
+        dtype = get_dtype(in_table, field_names)
+        with arcpy.da.SearchCursor(in_table, field_names, where_clause, sql_clause=sql_clause) as cursor:
+            for chunk in iter_chunks(cursor, chunk_size):
+                yield rows_to_array(chunk, dtype, null_value)
+        return
+
+    make_row = _get_row_factory(field_names, row_type)
+    with arcpy.da.SearchCursor(in_table, field_names, where_clause, sql_clause=sql_clause) as cursor:
+        for chunk in iter_chunks(cursor, chunk_size):
+            yield [make_row(row) for row in chunk]
+
+
+def read_array(in_table,
+               field_names,
+               where_clause=None,
+               null_value=None,
+               use_table_to_numpy=True,
+               chunk_size=DEFAULT_ARRAY_CHUNK_SIZE):
+    """Reads the rows of a table into a NumPy structured array.
+
+    If every column has a NumPy type (i.e. no geometries or other objects are read) and use_table_to_numpy is True,
+    the array is read by arcpy.da.TableToNumPyArray.  Otherwise, rows are read from a cursor in chunks of chunk_size
+    rows, each converted to an array (see iter_row_chunks for the column types and null handling) and copied into an
+    array that is allocated up front and doubled in size when full.
+
+    :param in_table: The table to read
+    :type in_table: str
+    :param field_names: The fields to read
+    :type field_names: list of str
+    :param where_clause: Limits the rows read
+    :type where_clause: str
+    :param null_value: Value to replace nulls with, either a single value or a dict of values by field name
+    :param use_table_to_numpy: Whether to read with arcpy.da.TableToNumPyArray when it can read every column
+    :type use_table_to_numpy: bool
+    :param chunk_size: Number of rows to read at a time, and to allocate space for at first
+    :type chunk_size: int
+    :returns: numpy.ndarray
+    """
+    field_names = _get_field_names(field_names)
+    dtype = get_dtype(in_table, field_names)
+
+    if use_table_to_numpy and all(dtype.fields[name][0].kind != "O" for name in dtype.names):
+        return arcpy.da.TableToNumPyArray(in_table, field_names, where_clause, null_value=null_value)
+
+    array = numpy.empty(chunk_size, dtype=dtype)
+    row_count = 0
+
+    with arcpy.da.SearchCursor(in_table, field_names, where_clause) as cursor:
+        for chunk in iter_chunks(cursor, chunk_size):
+            chunk_array = rows_to_array(chunk, dtype, null_value)
+            end = row_count + len(chunk_array)
+            if end > len(array):
+                grown_array = numpy.empty(max(len(array) * 2, end), dtype=dtype)
+                grown_array[:row_count] = array[:row_count]
+                array = grown_array
+            array[row_count:end] = chunk_array
+            row_count = end
+
+    # the array has no other references, so can be shrunk in place
+    array.resize(row_count, refcheck=False)
+    return array
+
+
+def get_dtype(in_table, field_names):
+    """Gets the NumPy structured array type for rows of the given fields (or tokens) of a table."""
+    fields = dict((f.name.lower(), f) for f in arcpy.ListFields(in_table))
+
+    dtype = []
+    for name in field_names:
+        field = fields.get(name.lower())
+        if field is not None:
+            if field.type == "String":
+                field_dtype = ("<U{}".format(max(field.length, 1)), )
+            else:
+                field_dtype = (_FIELD_DTYPES.get(field.type, "O"), )
+        elif name.upper() in _TOKEN_DTYPES:
+            field_dtype = _TOKEN_DTYPES[name.upper()]
+        elif "@" in name:
+            field_dtype = ("O", )
+        else:
+            raise ValueError("Field not found in table: {}".format(name))
+
+        # NumPy on Python 2 only understands byte strings in a dtype
+        dtype.append((native_str(name), native_str(field_dtype[0])) + field_dtype[1:])
+
+    return numpy.dtype(dtype)
+
+
+def rows_to_array(rows, dtype, null_value=None):
+    """Converts a list of row tuples to a NumPy structured array, replacing nulls that NumPy can't store."""
+    null_values = {}
+    for name in dtype.names:
+        kind = dtype.fields[name][0].kind
+        if kind == "U":
+            null_values[name] = ""
+        if kind in ("i", "u", "U") and null_value is not None:
+            value = null_value.get(name) if isinstance(null_value, dict) else null_value
+            if value is not None:
+                null_values[name] = value
+
+    if null_values:
+        indexes = [(i, null_values[name]) for i, name in enumerate(dtype.names) if name in null_values]
+        rows = [_replace_nulls(row, indexes) for row in rows]
+
+    try:
+        return numpy.array(rows, dtype=dtype)
+    except TypeError:
+        raise ValueError("Integer fields containing nulls need a null_value.")
+
+
+###############################################################################
+# PRIVATE FUNCTIONS
+###############################################################################
+def _get_field_names(field_names):
+    if isinstance(field_names, string_types):
+        field_names = [field_names]
+    field_names = list(field_names)
+    if "*" in field_names:
+        raise ValueError("Name the fields to read, rather than '*'.")
+    return field_names
+
+
+def _get_row_factory(field_names, row_type):
+    if row_type not in ROW_TYPES:
+        raise ValueError("Unknown row type '{}', expected one of: {}".format(row_type, ", ".join(ROW_TYPES)))
+
+    if row_type == "dict":
+        return lambda row: dict(zip(field_names, row))
+
+    if row_type == "namedtuple":
+        row_class = collections.namedtuple("Row", [native_str(n) for n in field_names], rename=True)
+        return lambda row: row_class._make(row)
+
+    return tuple
+
+
+def _replace_nulls(row, indexes):
+    if None not in row:
+        return row
+    row = list(row)
+    for i, value in indexes:
+        if row[i] is None:
+            row[i] = value
+    return tuple(row)
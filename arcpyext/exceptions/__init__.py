@@ -1,4 +1,5 @@
 from .arc_py_ext_error import ArcPyExtError
+from .bulk_edit_error import BulkEditError
 from .change_data_sources_error import ChangeDataSourcesError
 from .data_source_update_error import DataSourceUpdateError
 from .map_data_sources_broken_error import MapDataSourcesBrokenError
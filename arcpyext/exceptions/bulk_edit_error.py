@@ -0,0 +1,23 @@
+# coding=utf-8
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+from .arc_py_ext_error import ArcPyExtError
+
+class BulkEditError(ArcPyExtError):
+    """ArcPyExt exception for a chunked edit that failed part way, recording the edits committed before the failure."""
+
+    def __init__(self, message, stats, innerError = None):
+        super(BulkEditError, self).__init__(message, innerError)
+        self._stats = stats
+
+    @property
+    def stats(self):
+        return self._stats
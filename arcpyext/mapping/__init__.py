@@ -1 +1,3 @@
-from ._mapping import *
\ No newline at end of file
+from ._mapping import *
+from ._batch import change_data_sources_many, describe_many, write_change_report
+from ._cim_xml import describe_aprx
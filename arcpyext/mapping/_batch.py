@@ -0,0 +1,313 @@
+# coding=utf-8
+"""This module contains functions for working with many map documents/projects at once."""
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+# Standard lib imports
+import csv
+import io
+import json
+import logging
+import multiprocessing
+import os.path
+import re
+import sys
+import time
+
+from collections import OrderedDict
+
+# Local imports
+from . import _mapping
+
+# The csv module writes bytes on Python 2, and text on Python 3
+_PY2 = sys.version_info[0] < 3
+
+# Errors that may succeed if the document is tried again (e.g. a lock held by another process)
+TRANSIENT_ERRORS = (IOError, OSError)
+
+# arcpy raises a RuntimeError for most failures, only those with a message like these are worth retrying
+TRANSIENT_RUNTIME_ERROR_PATTERN = re.compile(r"lock|sharing violation|in use|used by another process", re.IGNORECASE)
+
+CHANGE_REPORT_FIELDS = [
+    "filePath", "map", "type", "index", "name", "status", "oldDataSource", "newDataSource", "error", "duration",
+    "method"
+]
+
+
+def change_data_sources_many(jobs, workers=None, save=False, retries=2, retry_delay=5):
+    """Change the data sources of many map documents/projects, fanned out across a pool of worker processes.
+
+    Each job is a (document path, data sources) tuple, where the data sources are in the form used by
+    change_data_sources (see create_replacement_data_sources_list).  Jobs for the same document are applied in order
+    to a single opened copy of the document, which is saved once if save is True.
+
+    Errors changing individual layers/tables don't stop the other layers/tables being changed, they are reported in the
+    result.  A document that fails with a transient error (an IOError or OSError, or a RuntimeError about a lock or
+    sharing violation) is re-opened and tried again, up to the given number of retries; any other error fails the
+    document straight away.  Results are yielded as soon as each
+    document has been processed, so may not be in the same order as the jobs.  Each result is a dictionary:
+
+    .. code-block:: python
+
+        {
+            "filePath": "path/to/document.mxd",
+            "saved": True,
+            "attempts": 1,
+            "error": None,          # a message describing why the document failed, None if it didn't
+            "duration": 1.23,       # seconds taken to process the document
+            "layers": [...]         # a record for every layer and table changed, skipped or broken
+        }
+
+    See write_change_report for writing the results to a file.  Worker processes are started with the multiprocessing
+    module, so on Windows the calling script must be guarded with an ``if __name__ == "__main__":`` block.
+
+    :param jobs: (document path, data sources) tuples
+    :type jobs: iterable of tuple
+    :param workers: Number of worker processes to use, defaults to the number of CPUs.  With one worker (or less),
+        documents are processed one at a time in the current process.
+    :type workers: int
+    :param save: Whether to save documents after changing their data sources
+    :type save: bool
+    :param retries: Number of times to retry a document after a transient error
+    :type retries: int
+    :param retry_delay: Seconds to wait before retrying a document
+    :type retry_delay: float
+    :returns: generator of result dictionaries
+    """
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    # group jobs by document, so each document is only opened (and saved) once
+    document_jobs = OrderedDict()
+    for path, data_sources in jobs:
+        document_jobs.setdefault(os.path.normcase(os.path.abspath(path)), (path, []))[1].append(data_sources)
+
+    tasks = [(path, data_sources_list, save, retries, retry_delay)
+             for path, data_sources_list in document_jobs.values()]
+
+    if workers <= 1:
+        for task in tasks:
+            yield _change_document_data_sources_worker(task)
+        return
+
+    pool = multiprocessing.Pool(min(workers, len(tasks)) or 1)
+    try:
+        for result in pool.imap_unordered(_change_document_data_sources_worker, tasks):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def describe_many(paths, workers=None, use_cache=True):
+    """Describe many map documents/projects, fanned out across a pool of worker processes.
+
+    Results are yielded as soon as each document has been described, so may not be in the same order as the input paths.
+    A document that fails to be described does not stop the others, the failure is reported in its result instead.
+    Each result is a dictionary:
+
+    .. code-block:: python
+
+        {
+            "filePath": "path/to/document.mxd",
+            "description": {...},   # as returned by describe, None if describing failed
+            "error": None,          # a message describing the failure, None if describing succeeded
+            "duration": 1.23        # seconds taken to describe the document
+        }
+
+    Worker processes are started with the multiprocessing module, so on Windows the calling script must be guarded
+    with an ``if __name__ == "__main__":`` block.  The description cache, if enabled, is shared with the workers.
+
+    :param paths: Paths to the map documents/projects to describe
+    :type paths: iterable of str
+    :param workers: Number of worker processes to use, defaults to the number of CPUs.  With one worker (or less),
+        documents are described one at a time in the current process.
+    :type workers: int
+    :param use_cache: Whether to use the description cache, if enabled
+    :type use_cache: bool
+    :returns: generator of result dictionaries
+    """
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    if workers <= 1:
+        for path in paths:
+            yield _describe_document(path, use_cache)
+        return
+
+    cache = _mapping._description_cache
+    cache_config = (cache.db_path, cache.max_size) if cache and use_cache else None
+
+    pool = multiprocessing.Pool(workers, _init_worker, (cache_config, ))
+    try:
+        for result in pool.imap_unordered(_describe_document_worker, paths):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def write_change_report(results, report_path):
+    """Writes the results of change_data_sources_many to a report, as JSON or CSV depending on the file extension.
+
+    The JSON report is the list of document results.  The CSV report has a row for every layer and table, plus a row
+    for every document that failed.  Results are written as they are consumed, so this can be given the generator
+    returned from change_data_sources_many directly.
+
+    :param results: Results from change_data_sources_many
+    :type results: iterable of dict
+    :param report_path: Path to the report to write, ending in ".json" or ".csv"
+    :type report_path: str
+    :returns: dict counting the layers/tables by status, and the failed documents
+    """
+    report_format = os.path.splitext(report_path)[1].lower()
+    if report_format not in (".csv", ".json"):
+        raise ValueError("Report must be a '.csv' or '.json' file, got '{}'.".format(report_path))
+
+    summary = {"changed": 0, "skipped": 0, "broken": 0, "failed": 0, "failedDocuments": 0}
+
+    def count(result):
+        if result["error"]:
+            summary["failedDocuments"] += 1
+        for record in result["layers"]:
+            summary[record["status"]] += 1
+
+    if report_format == ".json":
+        with io.open(report_path, "w", encoding="utf-8") as fp:
+            fp.write("[")
+            for i, result in enumerate(results):
+                count(result)
+                fp.write("{}\n{}".format("," if i else "", json.dumps(result)))
+            fp.write("\n]\n")
+    else:
+        with (io.open(report_path, "wb") if _PY2 else io.open(report_path, "w", newline="", encoding="utf-8")) as fp:
+            writer = csv.DictWriter(fp, CHANGE_REPORT_FIELDS)
+            writer.writeheader()
+            for result in results:
+                count(result)
+                if result["error"]:
+                    writer.writerow(_encode_csv_row({
+                        "filePath": result["filePath"],
+                        "type": "document",
+                        "status": "failed",
+                        "error": result["error"],
+                        "duration": result["duration"]
+                    }))
+                for record in result["layers"]:
+                    writer.writerow(_encode_csv_row(dict(record, filePath=result["filePath"])))
+
+    return summary
+
+
+def _change_document_data_sources(path, data_sources_list, save):
+    """Opens a document, applies each set of data sources in turn, and optionally saves it."""
+    document = _mapping.open_document(path)
+    try:
+        layer_records = []
+        for data_sources in data_sources_list:
+            records, _ = _mapping._change_data_sources(document, data_sources)
+            layer_records.extend(records)
+
+        if save:
+            document.save()
+
+        return layer_records
+    finally:
+        # delete the variable in accordance with Esri guidelines
+        del document
+
+
+def _change_document_data_sources_worker(task):
+    """Changes the data sources of a document, capturing any error, retrying transient errors, and timing it."""
+    path, data_sources_list, save, retries, retry_delay = task
+
+    logger = _get_logger()
+    start_time = time.time()
+    result = {"filePath": path, "saved": False, "attempts": 0, "error": None, "duration": None, "layers": []}
+
+    while True:
+        result["attempts"] += 1
+        try:
+            result["layers"] = _change_document_data_sources(path, data_sources_list, save)
+            result["saved"] = save
+            result["error"] = None
+            break
+        except Exception as e:
+            result["error"] = "{}: {}".format(e.__class__.__name__, e)
+            if not _is_transient_error(e):
+                logger.exception("An error occured changing data sources of '%s'.", path)
+                break
+
+            logger.warning("Attempt %s at changing data sources of '%s' failed.", result["attempts"], path,
+                           exc_info=True)
+            if result["attempts"] > retries:
+                break
+            time.sleep(retry_delay)
+
+    result["duration"] = time.time() - start_time
+    logger.debug("Changed data sources of '%s' in %2.2f sec", path, result["duration"])
+
+    return result
+
+
+def _is_transient_error(e):
+    """Tests whether an error may not happen again if the document is tried again, e.g. a file lock."""
+    if isinstance(e, TRANSIENT_ERRORS):
+        return True
+    return isinstance(e, RuntimeError) and TRANSIENT_RUNTIME_ERROR_PATTERN.search(str(e)) is not None
+
+
+def _describe_document(path, use_cache=True):
+    """Describe a single document, capturing any error and how long describing took."""
+    start_time = time.time()
+    result = {"filePath": path, "description": None, "error": None, "duration": None}
+
+    try:
+        result["description"] = _mapping.describe(path, use_cache)
+    except Exception as e:
+        _get_logger().exception("An error occured describing '%s'.", path)
+        result["error"] = "{}: {}".format(e.__class__.__name__, e)
+
+    result["duration"] = time.time() - start_time
+    _get_logger().debug("Described '%s' in %2.2f sec", path, result["duration"])
+
+    return result
+
+
+def _describe_document_worker(path):
+    # the description cache is set up (or not) by _init_worker
+    return _describe_document(path, True)
+
+
+def _encode_csv_row(row):
+    """Encodes the values of a report row for the csv module, serializing non-string values as JSON."""
+    encoded_row = {}
+    for k, v in row.items():
+        if isinstance(v, (dict, list)):
+            v = json.dumps(v)
+        if _PY2 and isinstance(v, str):
+            v = v.encode("utf-8")
+        encoded_row[k] = v
+    return encoded_row
+
+
+def _get_logger():
+    return logging.getLogger("arcpyext.mapping")
+
+
+def _init_worker(cache_config):
+    """Initialises a worker process.
+
+    Importing arcpyext.mapping sets up the native (COM/.NET) environment, so this is done once per worker rather than
+    once per document."""
+    if cache_config:
+        _mapping.enable_description_cache(*cache_config)
@@ -0,0 +1,524 @@
+# coding=utf-8
+"""This module reads ArcGIS Pro projects straight from their CIM XML, without arcpy or the ArcGIS Pro SDK.
+
+The XML documents inside the project archive are read with a streaming parser, each top-level element being handled
+and discarded as soon as it has been parsed (renderers and other large elements are never held for long).
+"""
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+from future.moves.collections import deque
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+# Standard lib imports
+import ntpath
+import os.path
+import zipfile
+
+from xml.etree.ElementTree import iterparse
+
+# CIM paths are pre-pended with 'CIMPATH=', strip that to get the actual zip file path
+CIMPATH_PREFIX = "CIMPATH="
+
+# Workspace factory names in the CIM, mapped to the names used by arcpy connection properties
+WORKSPACE_FACTORIES = {
+    "Access": "Personal Geodatabase",
+    "FileGDB": "File Geodatabase",
+    "Raster": "Raster",
+    "SDE": "SDE",
+    "Shapefile": "Shape File",
+    "Sql": "Query Layer",
+    "TextFile": "Text File"
+}
+
+# Workspace factories where the data lives on the file system, and can be checked for existence
+FILE_WORKSPACE_FACTORIES = {"Access", "FileGDB", "Raster", "Shapefile", "TextFile"}
+
+FEATURE_LAYER_TYPES = {"CIMFeatureLayer"}
+GROUP_LAYER_TYPES = {"CIMGroupLayer"}
+RASTER_LAYER_TYPES = {"CIMRasterLayer", "CIMMosaicLayer", "CIMImageServiceLayer"}
+SERVICE_LAYER_TYPES = {
+    "CIMImageServiceLayer", "CIMTiledServiceLayer", "CIMDynamicServiceLayer", "CIMWMSLayer", "CIMWMTSLayer",
+    "CIMVectorTileLayer", "CIMSceneServiceLayer"
+}
+
+
+class XmlProProject(object):
+    """An ArcGIS Pro project, read from the CIM XML inside the project file."""
+
+    _pro_maps = None
+    _proj_file_path = None
+    _proj_zip = None
+
+    def __init__(self, proj_file_path):
+        self._proj_file_path = proj_file_path
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    #region PROPERTIES
+
+    @property
+    def file_path(self):
+        return self._proj_file_path
+
+    @property
+    def maps(self):
+        if self._pro_maps is None:
+            items = []
+
+            def read_project_items(elem):
+                for item in elem.findall("CIMProjectItem"):
+                    items.append((item.findtext("ItemType"), item.findtext("CatalogPath") or ""))
+
+            _read_cim(self._proj_zip, "GISProject.xml", {"ProjectItems": read_project_items})
+
+            self._pro_maps = [
+                XmlProMap(self, _strip_cimpath(catalog_path)) for item_type, catalog_path in items
+                if item_type == "Map" and catalog_path.startswith(CIMPATH_PREFIX)
+            ]
+
+        # return a shallow copy so our internal list isn't altered
+        return list(self._pro_maps)
+
+    #endregion
+
+    #region PUBLIC FUNCTIONS
+
+    def close(self):
+        if self._proj_zip:
+            self._proj_zip.close()
+            self._proj_zip = None
+
+    def open(self):
+        """Opens the ArcGIS Project for reading, not required when used inside a 'with' statement."""
+        if not self._proj_zip:
+            self._proj_zip = zipfile.ZipFile(self._proj_file_path, mode="r", allowZip64=True)
+
+    #endregion
+
+    def _read_cim(self, cim_path, handlers):
+        return _read_cim(self._proj_zip, cim_path, handlers)
+
+
+class XmlProDataConnection(object):
+    """The data connection of a layer or table."""
+
+    dataset = None
+    dataset_type = None
+    feature_dataset = None
+    workspace_connection_string = None
+    workspace_factory = None
+
+    def __init__(self, elem):
+        self.dataset = elem.findtext("Dataset")
+        self.dataset_type = elem.findtext("DatasetType")
+        self.feature_dataset = elem.findtext("FeatureDataset")
+        self.workspace_connection_string = elem.findtext("WorkspaceConnectionString")
+        self.workspace_factory = elem.findtext("WorkspaceFactory")
+
+    @property
+    def connection_info(self):
+        """The workspace connection string, as a dictionary with lowercase keys."""
+        if not self.workspace_connection_string:
+            return {}
+
+        return {
+            k.strip().lower(): v.strip()
+            for (k, _, v) in (p.partition("=") for p in self.workspace_connection_string.split(";")) if k.strip()
+        }
+
+
+class XmlProFieldDescription(object):
+
+    alias = None
+    name = None
+    visible = None
+
+    def __init__(self, elem):
+        self.alias = elem.findtext("Alias")
+        self.name = elem.findtext("FieldName")
+        self.visible = _to_bool(elem.findtext("Visible"))
+
+
+class XmlProDisplayTableBase(object):
+    """Base class for the CIM display table parts of a layer or table (definition query, fields, data connection)."""
+
+    data_connection = None
+    definition_query = None
+    fields = None
+
+    def __init__(self):
+        self.fields = []
+
+    def _read_display_table_elem(self, elem):
+        """Reads an element of a display table, returning whether the element was handled."""
+        if elem.tag == "DefinitionExpression":
+            self.definition_query = elem.text or ""
+        elif elem.tag == "DataConnection":
+            self.data_connection = XmlProDataConnection(elem)
+        elif elem.tag == "FieldDescriptions":
+            self.fields = [XmlProFieldDescription(fd) for fd in elem.findall("CIMFieldDescription")]
+        else:
+            return False
+
+        return True
+
+
+class XmlProFeatureTable(XmlProDisplayTableBase):
+    def __init__(self, elem):
+        super(XmlProFeatureTable, self).__init__()
+
+        for child in elem:
+            self._read_display_table_elem(child)
+
+
+class XmlProLayer(object):
+    """A layer of any type, read from CIM XML."""
+
+    children = None
+    data_connection = None
+    feature_table = None
+    layer_type = None
+    name = None
+    parent = None
+    service_id = None
+    visible = None
+
+    def __init__(self, pro_project, cim_path, parent=None):
+        self.children = []
+        self.parent = parent
+        self._child_paths = []
+
+        def read_feature_table(elem):
+            self.feature_table = XmlProFeatureTable(elem)
+
+        self.layer_type = pro_project._read_cim(
+            cim_path, {
+                "Name": lambda elem: setattr(self, "name", elem.text),
+                "Visibility": lambda elem: setattr(self, "visible", _to_bool(elem.text)),
+                "ServiceLayerID": lambda elem: setattr(self, "service_id", _to_int(elem.text)),
+                "DataConnection": lambda elem: setattr(self, "data_connection", XmlProDataConnection(elem)),
+                "FeatureTable": read_feature_table,
+                "Layers": lambda elem: self._child_paths.extend(_read_cimpaths(elem))
+            })
+
+    @property
+    def long_name(self):
+        name_parts = deque()
+
+        layer = self
+        while layer:
+            name_parts.appendleft(layer.name)
+            layer = layer.parent
+
+        return "\\".join(name_parts)
+
+    @property
+    def source(self):
+        """The data connection for the layer, either directly on the layer or on its feature table."""
+        if self.feature_table and self.feature_table.data_connection:
+            return self.feature_table.data_connection
+        return self.data_connection
+
+
+class XmlProMap(object):
+    """A map, read from CIM XML."""
+
+    name = None
+    spatial_reference = None
+
+    _layer_paths = None
+    _layers = None
+    _pro_project = None
+    _table_paths = None
+    _tables = None
+
+    def __init__(self, pro_project, cim_path):
+        self._pro_project = pro_project
+        self._layer_paths = []
+        self._table_paths = []
+
+        pro_project._read_cim(
+            cim_path, {
+                "Name": lambda elem: setattr(self, "name", elem.text),
+                "SpatialReference": lambda elem: setattr(self, "spatial_reference", _export_spatial_reference(elem)),
+                "Layers": lambda elem: self._layer_paths.extend(_read_cimpaths(elem)),
+                "StandaloneTables": lambda elem: self._table_paths.extend(_read_cimpaths(elem))
+            })
+
+    #region PROPERTIES
+
+    @property
+    def layers(self):
+        """All layers in the map, including the children of group layers, in the same order as arcpy lists them."""
+        if self._layers is None:
+            self._layers = []
+
+            # build layers recursively
+            for lp in self._layer_paths:
+                self._create_layers(lp, None)
+
+        # return a shallow copy so our internal list isn't altered
+        return list(self._layers)
+
+    @property
+    def tables(self):
+        if self._tables is None:
+            self._tables = [XmlProStandaloneTable(self._pro_project, tp) for tp in self._table_paths]
+
+        return list(self._tables)
+
+    #endregion
+
+    def _create_layers(self, layer_path, parent):
+        layer = XmlProLayer(self._pro_project, layer_path, parent)
+        self._layers.append(layer)
+
+        for child_path in layer._child_paths:
+            layer.children.append(self._create_layers(child_path, layer))
+
+        return layer
+
+
+class XmlProStandaloneTable(XmlProDisplayTableBase):
+    """A standalone table, read from CIM XML."""
+
+    name = None
+    service_id = None
+
+    def __init__(self, pro_project, cim_path):
+        super(XmlProStandaloneTable, self).__init__()
+
+        def read_elem(elem):
+            if elem.tag == "Name":
+                self.name = elem.text
+            elif elem.tag == "ServiceTableID":
+                self.service_id = _to_int(elem.text)
+            else:
+                self._read_display_table_elem(elem)
+
+        pro_project._read_cim(cim_path, {
+            k: read_elem
+            for k in ("Name", "ServiceTableID", "DefinitionExpression", "DataConnection", "FieldDescriptions")
+        })
+
+    @property
+    def source(self):
+        return self.data_connection
+
+
+def describe_aprx(file_path):
+    """Describe an ArcGIS Pro project by reading its CIM XML directly.
+
+    This does not require arcpy or ArcGIS Pro, and produces a description in the same form as describe, with some
+    differences where information is only available from the data itself:
+
+     - field types are not available (as with describe on ArcGIS Pro)
+     - layers and tables are only checked for being broken if their data is stored on the file system, otherwise
+       isBroken is None
+     - the spatial reference is exported from the map's CIM definition, so is not equal to the string produced by
+       arcpy (descriptions from this function should be compared with each other)
+
+    :param file_path: Path to the ArcGIS Pro project (*.aprx)
+    :type file_path: str
+    :returns: dict describing the project
+    """
+
+    project_dir = os.path.dirname(os.path.abspath(file_path))
+
+    with XmlProProject(file_path) as proj:
+        return {
+            "filePath": file_path,
+            "maps": [{
+                "name": m.name,
+                "spatialReference": m.spatial_reference,
+                "layers": [_describe_layer(l, i, project_dir) for i, l in enumerate(m.layers)],
+                "tables": [_describe_table(t, i, project_dir) for i, t in enumerate(m.tables)]
+            } for m in proj.maps]
+        }
+
+
+def _add_data_connection_details(data_connection, project_dir, details):
+    # yapf: disable
+    details.update({
+        "dataSource": None,
+        "database": None,
+        "datasetName": None,
+        "datasetType": None,
+        "server": None,
+        "service": None,
+        "userName": None
+    })
+    # yapf: enable
+
+    if data_connection is None:
+        return
+
+    conn_info = data_connection.connection_info
+    database = conn_info.get("database")
+    dataset = data_connection.dataset
+
+    if database and data_connection.workspace_factory in FILE_WORKSPACE_FACTORIES:
+        # file-based workspaces are saved relative to the project
+        database = os.path.normpath(os.path.join(project_dir, database.replace(ntpath.sep, os.sep)))
+
+    if dataset and data_connection.workspace_factory == "Shapefile" and not os.path.splitext(dataset)[1]:
+        dataset = dataset + ".shp"
+
+    details["database"] = database
+    details["datasetName"] = dataset
+    details["datasetType"] = WORKSPACE_FACTORIES.get(data_connection.workspace_factory,
+                                                     data_connection.workspace_factory)
+    details["server"] = conn_info.get("server")
+    details["service"] = conn_info.get("instance")
+    details["userName"] = conn_info.get("user")
+
+    if database and dataset:
+        details["dataSource"] = os.path.join(database,
+                                             *[p for p in (data_connection.feature_dataset, dataset) if p])
+
+
+def _describe_fields(fields):
+    if not fields:
+        return None
+
+    return [
+        {
+            "alias": f.alias,
+            "index": i,
+            "name": f.name,
+            "type": None,  # not stored in the CIM
+            "visible": f.visible
+        } for i, f in enumerate(fields)
+    ]
+
+
+def _describe_layer(layer, index, project_dir):
+    # yapf: disable
+    layer_details = {
+        "definitionQuery": layer.feature_table.definition_query if layer.feature_table else None,
+        "fields": _describe_fields(layer.feature_table.fields) if layer.feature_table else [],
+        "index": index,
+        "isFeatureLayer": layer.layer_type in FEATURE_LAYER_TYPES,
+        "isGroupLayer": layer.layer_type in GROUP_LAYER_TYPES,
+        "isNetworkAnalystLayer": layer.layer_type.startswith("CIMNA"),
+        "isRasterLayer": layer.layer_type in RASTER_LAYER_TYPES,
+        "isRasterizingLayer": None,  # not implemented yet
+        "isServiceLayer": layer.layer_type in SERVICE_LAYER_TYPES or (
+            layer.source is not None and layer.source.workspace_factory == "FeatureService"),
+        "longName": layer.long_name,
+        "name": layer.name,
+        "serviceId": layer.service_id,
+        "visible": layer.visible
+    }
+    # yapf: enable
+
+    _add_data_connection_details(layer.source, project_dir, layer_details)
+    layer_details["isBroken"] = False if layer_details["isGroupLayer"] else _is_broken(layer.source, layer_details)
+
+    return layer_details
+
+
+def _describe_table(table, index, project_dir):
+    table_details = {
+        "definitionQuery": table.definition_query,
+        "fields": _describe_fields(table.fields),
+        "name": table.name,
+        "index": index,
+        "serviceId": table.service_id
+    }
+
+    _add_data_connection_details(table.source, project_dir, table_details)
+    table_details["isBroken"] = _is_broken(table.source, table_details)
+
+    return table_details
+
+
+def _export_spatial_reference(elem):
+    """Exports a CIM spatial reference in the same layout as arcpy.SpatialReference.exportToString."""
+    wkt = elem.findtext("WKT")
+    if not wkt:
+        return elem.findtext("WKID")
+
+    domain = [
+        " ".join(elem.findtext(k) or "" for k in ("XOrigin", "YOrigin", "XYScale")),
+        " ".join(elem.findtext(k) or "" for k in ("ZOrigin", "ZScale")),
+        " ".join(elem.findtext(k) or "" for k in ("MOrigin", "MScale")),
+        elem.findtext("XYTolerance") or "",
+        elem.findtext("ZTolerance") or "",
+        elem.findtext("MTolerance") or ""
+    ]
+    if _to_bool(elem.findtext("HighPrecision")):
+        domain.append("IsHighPrecision")
+
+    return ";".join([wkt] + domain)
+
+
+def _is_broken(data_connection, details):
+    """Tests whether the data for a layer/table is missing, returns None if it can't be determined."""
+    if data_connection is None or data_connection.workspace_factory not in FILE_WORKSPACE_FACTORIES:
+        return None
+
+    if not details["database"] or not os.path.exists(details["database"]):
+        return True
+
+    if data_connection.workspace_factory in ("Shapefile", "TextFile") and details["dataSource"]:
+        return not os.path.exists(details["dataSource"])
+
+    return False
+
+
+def _read_cim(proj_zip, cim_path, handlers):
+    """Streams a CIM XML document from the project archive, calling the handler for each top-level element of interest.
+
+    Each top-level element is cleared once it has been handled, so only one top-level element is held in memory at a
+    time.  Returns the tag of the root element (the CIM type).
+    """
+    depth = 0
+    root_tag = None
+
+    with proj_zip.open(cim_path) as fp:
+        for event, elem in iterparse(fp, events=("start", "end")):
+            if event == "start":
+                if depth == 0:
+                    root_tag = elem.tag
+                depth += 1
+                continue
+
+            depth -= 1
+            if depth == 1:
+                handler = handlers.get(elem.tag)
+                if handler:
+                    handler(elem)
+                elem.clear()
+
+    return root_tag
+
+
+def _read_cimpaths(elem):
+    return [_strip_cimpath(s.text) for s in elem.findall("String") if s.text]
+
+
+def _strip_cimpath(path):
+    return path[len(CIMPATH_PREFIX):] if path.startswith(CIMPATH_PREFIX) else path
+
+
+def _to_bool(value):
+    return None if value is None else value.strip().lower() == "true"
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
@@ -11,6 +11,9 @@ install_aliases()
 from future.utils import iteritems
 # pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position,import-error,no-name-in-module
 
+import hashlib
+import json
+
 from collections import Mapping, Sequence
 
 
@@ -26,17 +29,31 @@ def dictionaries_eq_ignore_case(a, b):
 
 
 def lowercase_dict(d):
-    def process_value(v):
-        if isinstance(v, Mapping):
-            return lowercase_dict(v)
-        elif isinstance(v, ("".__class__, u"".__class__, b"".__class__)):
-            return v.lower()
-        elif isinstance(v, Sequence):
-            return [process_value(sv) for sv in v]
-        else:
-            return v
+    return {k: lowercase_value(v) for (k, v) in iteritems(d)}
+
+
+def lowercase_value(v):
+    if isinstance(v, Mapping):
+        return lowercase_dict(v)
+    elif isinstance(v, ("".__class__, u"".__class__, b"".__class__)):
+        return v.lower()
+    elif isinstance(v, Sequence):
+        return [lowercase_value(sv) for sv in v]
+    else:
+        return v
 
-    return {k: process_value(v) for (k, v) in iteritems(d)}
+
+def get_content_hash(desc_part, exclude=()):
+    """Gets a hash of the content of part of a description, ignoring the excluded keys.
+
+    Returns None if the content can't be hashed (i.e. isn't JSON serializable).
+    """
+    content = {k: v for (k, v) in iteritems(desc_part) if k not in exclude}
+    try:
+        serialized_content = json.dumps(content, sort_keys=True)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha1(serialized_content.encode("utf-8")).hexdigest()
 
 
 def get_datasource_info(layer_desc):
@@ -50,6 +67,14 @@ def get_datasource_info(layer_desc):
     }
 
 
+def get_datasource_key(layer_desc):
+    """Gets a hashable key describing the data source of a layer, suitable for use in indexes.
+
+    Keys of two layers are equal when their data source info dictionaries are equal ignoring case.
+    """
+    return tuple(v.lower() for (k, v) in sorted(iteritems(get_datasource_info(layer_desc))))
+
+
 def get_dict_subset(d, *keys):
     return {k: d[k] for k in keys}
 
@@ -58,6 +83,46 @@ def get_fields_compare_info(fields):
     return [get_dict_subset(f, "name", "type") for f in fields if f["visible"]]
 
 
+def get_fields_key(fields):
+    """Gets a hashable key of the visible fields, as a frozenset of (name, type) tuples."""
+    return frozenset((f["name"], f["type"]) for f in fields if f["visible"])
+
+
+def compute_layer_content_hash(layer_desc):
+    """Computes the content hash of a layer description, ignoring any hash already in the description.
+
+    The layer's index is not included, so a layer keeps its hash when it is moved within a map.
+    """
+    return get_content_hash(layer_desc, ("contentHash", "diff", "index"))
+
+
+def compute_map_content_hash(map_desc):
+    """Computes the content hash of a map description, ignoring any hash already in the map's description.
+
+    The hash covers the map's own details, and the content (using the layers' hashes) and order of its layers and
+    tables.
+    """
+    layer_hashes = [get_layer_content_hash(l) for l in map_desc["layers"]]
+    if None in layer_hashes:
+        return None
+
+    return get_content_hash({
+        "map": {k: v for (k, v) in iteritems(map_desc) if k not in ("contentHash", "layers", "tables")},
+        "layers": layer_hashes,
+        "tables": [get_content_hash(t, ("index", )) for t in map_desc["tables"]]
+    })
+
+
+def get_layer_content_hash(layer_desc):
+    """Gets the content hash of a layer description, using the hash already in the description if it has one."""
+    return layer_desc.get("contentHash") or compute_layer_content_hash(layer_desc)
+
+
+def get_map_content_hash(map_desc):
+    """Gets the content hash of a map description, using the hash already in the description if it has one."""
+    return map_desc.get("contentHash") or compute_map_content_hash(map_desc)
+
+
 def is_superset(superset, subset):
     return all(item in superset for item in subset)
 
@@ -0,0 +1,78 @@
+# coding=utf-8
+"""This module contains the matching of layer/table descriptions against data source templates."""
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+from future.utils import iteritems
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+# Local imports
+from ._compare_helpers import lowercase_dict, lowercase_value
+
+
+class DataSourceTemplateIndex(object):
+    """An index of data source templates, for finding the first template whose match criteria match a layer or table.
+
+    Templates are grouped by the keys of their match criteria, with each group holding a hash of the (lowercased)
+    criteria values, so a description is matched with one lookup per group instead of one test per template.  Strings
+    are compared ignoring case, and the first matching template in the original list wins.
+    """
+
+    _criteria_groups = None
+    _templates = None
+
+    def __init__(self, data_source_templates):
+        self._templates = list(data_source_templates)
+
+        # criteria keys -> criteria values -> index of the first template with those criteria
+        self._criteria_groups = {}
+
+        for index, template in enumerate(self._templates):
+            criteria = lowercase_dict(template["matchCriteria"])
+            keys = tuple(sorted(criteria))
+            values = tuple(criteria[k] for k in keys)
+
+            self._criteria_groups.setdefault(keys, {}).setdefault(values, index)
+
+    #region PUBLIC FUNCTIONS
+
+    def match(self, layer_or_table):
+        """Finds the first template matching a layer or table description, returning None if there is no match."""
+
+        # values are frozen as needed, and only once
+        frozen_values = {}
+
+        def get_frozen_value(key):
+            if key not in frozen_values:
+                frozen_values[key] = freeze(lowercase_value(layer_or_table[key]))
+            return frozen_values[key]
+
+        match_index = None
+
+        for keys, values_index in iteritems(self._criteria_groups):
+            if not all(k in layer_or_table for k in keys):
+                continue
+
+            index = values_index.get(tuple(get_frozen_value(k) for k in keys))
+            if index is not None and (match_index is None or index < match_index):
+                match_index = index
+
+        return None if match_index is None else self._templates[match_index]
+
+    #endregion
+
+
+def freeze(d):
+    """Freezes dicts and lists for set comparison and hashing."""
+    if isinstance(d, dict):
+        # make dictionaries lowercase for comparison
+        d = lowercase_dict(d)
+        return frozenset((key, freeze(value)) for key, value in d.items())
+    elif isinstance(d, list):
+        return tuple(freeze(value) for value in d)
+    return d
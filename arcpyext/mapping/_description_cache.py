@@ -0,0 +1,164 @@
+# coding=utf-8
+"""This module contains a persistent cache for map document/project descriptions."""
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+# Standard lib imports
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from contextlib import contextmanager
+
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class DescriptionCache(object):
+    """A cache of map document/project descriptions, stored in a SQLite database so it can be shared across processes.
+
+    Descriptions are keyed on the fingerprint of the document (path, size, modification time and a hash of the file
+    contents), so a changed document is never served a stale description.  When the serialized descriptions grow past
+    max_size bytes, the least recently used descriptions are evicted.
+    """
+
+    _db_path = None
+    _max_size = None
+
+    def __init__(self, db_path, max_size=DEFAULT_MAX_SIZE):
+        self._db_path = os.path.abspath(db_path)
+        self._max_size = max_size
+
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS descriptions (
+                file_path TEXT NOT NULL,
+                file_size INTEGER NOT NULL,
+                file_mtime REAL NOT NULL,
+                content_hash TEXT NOT NULL,
+                description TEXT NOT NULL,
+                description_size INTEGER NOT NULL,
+                last_accessed REAL NOT NULL,
+                PRIMARY KEY (file_path, file_size, file_mtime, content_hash))""")
+            conn.execute("CREATE INDEX IF NOT EXISTS descriptions_last_accessed ON descriptions (last_accessed)")
+
+    #region PROPERTIES
+
+    @property
+    def db_path(self):
+        return self._db_path
+
+    @property
+    def max_size(self):
+        return self._max_size
+
+    #endregion
+
+    #region PUBLIC FUNCTIONS
+
+    def clear(self):
+        """Removes all descriptions from the cache."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM descriptions")
+
+    def fingerprint(self, file_path):
+        """Gets the fingerprint of a document, or None if the document can't be read."""
+        try:
+            stat = os.stat(file_path)
+            content_hash = hashlib.sha1()
+            with open(file_path, "rb") as fp:
+                for block in iter(lambda: fp.read(_HASH_BLOCK_SIZE), b""):
+                    content_hash.update(block)
+        except (IOError, OSError):
+            return None
+
+        return (os.path.normcase(os.path.abspath(file_path)), stat.st_size, stat.st_mtime, content_hash.hexdigest())
+
+    def get(self, fingerprint):
+        """Gets the cached description for a document fingerprint, or None if the document has not been cached."""
+        if fingerprint is None:
+            return None
+
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    """SELECT description FROM descriptions
+                    WHERE file_path = ? AND file_size = ? AND file_mtime = ? AND content_hash = ?""",
+                    fingerprint).fetchone()
+
+                if row is None:
+                    return None
+
+                conn.execute(
+                    """UPDATE descriptions SET last_accessed = ?
+                    WHERE file_path = ? AND file_size = ? AND file_mtime = ? AND content_hash = ?""",
+                    (time.time(), ) + tuple(fingerprint))
+        except sqlite3.Error:
+            _get_logger().warning("Unable to read from the description cache.", exc_info=True)
+            return None
+
+        return json.loads(row[0])
+
+    def put(self, fingerprint, description):
+        """Stores the description of a document, replacing any description of a previous version of the document."""
+        if fingerprint is None:
+            return
+
+        try:
+            serialized_description = json.dumps(description)
+        except (TypeError, ValueError):
+            _get_logger().warning("Unable to serialize the description, not caching it.", exc_info=True)
+            return
+
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM descriptions WHERE file_path = ?", (fingerprint[0], ))
+                conn.execute("INSERT INTO descriptions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             tuple(fingerprint) + (serialized_description, len(serialized_description), time.time()))
+                self._evict(conn)
+        except sqlite3.Error:
+            _get_logger().warning("Unable to write to the description cache.", exc_info=True)
+
+    #endregion
+
+    @contextmanager
+    def _connect(self):
+        """Opens a connection to the cache database for the duration of a transaction."""
+        # a generous timeout, other processes may be writing to the cache
+        conn = sqlite3.connect(self._db_path, timeout=60)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _evict(self, conn):
+        """Removes least recently used descriptions until the cache is under its size limit."""
+        total_size = conn.execute("SELECT COALESCE(SUM(description_size), 0) FROM descriptions").fetchone()[0]
+        if total_size <= self._max_size:
+            return
+
+        evict_rowids = []
+        for rowid, description_size in conn.execute(
+                "SELECT rowid, description_size FROM descriptions ORDER BY last_accessed ASC").fetchall():
+            if total_size <= self._max_size:
+                break
+            evict_rowids.append((rowid, ))
+            total_size -= description_size
+
+        conn.executemany("DELETE FROM descriptions WHERE rowid = ?", evict_rowids)
+        _get_logger().debug("Evicted %s descriptions from the description cache.", len(evict_rowids))
+
+
+def _get_logger():
+    return logging.getLogger("arcpyext.mapping")
@@ -8,8 +8,8 @@ from future.builtins.disabled import *
 from future.builtins import *
 from future.standard_library import install_aliases
 install_aliases()
-from future.moves.collections import Mapping
-from future.moves.itertools import chain, zip_longest
+from future.moves.collections import deque, Mapping
+from future.moves.itertools import zip_longest
 from future.utils import iteritems
 # pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position,import-error,no-name-in-module
 
@@ -21,9 +21,12 @@ import sys
 from enum import Enum  # comes from third-party package on Py 2
 
 # Local imports
-from ._compare_helpers import lowercase_dict
+from ._compare_helpers import (compute_layer_content_hash, compute_map_content_hash, get_datasource_key,
+                               get_layer_content_hash, get_map_content_hash)
+from ._data_source_templates import DataSourceTemplateIndex
+from ._description_cache import DescriptionCache, DEFAULT_MAX_SIZE as DEFAULT_DESCRIPTION_CACHE_SIZE
 from .compare_types import *
-from ..exceptions import MapLayerError, ChangeDataSourcesError
+from ..exceptions import ChangeDataSourcesError
 from .._json import JsonEnum
 from .._native import singlethreadapartment
 
@@ -43,70 +46,21 @@ else:
     # import all 'public' methods into current namespace
     from ._mapping3 import *
 
+# The cache used when describing documents, see enable_description_cache
+_description_cache = None
 
-def change_data_sources(mxd_or_proj, data_sources):
-    logger = _get_logger()
-
-    logger.debug("Data sources: %s", data_sources)
 
+def change_data_sources(mxd_or_proj, data_sources):
     # we need to keep track of whether this function opened the document or not
     document_was_opened = False
 
     # Ensure document is open before changing data sources
     if not isinstance(mxd_or_proj, Document):
         mxd_or_proj = open_document(mxd_or_proj)
-        document_was_opened = True   
-
-    errors = []
-
-    # match map with data sources
-    for map_frame, map_data_sources in zip_longest(_mh._list_maps(mxd_or_proj), data_sources):
-
-        if not 'layers' in map_data_sources or not 'tables' in map_data_sources:
-            raise ChangeDataSourcesError("Data sources dictionary does not contain both layers and tables keys")
-
-        layers = _mh._list_layers(mxd_or_proj, map_frame)
-        layer_sources = map_data_sources["layers"]
-
-        if layer_sources == None or len(layers) != len(layer_sources):
-            raise ChangeDataSourcesError("Number of layers does not match number of data sources.")
-
-        for layer, layer_source in zip_longest(layers, layer_sources):
-            try:
-                if layer_source == None:
-                    continue
-
-                logger.debug("Layer {0}: Attempting to change workspace path".format(layer.longName))
-                logger.debug("Current data source details: {0}".format(_mh._get_data_source_desc(layer)))
-                _mh._change_data_source(layer, layer_source)
-                logger.debug("Layer {0}: data source updated to: {1}".format(layer.name, layer_source))
+        document_was_opened = True
 
-            #TODO: Handle KeyError and AttributeError for badly written configs
-            except MapLayerError as e:
-                logger.exception("An error occured changing the data source of a map layer.")
-                errors.append(e)
+    _, errors = _change_data_sources(mxd_or_proj, data_sources)
 
-        data_tables = _mh._list_tables(mxd_or_proj, map_frame)
-        data_table_sources = map_data_sources["tables"]
-
-        if not len(data_tables) == len(data_table_sources):
-            raise ChangeDataSourcesError("Number of data tables does not match number of data table data sources.")
-
-        for data_table, data_table_source in zip_longest(data_tables, data_table_sources):
-            try:
-                if data_table_source == None:
-                    continue
-
-                logger.debug("Data Table {0}: Attempting to change workspace path".format(data_table.name))
-                logger.debug("Current data source details: {0}".format(_mh._get_data_source_desc(data_table)))
-                _mh._change_data_source(data_table, data_table_source)
-                logger.debug("Data Table {0}: Workspace path updated to: {1}".format(
-                    data_table.name, data_table_source))
-
-            except MapLayerError as mle:
-                logger.exception("An error occured changing the data source of a table.")
-                errors.append(mle)
-    
     if document_was_opened:
         # delete the variable in accordance with Esri guidelines
         del mxd_or_proj
@@ -122,13 +76,17 @@ def compare(was_mxd_proj_or_desc, now_mxd_proj_or_desc):
     now_description = now_mxd_proj_or_desc if isinstance(now_mxd_proj_or_desc,
                                                          Mapping) else describe(now_mxd_proj_or_desc)
 
+    # counts of the maps/layers compared, and how many of them were skipped because their content was unchanged
+    stats = {"maps": 0, "mapsUnchanged": 0, "layers": 0, "layersUnchanged": 0}
+
     #yapf: disable
     differences = {
         "diff": DocumentChangeTypes.compare(was_description, now_description),
         "maps": [
-            _compare_map_frames(was_frame, now_frame)
+            _compare_map_frames(was_frame, now_frame, stats)
             for was_frame, now_frame in zip_longest(was_description["maps"], now_description["maps"])
-        ]
+        ],
+        "stats": stats
     }
     #yapf: enable
 
@@ -168,27 +126,8 @@ def create_replacement_data_sources_list(mxd_proj_or_desc, data_source_templates
     # ensure we have a description of the map, and not a map itself
     map_desc = mxd_proj_or_desc if isinstance(mxd_proj_or_desc, Mapping) else describe(mxd_proj_or_desc)
 
-    # Here we are rearranging the data_source_templates so that the match criteria can be compared as a set - in case there are more than one.
-    #yapf: disable
-    template_sets = [
-        dict(
-            list(iteritems(template)) + [
-                ("matchCriteria", set(iteritems(lowercase_dict(template["matchCriteria"]))))
-            ]
-        ) for template in data_source_templates
-    ]
-    #yapf: enable
-
-    # freeze values in dict for set comparison
-    def freeze(d):
-        """Freezes dicts and lists for set comparison."""
-        if isinstance(d, dict):
-            # make dictionaries lowercase for comparison
-            d = lowercase_dict(d)
-            return frozenset((key, freeze(value)) for key, value in d.items())
-        elif isinstance(d, list):
-            return tuple(freeze(value) for value in d)
-        return d
+    # compile the templates once, so each layer/table is matched without testing every template
+    template_index = DataSourceTemplateIndex(data_source_templates)
 
     def match_new_data_source(layer_or_table):
         if layer_or_table == None or layer_or_table.get("isGroupLayer") == True:
@@ -196,36 +135,34 @@ def create_replacement_data_sources_list(mxd_proj_or_desc, data_source_templates
             return None
 
         new_conn = None
-        for template in template_sets:
-            # The layer_or_table variable contains properties that can't be put into sets without freezing
-            if template["matchCriteria"].issubset(set(freeze(layer_or_table))):
-                new_conn = template["dataSource"].copy()
+        template = template_index.match(layer_or_table)
+        if template is not None:
+            new_conn = template["dataSource"].copy()
 
-                # Test #2: If the target workspace is a collection of workspaces, infer the target child workspace by using a
-                # deterministic naming convention that maps the layer's dataset name to a workspace.
-                if template.get("matchOptions", {}).get("isWorkspaceContainer") == True:
+            # Test #2: If the target workspace is a collection of workspaces, infer the target child workspace by using a
+            # deterministic naming convention that maps the layer's dataset name to a workspace.
+            if template.get("matchOptions", {}).get("isWorkspaceContainer") == True:
 
-                    _get_logger().debug("Data source template is workspace container.")
+                _get_logger().debug("Data source template is workspace container.")
 
-                    tokens = tokenise_datasource(layer_or_table["dataSource"])
+                tokens = tokenise_datasource(layer_or_table["dataSource"])
 
-                    if tokens is not None:
+                if tokens is not None:
 
-                        _get_logger().debug("Tokens are: %s", tokens)
+                    _get_logger().debug("Tokens are: %s", tokens)
 
-                        if tokens["dataSet"] is not None and tokens["schema"] is not None:
-                            _get_logger().debug(1.11)
-                            new_conn["workspacePath"] = "{}\\{}.{}.gdb".format(new_conn["workspacePath"],
-                                                                               tokens["schema"], tokens["dataSet"])
-                        elif tokens["dataSet"] is not None:
-                            _get_logger().debug(1.12)
-                            new_conn["workspacePath"] = "{}\\{}.gdb".format(new_conn["workspacePath"],
-                                                                            tokens["dataSet"])
-                        else:
-                            _get_logger().debug(1.13)
-                            new_conn["workspacePath"] = "{}\\{}.gdb".format(new_conn["workspacePath"], tokens["table"])
+                    if tokens["dataSet"] is not None and tokens["schema"] is not None:
+                        _get_logger().debug(1.11)
+                        new_conn["workspacePath"] = "{}\\{}.{}.gdb".format(new_conn["workspacePath"],
+                                                                           tokens["schema"], tokens["dataSet"])
+                    elif tokens["dataSet"] is not None:
+                        _get_logger().debug(1.12)
+                        new_conn["workspacePath"] = "{}\\{}.gdb".format(new_conn["workspacePath"],
+                                                                        tokens["dataSet"])
+                    else:
+                        _get_logger().debug(1.13)
+                        new_conn["workspacePath"] = "{}\\{}.gdb".format(new_conn["workspacePath"], tokens["table"])
 
-                break
         if new_conn == None and raise_exception_no_change:
             raise RuntimeError("No matching data source was found for layer")
 
@@ -237,26 +174,73 @@ def create_replacement_data_sources_list(mxd_proj_or_desc, data_source_templates
     } for df in map_desc["maps"]]
 
 
-def describe(mxd_or_proj):
+def describe(mxd_or_proj, use_cache=True):
     """
     Describe a Map Document or ArcGIS Pro project.
 
-    This will only describe the document as saved on disk, it will not include any unsaved changes.
+    This will only describe the document as saved on disk, it will not include any unsaved changes.  If the description
+    cache has been enabled (see enable_description_cache), a cached description is returned for documents that have not
+    changed since they were last described.
 
     :param mxd_proj_or_desc: The map to be validated
     :type mxd_proj_or_desc: arcpy.mapping.MapDocument/arcpy.mapping.ArcGISProject (Python-version depedent) or str (file path)
+    :param use_cache: Whether to use the description cache, if enabled
+    :type use_cache: bool
     :returns: dict describing the object
     """
 
     file_path = mxd_or_proj.filePath if isinstance(mxd_or_proj, Document) else mxd_or_proj
 
-    return _mh._describe_map(file_path)
+    cache = _description_cache if use_cache else None
+    if cache is None:
+        return _build_description(file_path, _mh._iter_describe_map(file_path))
+
+    fingerprint = cache.fingerprint(file_path)
+    description = cache.get(fingerprint)
+
+    if description is None:
+        description = _build_description(file_path, _mh._iter_describe_map(file_path))
+        cache.put(fingerprint, description)
+    else:
+        _get_logger().debug("Using cached description of '%s'.", file_path)
+        # the document may have been cached from a different, but equivalent, path
+        description["filePath"] = file_path
+        # the cached hashes may be from an earlier version of this module, so aren't trusted
+        update_content_hashes(description)
+
+    return description
+
+
+def disable_description_cache():
+    """Stops caching document descriptions.  The cache database is left on disk for later use."""
+    global _description_cache
+    _description_cache = None
+
+
+def enable_description_cache(db_path, max_size=DEFAULT_DESCRIPTION_CACHE_SIZE):
+    """Caches document descriptions on disk, so unchanged documents aren't re-opened to be described.
+
+    Once enabled, describe, compare, is_valid and create_replacement_data_sources_list all reuse cached descriptions.
+    The cache is a SQLite database, and can be shared between processes.  Documents are identified by their path, size,
+    modification time and content hash.
+
+    :param db_path: Path to the cache database, created if it doesn't exist
+    :type db_path: str
+    :param max_size: Maximum size, in bytes, of the cached descriptions before least recently used ones are evicted
+    :type max_size: int
+    :returns: The DescriptionCache in use
+    """
+    global _description_cache
+    _description_cache = DescriptionCache(db_path, max_size)
+    return _description_cache
 
 
 def is_valid(mxd_proj_or_desc):
     """Analyse a map document or ArcGIS Pro Project for broken layers and return a boolean indicating if it is in a
     valid state or not.
 
+    Documents are described incrementally, stopping at the first broken layer or table.
+
     :param mxd_proj_or_desc: The map to be validated
     :type mxd_proj_or_desc: arcpy.mapping.MapDocument/arcpy.mapping.ArcGISProject, description, or str
     :returns: Boolean, True if valid, False if there are one or more broken layers
@@ -265,42 +249,211 @@ def is_valid(mxd_proj_or_desc):
     # get a logger instance
     logger = _get_logger()
 
-    # make sure what we have is a description of the map
+    if isinstance(mxd_proj_or_desc, Mapping):
+        file_path = mxd_proj_or_desc["filePath"]
+        items = _iter_description(mxd_proj_or_desc)
+    else:
+        file_path = mxd_proj_or_desc.filePath if isinstance(mxd_proj_or_desc, Document) else mxd_proj_or_desc
+        items = iter_describe(file_path)
+
+    for item_type, item in items:
+        if item_type != "map" and item["isBroken"]:
+            logger.debug(u"Map '{0}': Broken data source:".format(file_path))
+            logger.debug(u" {0}".format(item["longName"] if "longName" in item else item["name"]))
+            logger.debug(u"  datasource: {0}".format(item["dataSource"]))
+
+            return False
+
+    return True
+
+
+def iter_describe(mxd_or_proj, use_cache=True):
+    """
+    Describe a Map Document or ArcGIS Pro project incrementally, yielding each map, layer and table as it is described.
+
+    Items are yielded as (item_type, item) tuples, where item_type is one of "map", "layer" or "table".  Map items
+    contain the name and spatial reference of the map, and are followed by the layers and tables of that map, which
+    have the same structure as from describe.  Stopping iteration early avoids describing the rest of the document.
+
+    If the description cache is enabled, cached descriptions are iterated from the cache, and a document that is
+    iterated completely is added to the cache.
+
+    :param mxd_or_proj: The map document/project to describe
+    :type mxd_or_proj: arcpy.mapping.MapDocument/arcpy.mapping.ArcGISProject (Python-version depedent) or str (file path)
+    :param use_cache: Whether to use the description cache, if enabled
+    :type use_cache: bool
+    :returns: generator of (item_type, item) tuples
+    """
+
+    file_path = mxd_or_proj.filePath if isinstance(mxd_or_proj, Document) else mxd_or_proj
+
+    cache = _description_cache if use_cache else None
+    if cache is None:
+        for item in _mh._iter_describe_map(file_path):
+            yield item
+        return
+
+    fingerprint = cache.fingerprint(file_path)
+    description = cache.get(fingerprint)
+
+    if description is not None:
+        _get_logger().debug("Using cached description of '%s'.", file_path)
+        for item in _iter_description(description):
+            yield item
+        return
+
+    # keep the items yielded, to cache the description once it is complete
+    items = []
+    for item in _mh._iter_describe_map(file_path):
+        items.append(item)
+        yield item
+
+    cache.put(fingerprint, _build_description(file_path, items))
+
+
+def update_content_hashes(description):
+    """Computes the content hashes of the maps and layers of a description, in place.
+
+    describe adds a 'contentHash' to each map and layer, so compare can skip maps and layers that haven't changed
+    without comparing their contents.  A description that is edited after being described must have its hashes updated,
+    otherwise compare won't report the edits.  Hashes already in the description are replaced.
+
+    :param description: The description to update, as from describe
+    :type description: dict
+    :returns: The description
+    """
+    for map_desc in description["maps"]:
+        for layer_desc in map_desc["layers"]:
+            layer_desc["contentHash"] = compute_layer_content_hash(layer_desc)
+        map_desc["contentHash"] = compute_map_content_hash(map_desc)
+
+    return description
+
+
+def plan_data_source_changes(mxd_proj_or_desc, data_sources):
+    """Plans the changes change_data_sources would make to a map document or ArcGIS Pro Project, without opening it.
+
+    The plan is worked out from the description of the document, so many plans can be validated quickly.  Returns a
+    record for every layer and table:
+
+    .. code-block:: python
+
+        {
+            "map": "Layers",
+            "type": "layer",        # or "table"
+            "index": 0,
+            "name": "Group\\Layer",  # long name for layers
+            "status": "change",     # "skip" if there is no new data source, "invalid" if it can't be changed
+            "current": {...},       # the current data source, see below
+            "planned": {...},       # the data source after the change, None unless the status is "change"
+            "error": None           # why the data source can't be changed, if it can't
+        }
+
+    For map documents, data sources are planned as the workspace path, dataset name (rewritten for the schema and
+    workspace type of the new data source) and workspace type that will be given to arcpy.  For ArcGIS Pro projects,
+    data sources are planned as the connection properties of the layer after the partial update.
+
+    A ChangeDataSourcesError is raised if the data sources don't line up with the maps, layers and tables of the
+    document, as change_data_sources would.
+
+    :param mxd_proj_or_desc: The map document/project to plan changes for
+    :type mxd_proj_or_desc: arcpy.mapping.MapDocument/arcpy.mapping.ArcGISProject, description, or str
+    :param data_sources: The new data sources, as from create_replacement_data_sources_list
+    :type data_sources: list
+    :returns: list of planned change records
+    """
+
     description = mxd_proj_or_desc if isinstance(mxd_proj_or_desc, Mapping) else describe(mxd_proj_or_desc)
 
-    broken_items = []
+    plan = []
+
+    def plan_data_source_change(map_desc, item_type, item, item_source):
+        record = {
+            "map": map_desc["name"],
+            "type": item_type,
+            "index": item["index"],
+            "name": item.get("longName", item["name"]),
+            "status": "skip",
+            "current": None,
+            "planned": None,
+            "error": None
+        }
+        plan.append(record)
 
-    for m in description["maps"]:
-        # iterate layers and tables
-        for i in chain(m["layers"], m["tables"]):
-            if i["isBroken"]:
-                broken_items.append(i)
+        if item_source == None:
+            return
 
-    if len(broken_items) > 0:
-        logger.debug(u"Map '{0}': Broken data sources:".format(description["filePath"]))
-        for layer in broken_items:
-            logger.debug(u" {0}".format(layer["longName"] if "longName" in layer else layer["name"]))
-            logger.debug(u"  datasource: {0}".format(layer["dataSource"]))
+        try:
+            record["current"], record["planned"] = _mh._plan_data_source_change(item, item_source)
+            record["status"] = "change"
+        except ValueError as e:
+            record["status"] = "invalid"
+            record["error"] = str(e)
 
-        return False
+    for map_desc, map_data_sources in zip_longest(description["maps"], data_sources):
 
-    return True
+        if map_desc is None or map_data_sources is None:
+            raise ChangeDataSourcesError("Number of maps does not match number of data sources.")
 
+        if not 'layers' in map_data_sources or not 'tables' in map_data_sources:
+            raise ChangeDataSourcesError("Data sources dictionary does not contain both layers and tables keys")
 
-def _attr_shallow_eq(a, b, attr_key):
-    return b[attr_key] == a[attr_key] if attr_key in a and attr_key in b else False
+        layer_sources = map_data_sources["layers"]
+        if layer_sources == None or len(map_desc["layers"]) != len(layer_sources):
+            raise ChangeDataSourcesError("Number of layers does not match number of data sources.")
+
+        for layer, layer_source in zip(map_desc["layers"], layer_sources):
+            plan_data_source_change(map_desc, "layer", layer, layer_source)
+
+        table_sources = map_data_sources["tables"]
+        if table_sources == None or len(map_desc["tables"]) != len(table_sources):
+            raise ChangeDataSourcesError("Number of data tables does not match number of data table data sources.")
+
+        for table, table_source in zip(map_desc["tables"], table_sources):
+            plan_data_source_change(map_desc, "table", table, table_source)
+
+    return plan
+
+
+def _build_description(file_path, items):
+    """Builds a document description from the (item_type, item) tuples of an incremental description."""
+    description = {"filePath": file_path, "maps": []}
+
+    for item_type, item in items:
+        if item_type == "map":
+            map_desc = dict(item, layers=[], tables=[])
+            description["maps"].append(map_desc)
+        else:
+            map_desc["{}s".format(item_type)].append(item)
+
+    # content hashes let compare skip unchanged maps and layers
+    return update_content_hashes(description)
 
 
 def _attr_deep_eq(a, b, attr_key):
     return _recursive_sort(a[attr_key]) == _recursive_sort(b[attr_key]) if attr_key in a and attr_key in b else False
 
 
-def _match_layers(was_layers, now_layers):
+def _match_layers(was_layers, now_layers, layer_keys=None):
     """Attempts to match layers from one set of layer descriptions to another.
     
     To correlate a layer in map a and map b, we run a series of specificity tests. Tests are ordered from most 
     specific, to least specific. These tests apply a process of elimination methodology to correlate layers between 
-    the two maps
+    the two maps:
+
+     1. same id/name and datasource (unchanged, may match a layer that has already been matched)
+     2. same name and id, datasource changed
+     3. same id and datasource, name changed
+     4. same id
+     5. same name and datasource, id changed
+     6. same name, id/datasource changed
+
+    A layer is matched to the first layer (in map order) that passes any of the tests.  Tests 2 to 6 only consider
+    unmatched layers and all reduce to "same id or same name", so instead of running every test against every pair of
+    layers, the 'was' layers are indexed once and each 'now' layer is resolved with a few dictionary lookups.
+
+    If given, layer_keys is a dictionary of comparison keys (see get_comparison_key) by layer ID, which is filled with
+    the keys computed while matching so they can be reused when comparing the matched layers.
     """
 
     added = []
@@ -310,67 +463,58 @@ def _match_layers(was_layers, now_layers):
     resolved_now = {}
     is_resolved_was = lambda x: x['index'] in resolved_was
     is_resolved_now = lambda x: x['index'] in resolved_now
-    same_id = lambda a, b: _attr_shallow_eq(a, b, 'serviceId')
-    same_name = lambda a, b: _attr_shallow_eq(a, b, 'name')
-    same_datasource = lambda a, b: dictionaries_eq_ignore_case(get_datasource_info(a), get_datasource_info(b))
 
-    tests = [
-        {
-            # same id/name and datasource. Unchanged
-            'fn': lambda a, b: b if same_id(a, b) and same_name(a, b) and same_datasource(a, b) else None,
-            'ignore': True
-        },
-        {
-            # same name and id, datasource changed
-            'fn':
-            lambda a, b: b
-            if same_id(a, b) and same_name(a, b) and not is_resolved_was(a) and not is_resolved_now(b) else None
-        },
-        {
-            # same id and datasource, name changed
-            'fn':
-            lambda a, b: b
-            if same_id(a, b) and same_datasource(a, b) and not is_resolved_was(a) and not is_resolved_now(b) else None
-        },
-        {
-            # same id. Assumed valid if fixed data sources enabled
-            # TODO this should be skipped if we can verify that fixed layer IDs are not used
-            'fn': lambda a, b: b if same_id(a, b) and not is_resolved_was(a) and not is_resolved_now(b) else None
-        },
-        {
-            # same name and datasource, id changed
-            'fn':
-            lambda a, b: b
-            if same_name(a, b) and same_datasource(a, b) and not is_resolved_was(a) and not is_resolved_now(b) else None
-        },
-        {
-            # same name, id/datasource changed
-            'fn': lambda a, b: b if same_name(a, b) and not is_resolved_was(a) and not is_resolved_now(b) else None
-        }
-    ]
+    # index the positions of the 'was' layers, positions are added in map order
+    exact_index = {}
+    id_index = {}
+    name_index = {}
+    for position, was_layer in enumerate(was_layers):
+        if 'serviceId' in was_layer:
+            id_index.setdefault(was_layer['serviceId'], deque()).append(position)
+        if 'name' in was_layer:
+            name_index.setdefault(was_layer['name'], deque()).append(position)
+        if 'serviceId' in was_layer and 'name' in was_layer:
+            exact_key = (was_layer['serviceId'], was_layer['name'],
+                         get_comparison_key(was_layer, "datasource", _get_layer_keys(layer_keys, was_layer)))
+            exact_index.setdefault(exact_key, deque()).append(position)
+
+    def first_unresolved(index, key):
+        positions = index.get(key)
+        if not positions:
+            return None
 
-    def test_if_matching_layer(was_layer, now_layer):
-        for test in tests:
-            matcher = test['fn']
-            match = matcher(was_layer, now_layer)
-            if match is not None:
-                return True
+        # layers never become unresolved, so resolved layers can be discarded from the front of the queue for good
+        while positions and is_resolved_was(was_layers[positions[0]]):
+            positions.popleft()
 
-        return False
+        return positions[0] if positions else None
 
     for now_layer in now_layers:
-        found = False
-
-        # Find A layer that correlates to B layer
-        for was_layer in was_layers:
-            found = test_if_matching_layer(was_layer, now_layer)
-            if found:
-                resolved_was[was_layer['index']] = now_layer
-                resolved_now[now_layer['index']] = was_layer
-                break
-
-        # Added layers
-        if found is False:
+        candidates = []
+
+        # Test 1
+        if 'serviceId' in now_layer and 'name' in now_layer:
+            exact_key = (now_layer['serviceId'], now_layer['name'],
+                         get_comparison_key(now_layer, "datasource", _get_layer_keys(layer_keys, now_layer)))
+            if exact_key in exact_index:
+                candidates.append(exact_index[exact_key][0])
+
+        # Tests 2 to 6
+        if not is_resolved_now(now_layer):
+            if 'serviceId' in now_layer:
+                candidates.append(first_unresolved(id_index, now_layer['serviceId']))
+            if 'name' in now_layer:
+                candidates.append(first_unresolved(name_index, now_layer['name']))
+
+        candidates = [c for c in candidates if c is not None]
+
+        if candidates:
+            # Find A layer that correlates to B layer
+            was_layer = was_layers[min(candidates)]
+            resolved_was[was_layer['index']] = now_layer
+            resolved_now[now_layer['index']] = was_layer
+        else:
+            # Added layers
             resolved_now[now_layer['index']] = None
             added.append(now_layer)
 
@@ -388,38 +532,212 @@ def _match_layers(was_layers, now_layers):
     return (added, matched, removed)
 
 
-def _compare_map_frames(was_map_desc, now_map_desc):
+def _change_data_sources(mxd_or_proj, data_sources):
+    """Changes the data sources of an open document, returning a result record for every layer and table, and a list of
+    the errors encountered.
+
+    Each record describes what happened to a layer/table:
+
+    .. code-block:: python
+
+        {
+            "map": "Layers",
+            "type": "layer",        # or "table"
+            "index": 0,
+            "name": "Group\\Layer",  # long name for layers
+            "status": "changed",    # "skipped" if there was no new data source, "broken" or "failed" if changing failed
+            "oldDataSource": ...,   # as returned by arcpy, a string or connection properties dictionary
+            "newDataSource": {...},
+            "error": None,          # message of the error if changing failed
+            "duration": 0.12,       # seconds taken to change the data source
+            "method": "map"         # "layer" if changed on its own, "map" if changed along with others in its map
+        }
+    """
+    logger = _get_logger()
+
+    logger.debug("Data sources: %s", data_sources)
+
+    records = []
+    errors = []
+
+    def new_record(map_frame, item_type, index, item, item_source):
+        return {
+            "map": map_frame.name,
+            "type": item_type,
+            "index": index,
+            "name": item.longName if hasattr(item, "longName") else item.name,
+            "status": "skipped",
+            "oldDataSource": None,
+            "newDataSource": item_source,
+            "error": None,
+            "duration": None,
+            "method": None
+        }
+
+    # match map with data sources
+    for map_frame, map_data_sources in zip_longest(_mh._list_maps(mxd_or_proj), data_sources):
+
+        if not 'layers' in map_data_sources or not 'tables' in map_data_sources:
+            raise ChangeDataSourcesError("Data sources dictionary does not contain both layers and tables keys")
+
+        layers = _mh._list_layers(mxd_or_proj, map_frame)
+        layer_sources = map_data_sources["layers"]
+
+        if layer_sources == None or len(layers) != len(layer_sources):
+            raise ChangeDataSourcesError("Number of layers does not match number of data sources.")
+
+        data_tables = _mh._list_tables(mxd_or_proj, map_frame)
+        data_table_sources = map_data_sources["tables"]
+
+        if not len(data_tables) == len(data_table_sources):
+            raise ChangeDataSourcesError("Number of data tables does not match number of data table data sources.")
+
+        items = list(zip(layers, layer_sources)) + list(zip(data_tables, data_table_sources))
+        map_records = [new_record(map_frame, "layer", index, layer, layer_source)
+                       for index, (layer, layer_source) in enumerate(zip(layers, layer_sources))]
+        map_records += [new_record(map_frame, "table", index, data_table, data_table_source)
+                        for index, (data_table, data_table_source) in enumerate(zip(data_tables, data_table_sources))]
+        records.extend(map_records)
+
+        # the layers and tables of a map are changed together, so those with the same change can be changed at once
+        results = _mh._change_map_data_sources(map_frame, items)
+
+        for (item, _), record, result in zip(items, map_records, results):
+            if result is None:
+                continue
+
+            record["oldDataSource"] = result["oldDataSource"]
+            record["duration"] = result["duration"]
+            record["method"] = result["method"]
+
+            #TODO: Handle KeyError and AttributeError for badly written configs
+            if result["error"] is not None:
+                e = result["error"]
+                logger.error("An error occured changing the data source of a %s: %s", record["type"], e)
+                errors.append(e)
+                record["status"] = "broken" if getattr(item, "isBroken", False) else "failed"
+                record["error"] = str(e)
+            else:
+                logger.debug("%s %s: data source updated from %s to %s (%s, %.3fs)", record["type"].capitalize(),
+                             record["name"], record["oldDataSource"], record["newDataSource"], record["method"],
+                             record["duration"])
+                record["status"] = "changed"
+
+    return (records, errors)
+
+
+def _compare_map_frames(was_map_desc, now_map_desc, stats=None):
     """
     Compares two arcpy.mapping.DataFrame/arcpy.mp.Map objects for differences.
 
     Intended to be used to compare a historical version of a map with a new version, chiefly to look for changes that
     will impact the API of a map service built from the given map.
+
+    Maps and layers with the same content hash (from describe, or computed here if a description has none) are only
+    compared when their content alone would be reported (e.g. a broken layer, or a layer without a service ID),
+    otherwise they are known to have no differences.
     """
 
+    stats = {"maps": 0, "mapsUnchanged": 0, "layers": 0, "layersUnchanged": 0} if stats is None else stats
     map_differences = {"diff": [], "layers": {"added": [], "updated": [], "removed": []}, "tables": []}
 
     if was_map_desc is None:
         # new map introduced, ignore
         return map_differences
 
+    stats["maps"] += 1
+
+    if (now_map_desc is not None and _is_same_content(get_map_content_hash(was_map_desc),
+                                                      get_map_content_hash(now_map_desc))
+            and _is_self_consistent(now_map_desc["layers"])):
+        # map is unchanged, every layer matches itself with no differences
+        stats["mapsUnchanged"] += 1
+        stats["layers"] += len(now_map_desc["layers"])
+        stats["layersUnchanged"] += len(now_map_desc["layers"])
+        return map_differences
+
     map_differences["diff"] = MapChangeTypes.compare(was_map_desc, now_map_desc)
 
+    # normalized comparison keys of the layers, computed at most once per layer
+    layer_keys = {}
+
     (map_differences["layers"]["added"], matched,
-     map_differences["layers"]["removed"]) = _match_layers(was_map_desc["layers"], now_map_desc["layers"])
+     map_differences["layers"]["removed"]) = _match_layers(was_map_desc["layers"], now_map_desc["layers"], layer_keys)
     for (was_layer, now_layer) in matched:
+        stats["layers"] += 1
+
+        if _is_same_content(get_layer_content_hash(was_layer),
+                            get_layer_content_hash(now_layer)) and _is_layer_self_consistent(now_layer):
+            # layer is unchanged
+            stats["layersUnchanged"] += 1
+            continue
+
+        was_keys = _get_layer_keys(layer_keys, was_layer)
+        now_keys = _get_layer_keys(layer_keys, now_layer)
+
         # make a shallow copy so we don't change the input description
         now_layer = now_layer.copy()
-        now_layer["diff"] = LayerChangeTypes.compare(was_layer, now_layer)
+        now_layer["diff"] = LayerChangeTypes.compare(was_layer, now_layer, was_keys, now_keys)
         if len(now_layer["diff"]) > 0:
             map_differences["layers"]["updated"].append(now_layer)
 
     return map_differences
 
 
+def _get_layer_keys(layer_keys, layer_desc):
+    """Gets the dictionary of comparison keys for a layer, or None if keys are not being kept."""
+    return None if layer_keys is None else layer_keys.setdefault(id(layer_desc), {})
+
+
 def _get_logger():
     return logging.getLogger("arcpyext.mapping")
 
 
+def _is_same_content(was_hash, now_hash):
+    """Tests whether two content hashes show the same content, content that couldn't be hashed is never the same."""
+    return was_hash is not None and was_hash == now_hash
+
+
+def _is_layer_self_consistent(layer_desc):
+    """Tests whether comparing a layer with an identical copy of itself reports no differences."""
+    return layer_desc.get("isBroken") is not True and layer_desc.get("serviceId") is not None
+
+
+def _is_self_consistent(layers):
+    """Tests whether comparing a list of layers with an identical copy of itself reports no differences.
+
+    As well as each layer being self-consistent, no two layers can be exact duplicates, as duplicates are not matched
+    one-to-one by _match_layers.
+    """
+    exact_keys = set()
+
+    for layer in layers:
+        if not _is_layer_self_consistent(layer) or not "name" in layer:
+            return False
+
+        exact_key = (layer["serviceId"], layer["name"], get_datasource_key(layer))
+        if exact_key in exact_keys:
+            return False
+        exact_keys.add(exact_key)
+
+    return True
+
+
+def _iter_description(description):
+    """Iterates an existing document description in the same form as iter_describe.
+
+    Content hashes are only part of complete descriptions, so are left out of the items.
+    """
+    for m in description["maps"]:
+        yield ("map", {k: v for (k, v) in iteritems(m) if k not in ("contentHash", "layers", "tables")})
+
+        for l in m["layers"]:
+            yield ("layer", {k: v for (k, v) in iteritems(l) if k != "contentHash"})
+
+        for t in m["tables"]:
+            yield ("table", t)
+
+
 def _recursive_sort(obj):
     """
     Recursively sort lists/dictionaries for consistent comparison.
@@ -9,6 +9,7 @@ from future.builtins import *
 from future.standard_library import install_aliases
 install_aliases()
 from future.moves.collections import deque
+from future.moves.itertools import count
 from future.utils import viewitems
 # pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
 
@@ -17,6 +18,7 @@ import ctypes
 import logging
 import os.path
 import re
+import time
 
 # Third-party imports
 import arcpy
@@ -24,7 +26,7 @@ import olefile
 
 # Local imports
 from .. import _native as _ao
-from ..exceptions import DataSourceUpdateError
+from ..exceptions import DataSourceUpdateError, MapLayerError
 
 # Put the map document class here so we can access the per-version type in a consistent location across Python versions
 Document = arcpy.mapping.MapDocument
@@ -92,16 +94,7 @@ def _change_data_source(layer, new_layer_source):
                 dataset_name = layer.datasetName
 
         if dataset_name != None:
-            # break apart dataset_name into it's component parts
-            ds_user, ds_name, fc_user, fc_name = _parse_data_source(dataset_name)
-
-            if workspace_type == "FILEGDB_WORKSPACE":
-                # file GDB's don't have schema/users, so if switching to that type, remove schema (if still included)
-                dataset_name = fc_name
-            elif schema != None:
-                dataset_name = "{0}.{1}".format(schema, fc_name)
-
-            kwargs["dataset_name"] = dataset_name
+            kwargs["dataset_name"] = _rewrite_dataset_name(dataset_name, workspace_type, schema)
 
         if workspace_type != None:
             kwargs["workspace_type"] = workspace_type
@@ -116,7 +109,33 @@ def _change_data_source(layer, new_layer_source):
         raise DataSourceUpdateError("Layer is now broken.", layer)
 
 
-def _describe_map(file_path):
+def _change_map_data_sources(map_frame, items):
+    """Changes the data sources of the layers/tables of a map, one at a time.
+
+    Items are (layer or table, new data source) tuples.  Returns a result for each item, None if it has no new data
+    source, otherwise a dictionary of its old data source, the MapLayerError raised changing it (if any), the time
+    taken and the method used ('layer').
+    """
+    results = []
+    for item, new_layer_source in items:
+        if new_layer_source is None:
+            results.append(None)
+            continue
+
+        start_time = time.time()
+        result = {"oldDataSource": None, "error": None, "duration": None, "method": "layer"}
+        try:
+            result["oldDataSource"] = _get_data_source_desc(item)
+            _change_data_source(item, new_layer_source)
+        except MapLayerError as e:
+            result["error"] = e
+        result["duration"] = time.time() - start_time
+        results.append(result)
+
+    return results
+
+
+def _iter_describe_map(file_path):
     with _ao.ComReleaser() as com_releaser:
         # open the MXD in ArcObjects
         ao_map_document = _native_document_open(file_path)
@@ -124,19 +143,15 @@ def _describe_map(file_path):
         # add the ArcObjects document to the com_releaser
         com_releaser.manage_lifetime(ao_map_document)
 
-        # base description layout
-        desc = {"filePath": file_path, "maps": []}
-
-        for map_frame in _native_list_maps(ao_map_document):
-            # add the ArcObjects map frame to the com_releaser
-            com_releaser.manage_lifetime(map_frame)
+        try:
+            for map_frame in _native_list_maps(ao_map_document):
+                # add the ArcObjects map frame to the com_releaser
+                com_releaser.manage_lifetime(map_frame)
 
-            # add the map description to the output object
-            desc["maps"].append(_native_describe_map(ao_map_document, map_frame))
-
-        _native_document_close(ao_map_document)
-
-        return desc
+                for item in _native_iter_describe_map(ao_map_document, map_frame):
+                    yield item
+        finally:
+            _native_document_close(ao_map_document)
 
 
 def _get_data_source_desc(layer_or_table):
@@ -147,6 +162,21 @@ def _get_data_source_desc(layer_or_table):
     return layer_or_table.dataSource
 
 
+def _get_dataset_path(layer_or_table_desc):
+    """Gets the path of a layer/table's dataset relative to its workspace (e.g. 'FDS\\FC'), from its description."""
+    data_source = layer_or_table_desc.get("dataSource")
+    if not data_source:
+        return layer_or_table_desc.get("datasetName")
+
+    # the workspace is the last part of the path that is a database, or the containing folder for file-based data
+    parts = data_source.split("\\")
+    for i in range(len(parts) - 1, 0, -1):
+        if os.path.splitext(parts[i - 1])[1].lower() in (".gdb", ".mdb", ".sde"):
+            return "\\".join(parts[i:])
+
+    return parts[-1]
+
+
 def _get_logger():
     return logging.getLogger("arcpyext.mapping")
 
@@ -254,33 +284,22 @@ def _native_describe_layer(layer_parts):
     return layer_details
 
 
-def _native_describe_map(map_document, map_frame):
+def _native_iter_describe_map(map_document, map_frame):
     # make the map frame active before getting details about it.
     _native_make_map_frame_active_view(map_frame)
 
-    map_desc = {
+    yield ("map", {
         "name": map_frame.Name,
         "spatialReference": _get_spatial_ref(_native_get_map_spatial_ref_code(map_document,
-                                                                              map_frame)).exportToString(),
-        "layers": [],
-        "tables": []
-    }
+                                                                              map_frame)).exportToString()
+    })
 
-    # ensure we release the layers we get
-    with _ao.ComReleaser() as com_releaser:
-        for l in _native_list_layers(map_document, map_frame):
-            for (k, v) in viewitems(l):
-                # add each item to the COM releaser
-                com_releaser.manage_lifetime(v)
-            map_desc["layers"].append(_native_describe_layer(l))
+    # layers and tables are released by the iterators once they have been described
+    for l in _native_iter_layers(map_document, map_frame):
+        yield ("layer", _native_describe_layer(l))
 
-        for t in _native_list_tables(map_document, map_frame):
-            for (k, v) in viewitems(t):
-                # add each item to the COM releaser
-                com_releaser.manage_lifetime(v)
-            map_desc["tables"].append(_native_describe_table(t))
-
-    return map_desc
+    for t in _native_iter_tables(map_document, map_frame):
+        yield ("table", _native_describe_table(t))
 
 
 def _native_describe_table(table_parts):
@@ -423,20 +442,22 @@ def _native_get_service_layer_property_value(service_layer_extensions, property_
     return service_layer_id
 
 
-def _native_list_layers(map_document, map_frame):
-    """Recursively iterates through a map frame to get all layers, building up parent relationships as it goes."""
+def _native_iter_layers(map_document, map_frame):
+    """Recursively iterates through a map frame to get all layers, building up parent relationships as it goes.
+
+    The ArcObjects interfaces of each layer are released once the layer and all of its children have been iterated, so
+    only the current layer and its ancestors are held at any one time."""
 
     # get the ArcObjects types we need
     import ESRI.ArcGIS.Geodatabase as esriGeoDatabase
     import ESRI.ArcGIS.Carto as esriCarto
     import ESRI.ArcGIS.NetworkAnalyst as esriNetworkAnalyst
 
-    # list of all layers that we'll be returning
-    layers = []
+    # map index will be the count of layers built so far
+    layer_index = count()
 
-    def build_layer_parts(map_layer):
+    def build_layer_parts(map_layer, parent_parts):
         layer_parts = {
-            "children": [],
             "dataset": None,
             "dataLayer": _ao.cast_obj(map_layer, esriCarto.IDataLayer2),
             "layer": _ao.cast_obj(map_layer, esriCarto.ILayer2),
@@ -444,11 +465,11 @@ def _native_list_layers(map_document, map_frame):
             "featureLayer": _ao.cast_obj(map_layer, esriCarto.IFeatureLayer),
             "featureLayerDefinition": _ao.cast_obj(map_layer, esriCarto.IFeatureLayerDefinition2),
             "groupLayer": _ao.cast_obj(map_layer, esriCarto.IGroupLayer),
-            "index": len(layers),  # map index will be the same as the current length of this array
+            "index": next(layer_index),
             "imageServerLayer": _ao.cast_obj(map_layer, esriCarto.IImageServerLayer),
             "mapServerLayer": _ao.cast_obj(map_layer, esriCarto.IMapServerLayer),
             "networkAnalystLayer": _ao.cast_obj(map_layer, esriNetworkAnalyst.INALayer),
-            "parent": None,
+            "parent": parent_parts,
             "rasterLayer": _ao.cast_obj(map_layer, esriCarto.IRasterLayer),
             "serverLayerExtensions": None
         }
@@ -470,44 +491,46 @@ def _native_list_layers(map_document, map_frame):
                             for i in range(0, layer_extensions.get_ExtensionCount())) if sle is not None
         ]
 
-        layers.append(layer_parts)
-
         return layer_parts
 
-    def get_child_layers(layer_parts, parent_parts):
-        # Set parent
-        layer_parts["parent"] = parent_parts
+    def iter_layer_tree(map_layer, parent_parts):
+        with _ao.ComReleaser() as com_releaser:
+            layer_parts = build_layer_parts(map_layer, parent_parts)
+            for (k, v) in viewitems(layer_parts):
+                if k != "parent":
+                    # add each item to the COM releaser, the parent is released by its own iteration
+                    com_releaser.manage_lifetime(v)
 
-        if not bool(layer_parts["groupLayer"]):
-            # layer is not a group layer, ignore
-            return
+            yield layer_parts
 
-        # layer is a group layer, cast to ICompositeLayer to get access to child layers
-        composite_layer = _ao.cast_obj(layer_parts["layer"], esriCarto.ICompositeLayer)
-        for i in range(0, composite_layer.Count):
-            # get child layer
-            child_layer = _ao.cast_obj(composite_layer.get_Layer(i), esriCarto.ILayer2)
+            if not bool(layer_parts["groupLayer"]):
+                # layer is not a group layer, no children
+                return
 
-            # get child layer parts
-            child_layer_parts = build_layer_parts(child_layer)
+            # layer is a group layer, cast to ICompositeLayer to get access to child layers
+            composite_layer = _ao.cast_obj(layer_parts["layer"], esriCarto.ICompositeLayer)
+            com_releaser.manage_lifetime(composite_layer)
 
-            # add child_layer_parts to the list of children for the current layer
-            layer_parts["children"].append(child_layer_parts)
+            for i in range(0, composite_layer.Count):
+                # get child layer
+                child_layer = _ao.cast_obj(composite_layer.get_Layer(i), esriCarto.ILayer2)
 
-            # recursively find children
-            get_child_layers(child_layer_parts, layer_parts)
+                # recursively iterate the child and its children
+                for child_layer_parts in iter_layer_tree(child_layer, layer_parts):
+                    yield child_layer_parts
 
     # iterate through the top level of layers
-    map_layer_iterator = map_frame.get_Layers(None, False)
-    map_layer_iterator = _ao.cast_obj(map_layer_iterator, esriCarto.IEnumLayer)
-    map_layer = map_layer_iterator.Next()
-    while (map_layer):
-        layer_parts = build_layer_parts(map_layer)
-        get_child_layers(layer_parts, None)
+    with _ao.ComReleaser() as com_releaser:
+        map_layer_iterator = map_frame.get_Layers(None, False)
+        map_layer_iterator = _ao.cast_obj(map_layer_iterator, esriCarto.IEnumLayer)
+        com_releaser.manage_lifetime(map_layer_iterator)
 
         map_layer = map_layer_iterator.Next()
+        while (map_layer):
+            for layer_parts in iter_layer_tree(map_layer, None):
+                yield layer_parts
 
-    return layers
+            map_layer = map_layer_iterator.Next()
 
 
 def _native_list_maps(map_document):
@@ -523,20 +546,17 @@ def _native_list_maps(map_document):
     return [_ao.cast_obj(map_document.get_Map(i), esriCarto.IMap) for i in range(0, map_document.MapCount)]
 
 
-def _native_list_tables(map_document, map_frame):
-    """Iterates through a map frame to get all tables."""
+def _native_iter_tables(map_document, map_frame):
+    """Iterates through a map frame to get all tables, releasing each table once it has been iterated."""
 
     # get the ArcObjects types we need
     import ESRI.ArcGIS.Carto as esriCarto
     import ESRI.ArcGIS.Geodatabase as esriGeoDatabase
 
-    # list of all tables
-    tables = []
-
-    def build_table_parts(standalone_table):
+    def build_table_parts(standalone_table, index):
         table_parts = {
             "dataLayer": _ao.cast_obj(standalone_table, esriCarto.IDataLayer2),
-            "index": len(tables),  # map index will be the same as the current length of this array
+            "index": index,
             "standaloneTable": standalone_table,
             "standaloneTableDataset": _ao.cast_obj(standalone_table, esriGeoDatabase.IDataset),
             "standaloneTableDefinition": _ao.cast_obj(standalone_table, esriCarto.ITableDefinition),
@@ -553,8 +573,6 @@ def _native_list_tables(map_document, map_frame):
                             for i in range(0, table_extensions.get_ExtensionCount())) if sle is not None
         ]
 
-        tables.append(table_parts)
-
         return table_parts
 
     # cast map to a standalone table collection to get access to tables
@@ -562,10 +580,14 @@ def _native_list_tables(map_document, map_frame):
 
     # iterate the table collection
     for i in range(0, table_collection.StandaloneTableCount):
-        table = _ao.cast_obj(table_collection.get_StandaloneTable(i), esriCarto.IStandaloneTable)
-        build_table_parts(table)
+        with _ao.ComReleaser() as com_releaser:
+            table = _ao.cast_obj(table_collection.get_StandaloneTable(i), esriCarto.IStandaloneTable)
+            table_parts = build_table_parts(table, i)
+            for (k, v) in viewitems(table_parts):
+                # add each item to the COM releaser
+                com_releaser.manage_lifetime(v)
 
-    return tables
+            yield table_parts
 
 
 def _native_get_map_spatial_ref_code(map_document, map_frame):
@@ -630,6 +652,43 @@ def _native_make_map_frame_active_view(map_frame):
     active_view.Activate(window_handle)
 
 
+def _plan_data_source_change(layer_or_table_desc, new_layer_source):
+    """Plans the change of a layer/table data source from its description, mirroring _change_data_source.
+
+    Returns a tuple of the current and planned data source, raising a ValueError if the data source can't be changed.
+    """
+    workspace_path = new_layer_source.get("workspacePath")
+    dataset_name = new_layer_source.get("datasetName")
+    workspace_type = new_layer_source.get("workspaceType")
+    schema = new_layer_source.get("schema")
+
+    if workspace_path == None:
+        raise ValueError("New data source does not have a workspace path.")
+
+    if layer_or_table_desc.get("isGroupLayer") or layer_or_table_desc.get("dataSource") == None:
+        raise ValueError("Layer does not support changing its data source.")
+
+    current_dataset_name = _get_dataset_path(layer_or_table_desc)
+    current = {
+        "dataSource": layer_or_table_desc["dataSource"],
+        "datasetName": current_dataset_name,
+        "workspaceType": layer_or_table_desc.get("datasetType")
+    }
+
+    if dataset_name == None and workspace_type == None and schema == None:
+        # the whole workspace path is replaced, keeping the dataset
+        return (current, {"workspacePath": workspace_path, "datasetName": current_dataset_name, "workspaceType": None})
+
+    if dataset_name == None:
+        dataset_name = current_dataset_name
+
+    return (current, {
+        "workspacePath": workspace_path,
+        "datasetName": _rewrite_dataset_name(dataset_name, workspace_type, schema),
+        "workspaceType": workspace_type
+    })
+
+
 def _parse_data_source(data_source):
     """Takes a string describing a data source and returns a four-part tuple describing the dataset username, dataset
     name, feature class username and feature class name"""
@@ -650,3 +709,18 @@ def _parse_data_source(data_source):
     r = r.groupdict()
 
     return (r.get("ds_user"), r.get("ds_name"), r.get("fc_user"), r.get("fc_name"))
+
+
+def _rewrite_dataset_name(dataset_name, workspace_type, schema):
+    """Rewrites a dataset name for the workspace type and schema of a new data source."""
+
+    # break apart dataset_name into it's component parts
+    ds_user, ds_name, fc_user, fc_name = _parse_data_source(dataset_name)
+
+    if workspace_type == "FILEGDB_WORKSPACE":
+        # file GDB's don't have schema/users, so if switching to that type, remove schema (if still included)
+        return fc_name
+    elif schema != None:
+        return "{0}.{1}".format(schema, fc_name)
+
+    return dataset_name
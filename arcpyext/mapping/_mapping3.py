@@ -14,6 +14,7 @@ install_aliases()
 import collections
 import logging
 import re
+import time
 import zipfile
 
 # Third-party imports
@@ -21,8 +22,9 @@ import arcpy
 
 # Local imports
 from ._cim import ProProject
+from ._compare_helpers import lowercase_value
 from .. import _native as _prosdk
-from ..exceptions import DataSourceUpdateError
+from ..exceptions import DataSourceUpdateError, MapLayerError
 
 
 # Put the map document class here so we can access the per-version type in a consistent location across Python versions
@@ -41,23 +43,15 @@ def open_document(project):
     return arcpy.mp.ArcGISProject(project)
 
 
-def _change_data_source(layer, new_props):
+def _change_data_source(layer, new_props, conn_props=None):
     try:
+        # reading connection properties is expensive, use them if they've already been read
+        if conn_props is None:
+            conn_props = layer.connectionProperties
+
         # updating of connection properties should always be assumed to be partial updates
         # must build dictionaries of partial attributes in order to update
-        def get_matching_existing_conn_props(original, new):
-            matched_conn_props = {}
-
-            for k in new:
-                if k in layer.connectionProperties:
-                    if isinstance(layer.connectionProperties[k], collections.Mapping) and isinstance(new_props[k], collections.Mapping):
-                        matched_conn_props[k] = get_matching_existing_conn_props(layer.connectionProperties[k], new_props[k])
-                    else:
-                        matched_conn_props[k] = layer.connectionProperties[k]
-            
-            return matched_conn_props
-
-        matched_conn_props = get_matching_existing_conn_props(layer.connectionProperties, new_props)       
+        matched_conn_props = _get_matching_conn_props(conn_props, new_props)
 
         layer.updateConnectionProperties(matched_conn_props, new_props)
 
@@ -68,24 +62,195 @@ def _change_data_source(layer, new_props):
         raise DataSourceUpdateError("Layer is now broken.", layer)
 
 
-def _describe_map(file_path):
+def _change_map_data_sources(map_frame, items):
+    """Changes the data sources of the layers/tables of a map.
+
+    Items are (layer or table, new connection properties) tuples, for every layer and table in the map.  Returns a
+    result for each item, None if it has no new connection properties, otherwise a dictionary of its old connection
+    properties, the MapLayerError raised changing it (if any), the time taken and the method used ('map' or 'layer').
+
+    Each layer/table's connection properties are read once.  Layers/tables changing from the same connection properties
+    to the same new connection properties are changed together by the map's updateConnectionProperties, as long as no
+    other layer/table in the map matches those connection properties, before or after its own change.  Otherwise,
+    layers/tables are changed one at a time.  A layer/table whose connection properties can't be read gets a
+    DataSourceUpdateError in its result and is left out of any group.
+    """
+    logger = _get_logger()
+    results = [None] * len(items)
+    conn_props = {}
+    groups = collections.OrderedDict()
+
+    conn_props_errors = {}
+
+    def get_conn_props(i):
+        if i in conn_props_errors:
+            raise conn_props_errors[i]
+        if i not in conn_props:
+            item = items[i][0]
+            try:
+                supported = item.supports("CONNECTIONPROPERTIES") if hasattr(item, "supports") else True
+                conn_props[i] = item.connectionProperties if supported else None
+            except Exception as e:
+                conn_props_errors[i] = e
+                raise
+        return conn_props[i]
+
+    # read the connection properties of each layer/table being changed, and group them by change
+    for i, (item, new_props) in enumerate(items):
+        if new_props is None:
+            continue
+
+        start_time = time.time()
+        try:
+            get_conn_props(i)
+        except Exception as e:
+            # a layer/table that can't be read is recorded on its own, without stopping the rest of the map
+            results[i] = {
+                "oldDataSource": None,
+                "error": DataSourceUpdateError("Exception raised internally by ArcPy", item, e),
+                "duration": time.time() - start_time,
+                "method": "layer"
+            }
+            continue
+        results[i] = {"oldDataSource": conn_props[i], "error": None, "duration": None, "method": "layer"}
+        results[i]["duration"] = time.time() - start_time
+
+        matched_conn_props = _get_matching_conn_props(conn_props[i], new_props) if conn_props[i] else None
+        key = (_freeze_conn_props(matched_conn_props), _freeze_conn_props(new_props)) if matched_conn_props else i
+        groups.setdefault(key, (matched_conn_props, new_props, []))[2].append(i)
+
+    def matches_elsewhere(matched_conn_props, indexes):
+        """Checks whether layers/tables outside a group would be changed along with it, now or after their change."""
+        for j in range(len(items)):
+            if j in indexes:
+                continue
+            try:
+                other_conn_props = get_conn_props(j)
+            except Exception:
+                # can't tell whether it would be changed too, so don't change the group at map level
+                return True
+            if not other_conn_props:
+                continue
+            if _conn_props_match(other_conn_props, matched_conn_props):
+                return True
+            if items[j][1] is not None and _conn_props_match(_merge_conn_props(other_conn_props, items[j][1]),
+                                                             matched_conn_props):
+                return True
+        return False
+
+    map_count = 0
+    start_time = time.time()
+    for matched_conn_props, new_props, indexes in groups.values():
+        map_failed = False
+        if len(indexes) > 1 and not matches_elsewhere(matched_conn_props, set(indexes)):
+            change_start_time = time.time()
+            try:
+                map_frame.updateConnectionProperties(matched_conn_props, new_props)
+            except Exception:
+                logger.warning("Changing %s layers/tables of map %s at once failed, changing them one at a time.",
+                               len(indexes), map_frame.name, exc_info=True)
+                map_failed = True
+            else:
+                # share the time taken between the layers/tables changed
+                duration = (time.time() - change_start_time) / len(indexes)
+                for i in indexes:
+                    results[i]["method"] = "map"
+                    results[i]["duration"] += duration
+                    if getattr(items[i][0], "isBroken", False):
+                        results[i]["error"] = DataSourceUpdateError("Layer is now broken.", items[i][0])
+                map_count += len(indexes)
+                continue
+
+        for i in indexes:
+            change_start_time = time.time()
+            try:
+                # a failed map level change may have changed some of the layers/tables, so read them again
+                _change_data_source(items[i][0], new_props, None if map_failed else conn_props[i])
+            except MapLayerError as e:
+                results[i]["error"] = e
+            results[i]["duration"] += time.time() - change_start_time
+            logger.debug("%s: data source changed in %.3fs", items[i][0].name, results[i]["duration"])
+
+    changed_count = sum(1 for r in results if r is not None)
+    logger.debug("Changed %s layers/tables of map %s in %.2fs, %s at once and %s one at a time", changed_count,
+                 map_frame.name, time.time() - start_time, map_count, changed_count - map_count)
+
+    return results
+
+
+def _conn_props_match(conn_props, matched_conn_props):
+    """Checks whether connection properties contain the matched connection properties, ignoring case."""
+    for k, v in matched_conn_props.items():
+        if k not in conn_props:
+            return False
+        if isinstance(v, collections.Mapping) and isinstance(conn_props[k], collections.Mapping):
+            if not _conn_props_match(conn_props[k], v):
+                return False
+        elif lowercase_value(conn_props[k]) != lowercase_value(v):
+            return False
+    return True
+
+
+def _freeze_conn_props(conn_props):
+    """Converts (nested) connection properties to a hashable form."""
+    if isinstance(conn_props, collections.Mapping):
+        return tuple(sorted((k, _freeze_conn_props(v)) for k, v in conn_props.items()))
+    return conn_props
+
+
+def _iter_describe_map(file_path):
     ao_map_document = _native_document_open(file_path)
 
     try:
-        # build return object
-        return {
-            "filePath": file_path,
-            "maps":
-            [_native_describe_map(ao_map_document, map_frame) for map_frame in _native_list_maps(ao_map_document)]
-        }
+        for map_frame in _native_list_maps(ao_map_document):
+            for item in _native_iter_describe_map(ao_map_document, map_frame):
+                yield item
     finally:
         _native_document_close(ao_map_document)
 
 
+def _get_conn_props_from_desc(layer_or_table_desc):
+    """Rebuilds the connection properties of a layer/table from its description."""
+    conn_info = {
+        k: layer_or_table_desc.get(desc_key)
+        for (k, desc_key) in (("database", "database"), ("server", "server"), ("instance", "service"),
+                              ("user", "userName")) if layer_or_table_desc.get(desc_key) is not None
+    }
+
+    conn_props = {
+        k: layer_or_table_desc.get(desc_key)
+        for (k, desc_key) in (("dataset", "datasetName"), ("workspace_factory", "datasetType"))
+        if layer_or_table_desc.get(desc_key) is not None
+    }
+
+    if conn_info:
+        conn_props["connection_info"] = conn_info
+
+    return conn_props
+
+
 def _get_data_source_desc(layer_or_table):
     return layer_or_table.connectionProperties
 
 
+def _get_matching_conn_props(original, new):
+    """Gets the subset of the original connection properties that have keys in the new connection properties."""
+    matched_conn_props = {}
+
+    for k in new:
+        if k in original:
+            if isinstance(original[k], collections.Mapping) and isinstance(new[k], collections.Mapping):
+                matched_conn_props[k] = _get_matching_conn_props(original[k], new[k])
+            else:
+                matched_conn_props[k] = original[k]
+
+    return matched_conn_props
+
+
+def _get_logger():
+    return logging.getLogger("arcpyext.mapping")
+
+
 def _list_maps(proj):
     return proj.listMaps()
 
@@ -201,14 +366,17 @@ def _native_describe_layer(layer_parts):
     return layer_details
 
 
-def _native_describe_map(pro_proj, map_frame):
-
-    return {
+def _native_iter_describe_map(pro_proj, map_frame):
+    yield ("map", {
         "name": map_frame["arcpy"].name,
-        "spatialReference": map_frame["prosdk"].spatial_reference.exportToString(),
-        "layers": [_native_describe_layer(l) for l in _native_list_layers(pro_proj, map_frame)],
-        "tables": [_native_describe_table(t) for t in _native_list_tables(pro_proj, map_frame)]
-    }
+        "spatialReference": map_frame["prosdk"].spatial_reference.exportToString()
+    })
+
+    for l in _native_iter_layers(pro_proj, map_frame):
+        yield ("layer", _native_describe_layer(l))
+
+    for t in _native_iter_tables(pro_proj, map_frame):
+        yield ("table", _native_describe_table(t))
 
 
 def _native_describe_table(table_parts):
@@ -235,39 +403,63 @@ def _native_describe_table(table_parts):
     return table_details
 
 
-def _native_list_layers(pro_proj, map_frame):
+def _native_iter_layers(pro_proj, map_frame):
     arcpy_layers = map_frame["arcpy"].listLayers()
     prosdk_layers = map_frame["prosdk"].layers
 
     if not len(arcpy_layers) == len(prosdk_layers):
         raise ValueError("The number of layers from arcpy and from the ArcGIS Pro SDK are not the same.")
 
-    layers = []
-
     for index, (arcpy_layer, prosdk_layer) in enumerate(zip(arcpy_layers, prosdk_layers)):
         if not arcpy_layer.name == prosdk_layer.name:
             raise ValueError(
                 "Map from arcpy and map from ArcGIS Pro SDK do not have the same name, order likely not correct.")
 
-        layers.append({"index": index, "arcpy": arcpy_layer, "prosdk": prosdk_layer})
-
-    return layers
+        yield {"index": index, "arcpy": arcpy_layer, "prosdk": prosdk_layer}
 
 
-def _native_list_tables(pro_proj, map_frame):
+def _native_iter_tables(pro_proj, map_frame):
     arcpy_tables = map_frame["arcpy"].listTables()
     prosdk_tables = map_frame["prosdk"].tables
 
     if not len(arcpy_tables) == len(prosdk_tables):
         raise ValueError("The number of layers from arcpy and from the ArcGIS Pro SDK are not the same.")
 
-    tables = []
-
     for index, (arcpy_table, prosdk_table) in enumerate(zip(arcpy_tables, prosdk_tables)):
         if not arcpy_table.name == prosdk_table.name:
             raise ValueError(
                 "Map from arcpy and map from ArcGIS Pro SDK do not have the same name, order likely not correct.")
 
-        tables.append({"index": index, "arcpy": arcpy_table, "prosdk": prosdk_table})
+        yield {"index": index, "arcpy": arcpy_table, "prosdk": prosdk_table}
+
+
+def _merge_conn_props(original, new):
+    """Merges new connection properties into the original connection properties, as a partial update."""
+    merged_conn_props = dict(original)
+
+    for k in new:
+        if k in original and isinstance(original[k], collections.Mapping) and isinstance(new[k], collections.Mapping):
+            merged_conn_props[k] = _merge_conn_props(original[k], new[k])
+        else:
+            merged_conn_props[k] = new[k]
+
+    return merged_conn_props
+
+
+def _plan_data_source_change(layer_or_table_desc, new_props):
+    """Plans the change of a layer/table data source from its description, mirroring _change_data_source.
+
+    Returns a tuple of the current and planned connection properties, raising a ValueError if the data source can't be
+    changed.
+    """
+    if layer_or_table_desc.get("isGroupLayer"):
+        raise ValueError("Layer does not support changing its data source.")
+
+    current_conn_props = _get_conn_props_from_desc(layer_or_table_desc)
+    if not current_conn_props:
+        raise ValueError("Layer does not have connection properties.")
+
+    if not _get_matching_conn_props(current_conn_props, new_props):
+        raise ValueError("No existing connection properties match the new connection properties.")
 
-    return tables
\ No newline at end of file
+    return (current_conn_props, _merge_conn_props(current_conn_props, new_props))
@@ -21,14 +21,30 @@ from .._json import JsonEnum
 
 class _ChangeTypesBase(JsonEnum):
     @classmethod
-    def compare(cls, was_desc_part, now_desc_part):
+    def compare(cls, was_desc_part, now_desc_part, was_keys=None, now_keys=None):
+        """Compares two parts of a description, returning a list of the changes found.
+
+        Change types with a comparison key test the normalized keys of the description parts (see get_comparison_key),
+        with the values of the change only got for reporting when a change is found.  Keys are stored in the was_keys/
+        now_keys dictionaries, which can be given so keys are shared between comparisons of the same description part.
+        """
         differences = []
+        was_keys = {} if was_keys is None else was_keys
+        now_keys = {} if now_keys is None else now_keys
 
         for change in cls:
-            was_value = change.value.get_value(was_desc_part)
-            now_value = change.value.get_value(now_desc_part)
-
-            if change.value.test(was_value, now_value):
+            if change.value.key is None:
+                was_value = change.value.get_value(was_desc_part)
+                now_value = change.value.get_value(now_desc_part)
+                changed = change.value.test(was_value, now_value)
+            else:
+                changed = change.value.test(get_comparison_key(was_desc_part, change.value.key, was_keys),
+                                            get_comparison_key(now_desc_part, change.value.key, now_keys))
+                if changed:
+                    was_value = change.value.get_value(was_desc_part)
+                    now_value = change.value.get_value(now_desc_part)
+
+            if changed:
                 differences.append(MapDocChange(change, was_value, now_value))
                 if change.value.skip_remainder:
                     # skip all remaining tests
@@ -56,15 +72,21 @@ class ChangeType(object):
     def severity(self):
         return self._severity
 
+    @property
+    def key(self):
+        """The name of the comparison key tested, or None if the values are tested."""
+        return self._key
+
     @property
     def skip_remainder(self):
         return self._skip_remainder
 
-    def __init__(self, change_id, name, severity, get_value, test, skip_remainder=False):
+    def __init__(self, change_id, name, severity, get_value, test, skip_remainder=False, key=None):
         self._id = change_id
         self._name = name
         self._severity = severity
         self._skip_remainder = skip_remainder
+        self._key = key
         self.get_value = get_value
         self.test = test
 
@@ -129,21 +151,29 @@ class LayerChangeTypes(_ChangeTypesBase):
                              skip_remainder=True)
     LAYER_NAME_CHANGED = ChangeType(402, "Layer: Name Changed",
                                     ChangeSeverity.WARNING, lambda layer_desc: layer_desc.get("name", ""), operator.ne)
-    LAYER_DATASOURCE_CHANGED = ChangeType(403, "Layer: Datasource Changed",
-                                          ChangeSeverity.WARNING, lambda layer_desc: get_datasource_info(
-                                              layer_desc), lambda a, b: not dictionaries_eq_ignore_case(a, b))
+    LAYER_DATASOURCE_CHANGED = ChangeType(403,
+                                          "Layer: Datasource Changed",
+                                          ChangeSeverity.WARNING,
+                                          get_datasource_info,
+                                          operator.ne,
+                                          key="datasource")
     LAYER_VISIBILITY_CHANGED = ChangeType(404, "Layer: Visibility Changed",
                                           ChangeSeverity.WARNING, lambda layer_desc: layer_desc["visible"], operator.ne)
 
     LAYER_ID_CHANGED = ChangeType(401, "Layer: Service ID Changed",
                                   ChangeSeverity.ERROR, lambda layer_desc: layer_desc["serviceId"], operator.ne)
-    LAYER_FIELDS_ADDED = ChangeType(
-        408, "Layer: Fields Added",
-        ChangeSeverity.INFO, lambda layer_desc: get_fields_compare_info(layer_desc["fields"] or []), lambda was_fields,
-        now_fields: is_superset(now_fields, was_fields) and not is_superset(was_fields, now_fields))
-    LAYER_FIELDS_REMOVED = ChangeType(
-        409, "Layer: Fields Removed", ChangeSeverity.ERROR, lambda layer_desc: get_fields_compare_info(layer_desc[
-            "fields"] or []), lambda was_fields, now_fields: not is_superset(now_fields, was_fields))
+    LAYER_FIELDS_ADDED = ChangeType(408,
+                                    "Layer: Fields Added",
+                                    ChangeSeverity.INFO,
+                                    lambda layer_desc: get_fields_compare_info(layer_desc["fields"] or []),
+                                    operator.lt,
+                                    key="fields")
+    LAYER_FIELDS_REMOVED = ChangeType(409,
+                                      "Layer: Fields Removed",
+                                      ChangeSeverity.ERROR,
+                                      lambda layer_desc: get_fields_compare_info(layer_desc["fields"] or []),
+                                      lambda was_fields, now_fields: not was_fields <= now_fields,
+                                      key="fields")
     LAYER_DEFINITION_QUERY_CHANGED = ChangeType(
         406, "Layer: Definition Query Changed",
         ChangeSeverity.WARNING, lambda layer_desc: layer_desc["definitionQuery"], operator.ne)
@@ -189,3 +219,24 @@ class MapDocChange(object):
 
     def _to_jsonable(self):
         return {"type": self.type, "was": self.was, "now": self.now}
+
+
+# Normalized keys that change types can compare on, computed from a description part
+COMPARISON_KEYS = {
+    # the data source info, as a tuple ignoring case
+    "datasource": get_datasource_key,
+    # the visible fields, as a set of (name, type) tuples, so set operations can be used to compare them
+    "fields": lambda layer_desc: get_fields_key(layer_desc["fields"] or [])
+}
+
+
+def get_comparison_key(desc_part, key, keys=None):
+    """Gets a normalized comparison key of a description part, storing it in the keys dictionary (if given) so it is
+    only computed once."""
+    if keys is None:
+        return COMPARISON_KEYS[key](desc_part)
+
+    if key not in keys:
+        keys[key] = COMPARISON_KEYS[key](desc_part)
+
+    return keys[key]
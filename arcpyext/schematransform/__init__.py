@@ -1 +1,2 @@
-from ._schematransform import to_json, to_gdb, to_xml
\ No newline at end of file
+from ._schematransform import format_plan, plan_gdb, to_json, to_gdb, to_xml
+from ._schema_diff import apply_diff, diff
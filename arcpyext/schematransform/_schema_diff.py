@@ -0,0 +1,297 @@
+# coding=utf-8
+"""This module contains functions for comparing JSON gdb schemas, and applying their differences to a geodatabase."""
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+from future.utils import string_types
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+import io
+import json
+import time
+
+import arcpy
+
+from ._schematransform import (CODED_VALUE, DOMAIN, FEATURE_CLASS, OUTPUT_GDB, RANGE, RELATIONSHIP, TABLE,
+                               _add_fields, _add_global_ids, _add_indices, _add_r, _get_logger, _index_schema,
+                               _is_index_added, _json_to_domain, _json_type_to_gdb_type, _run_phase)
+
+# Field properties compared between schemas ('editable' can't be set, so isn't compared)
+FIELD_PROPERTIES = ['aliasName', 'type', 'domain', 'length', 'nullable', 'precision', 'scale', 'required',
+                    'defaultValue']
+
+# Dataset properties that can't be altered in place
+DATASET_PROPERTIES = ['type', 'geometryType', 'geometryField', 'sr']
+
+# Field properties that can't be altered in place
+FIXED_FIELD_PROPERTIES = ['precision', 'scale', 'required']
+
+# Field properties that can only be altered in place in an empty table
+EMPTY_TABLE_FIELD_PROPERTIES = ['type', 'length', 'nullable']
+
+
+def diff(old_json, new_json):
+    """
+    Compare two JSON gdb schema representations (file paths or loaded schemas)
+
+    Returns the differences as a dictionary of 'domains', 'datasets' (tables and feature classes) and 'relationships',
+    each with lists of the elements 'added', 'removed' and 'altered'.  Names are compared ignoring case, as they are in a
+    geodatabase.  Altered domains and relationships record their 'old' and 'new' definitions; altered datasets record
+    their fields and indexes 'added', 'removed' and 'altered' (with 'old' and 'new' definitions), and the 'old' and
+    'new' values of any properties that can't be altered in place (e.g. the geometry type).
+
+    The differences are JSON serialisable, so can be saved, reviewed and applied later (see apply_diff).
+    """
+
+    old = _index_schema(_load_schema(old_json))
+    new = _index_schema(_load_schema(new_json))
+
+    return {
+        'domains': _diff_elements(old[DOMAIN], new[DOMAIN], _diff_whole),
+        'datasets': _diff_elements(old[TABLE] + old[FEATURE_CLASS], new[TABLE] + new[FEATURE_CLASS], _diff_dataset),
+        'relationships': _diff_elements(old[RELATIONSHIP], new[RELATIONSHIP], _diff_whole)
+    }
+
+
+def apply_diff(gdb, diff):
+    """
+    Apply the differences between two JSON gdb schemas (from diff) to an existing geodatabase
+
+    Only the operations needed are run, in an order that keeps the geodatabase consistent: altered and removed
+    relationships are deleted; domains are added and altered; datasets are removed, altered (indexes removed, fields
+    deleted, altered and added, then indexes added) and added; relationships are added; and finally removed domains are
+    deleted.  Differences that can't be applied in place (e.g. a domain's field type, a dataset's geometry type, a
+    field's precision, or a field's type in a table with rows) are found before anything is changed, raising a
+    ValueError.
+
+    Returns a description of each operation run.
+    """
+
+    _get_logger().info("Apply schema differences to '{0}'...".format(gdb))
+    start_time = time.time()
+
+    if not arcpy.Exists(gdb):
+        raise IOError("Geodatabase not found")
+
+    _check_diff(gdb, diff)
+
+    arcpy.env.workspace = gdb
+    operations = []
+
+    def run(description, func, *args, **kwargs):
+        _get_logger().info(description)
+        func(*args, **kwargs)
+        operations.append(description)
+
+    relationships = diff['relationships']
+    for x in relationships['removed'] + [a['old'] for a in relationships['altered']]:
+        run("Delete relationship {0}".format(x['name']), arcpy.Delete_management, gdb + '/' + x['name'])
+
+    for x in diff['domains']['added']:
+        run("Add domain {0}".format(x['name']), _json_to_domain, OUTPUT_GDB, gdb, x)
+    for a in diff['domains']['altered']:
+        run("Alter domain {0}".format(a['name']), _alter_domain, gdb, a['old'], a['new'])
+
+    datasets = diff['datasets']
+    for x in datasets['removed']:
+        run("Delete {0} {1}".format(x['type'], x['name']), arcpy.Delete_management, gdb + '/' + x['name'])
+
+    for a in datasets['altered']:
+        _apply_dataset_diff(gdb, a, run)
+
+    for x in datasets['added']:
+        run("Add {0} {1}".format(x['type'], x['name']), _json_to_dataset_complete, gdb, x)
+
+    for x in relationships['added'] + [a['new'] for a in relationships['altered']]:
+        run("Add relationship {0}".format(x['name']), _add_r, gdb, x)
+
+    for x in diff['domains']['removed']:
+        run("Delete domain {0}".format(x['name']), arcpy.DeleteDomain_management, gdb, x['name'])
+
+    _get_logger().info("Applied {0} operations in {1:.2f} sec.".format(len(operations), time.time() - start_time))
+
+    return operations
+
+
+###############################################################################
+# PRIVATE FUNCTIONS
+###############################################################################
+def _load_schema(schema):
+    if isinstance(schema, string_types):
+        with io.open(schema, encoding="utf-8") as f:
+            return json.load(f)
+    return schema
+
+
+def _diff_elements(old, new, diff_element):
+    old_by_name = dict((x['name'].lower(), x) for x in old)
+    new_by_name = dict((x['name'].lower(), x) for x in new)
+
+    altered = []
+    for x in new:
+        old_x = old_by_name.get(x['name'].lower())
+        if old_x is not None:
+            changes = diff_element(old_x, x)
+            if changes:
+                altered.append(changes)
+
+    return {
+        'added': [x for x in new if x['name'].lower() not in old_by_name],
+        'removed': [x for x in old if x['name'].lower() not in new_by_name],
+        'altered': altered
+    }
+
+
+def _diff_whole(old, new):
+    if old == new:
+        return None
+    return {'name': new['name'], 'old': old, 'new': new}
+
+
+def _diff_field(old, new):
+    if all(old.get(p) == new.get(p) for p in FIELD_PROPERTIES):
+        return None
+    return {'name': new['name'], 'old': old, 'new': new}
+
+
+def _diff_index(old, new):
+    def key(i):
+        return ([f['name'].lower() for f in i['fields']], i['unique'], i['ascending'])
+
+    if key(old) == key(new):
+        return None
+    return {'name': new['name'], 'old': old, 'new': new}
+
+
+def _diff_dataset(old, new):
+    changes = {
+        'name': new['name'],
+        'type': new['type'],
+        'fields': _diff_elements(old['fields'], new['fields'], _diff_field),
+        'indexes': _diff_elements([i for i in old['indexes'] if _is_index_added(i)],
+                                  [i for i in new['indexes'] if _is_index_added(i)], _diff_index)
+    }
+
+    properties = [p for p in DATASET_PROPERTIES if old.get(p) != new.get(p)]
+    if properties:
+        changes['old'] = dict((p, old.get(p)) for p in properties)
+        changes['new'] = dict((p, new.get(p)) for p in properties)
+
+    if properties or any(changes[k][c] for k in ('fields', 'indexes') for c in ('added', 'removed', 'altered')):
+        return changes
+    return None
+
+
+def _check_diff(gdb, diff):
+    """Checks that the differences can all be applied in place, before any are applied."""
+    for a in diff['domains']['altered']:
+        if a['old']['subType'] != a['new']['subType'] or a['old']['fieldType'] != a['new']['fieldType']:
+            raise ValueError("The type of domain '{0}' can't be altered in place.".format(a['name']))
+
+    for a in diff['datasets']['altered']:
+        if 'new' in a:
+            raise ValueError("The {0} of '{1}' can't be altered in place.".format(", ".join(sorted(a['new'])),
+                                                                                  a['name']))
+
+        for c in a['fields']['altered']:
+            properties = [p for p in FIXED_FIELD_PROPERTIES if c['old'].get(p) != c['new'].get(p)]
+            if properties:
+                raise ValueError("The {0} of field '{1}.{2}' can't be altered in place.".format(
+                    ", ".join(properties), a['name'], c['name']))
+
+    # AlterField fails on a table with rows, so check the tables last, once the differences are known to be valid
+    for a in diff['datasets']['altered']:
+        for c in a['fields']['altered']:
+            properties = [p for p in EMPTY_TABLE_FIELD_PROPERTIES if c['old'].get(p) != c['new'].get(p)]
+            if properties and int(arcpy.GetCount_management(gdb + '/' + a['name']).getOutput(0)) > 0:
+                raise ValueError("The {0} of field '{1}.{2}' can't be altered in place, as the table has rows.".format(
+                    ", ".join(properties), a['name'], c['name']))
+
+
+def _alter_domain(gdb, old, new):
+    if old.get('description') != new.get('description') and hasattr(arcpy, "AlterDomain_management"):
+        arcpy.AlterDomain_management(gdb, new['name'], new_domain_description=new['description'])
+
+    if new['subType'] == CODED_VALUE:
+        old_values = dict((kv['k'], kv['v']) for kv in old.get('values', []))
+        new_values = dict((kv['k'], kv['v']) for kv in new.get('values', []))
+
+        # codes with a new description are deleted and added again
+        deleted_codes = [k for k in old_values if new_values.get(k) != old_values[k]]
+        if deleted_codes:
+            arcpy.DeleteCodedValueFromDomain_management(gdb, new['name'], deleted_codes)
+        for kv in new.get('values', []):
+            if old_values.get(kv['k']) != kv['v']:
+                arcpy.AddCodedValueToDomain_management(gdb, new['name'], kv['k'], kv['v'])
+
+    elif new['subType'] == RANGE and (old.get('min'), old.get('max')) != (new.get('min'), new.get('max')):
+        arcpy.SetValueForRangeDomain_management(gdb, new['name'], new['min'], new['max'])
+
+
+def _apply_dataset_diff(gdb, a, run):
+    in_table = gdb + '/' + a['name']
+    fields = a['fields']
+    indexes = a['indexes']
+
+    removed_indexes = [i['name'] for i in indexes['removed']] + [c['old']['name'] for c in indexes['altered']]
+    if removed_indexes:
+        run("Remove indexes from {0}: {1}".format(a['name'], ", ".join(removed_indexes)), arcpy.RemoveIndex_management,
+            in_table, removed_indexes)
+
+    if fields['removed']:
+        names = [f['name'] for f in fields['removed']]
+        run("Delete fields from {0}: {1}".format(a['name'], ", ".join(names)), arcpy.DeleteField_management, in_table,
+            names)
+
+    for c in fields['altered']:
+        run("Alter field {0}.{1}".format(a['name'], c['name']), _alter_field, in_table, c['old'], c['new'])
+
+    if fields['added']:
+        x = {'name': a['name'], 'fields': fields['added']}
+        run("Add fields to {0}: {1}".format(a['name'], ", ".join(f['name'] for f in fields['added'])), _add_fields,
+            OUTPUT_GDB, gdb, x)
+        global_ids = [f['name'] for f in fields['added'] if _json_type_to_gdb_type(f['type']) == 'GLOBALID']
+        if global_ids:
+            run("Add global IDs to {0}: {1}".format(a['name'], ", ".join(global_ids)), _add_global_ids, gdb, [x])
+
+    added_indexes = indexes['added'] + [c['new'] for c in indexes['altered']]
+    if added_indexes:
+        run("Add indexes to {0}: {1}".format(a['name'], ", ".join(i['name'] for i in added_indexes)), _add_indices,
+            OUTPUT_GDB, gdb, {'name': a['name'], 'indexes': added_indexes})
+
+
+def _alter_field(in_table, old, new):
+    # AlterField can change the type, length and nullability of fields in empty tables only (see _check_diff)
+    kwargs = {}
+    if old.get('aliasName') != new.get('aliasName'):
+        kwargs['new_field_alias'] = new['aliasName']
+    if old.get('type') != new.get('type'):
+        kwargs['field_type'] = _json_type_to_gdb_type(new['type'])
+    if old.get('length') != new.get('length'):
+        kwargs['field_length'] = new['length']
+    if old.get('nullable') != new.get('nullable'):
+        kwargs['field_is_nullable'] = 'NULLABLE' if new['nullable'] else 'NON_NULLABLE'
+    if kwargs:
+        arcpy.AlterField_management(in_table, new['name'], **kwargs)
+
+    if old.get('domain') != new.get('domain'):
+        if new.get('domain'):
+            arcpy.AssignDomainToField_management(in_table, new['name'], new['domain'])
+        else:
+            arcpy.RemoveDomainFromField_management(in_table, new['name'])
+
+    if old.get('defaultValue') != new.get('defaultValue'):
+        if new.get('defaultValue') is not None:
+            arcpy.AssignDefaultToField_management(in_table, new['name'], new['defaultValue'])
+        else:
+            arcpy.AssignDefaultToField_management(in_table, new['name'], None, clear_value=True)
+
+
+def _json_to_dataset_complete(gdb, x):
+    for phase in ("Tables", "Global IDs", "Indexes"):
+        _run_phase(gdb, phase, [{'element': x}])
@@ -9,13 +9,20 @@ from future.standard_library import install_aliases
 install_aliases()
 # pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
 
+import collections
+import contextlib
 import io
+import itertools
 import json
 import logging
+import multiprocessing
 import os
 import shutil
 import sys
+import tempfile
 import time
+from xml.sax.saxutils import XMLGenerator
+from xml.sax.xmlreader import AttributesImpl
 
 import arcpy
 
@@ -25,10 +32,21 @@ FEATURE_CLASS = "FeatureClass"
 RELATIONSHIP = "RelationshipClass"
 DOMAIN = "Domain"
 CODED_VALUE = "CodedValue"
-RANGE = "CodedValue"
+RANGE = "Range"
 
 OUTPUT_GDB = 1
-OUTPUT_XML = 2
+
+XML_NAMESPACES = {
+    "xmlns:esri": "http://www.esri.com/schemas/ArcGIS/10.3",
+    "xmlns:xsi": "http://www.w3.org/2001/XMLSchema-instance",
+    "xmlns:xs": "http://www.w3.org/2001/XMLSchema"
+}
+
+# Phases a geodatabase is built in, in order
+GDB_PHASES = ["Domains", "Tables", "Global IDs", "Bind domains", "Indexes", "Relationships"]
+
+# Field types that can be added to a table, other types (e.g. OID, Geometry, GlobalID) are created by other means
+GDB_FIELD_TYPES = ['TEXT', 'FLOAT', 'DOUBLE', 'SHORT', 'LONG', 'DATE', 'BLOB', 'RASTER', 'GUID']
 
 
 def trace(method):
@@ -48,12 +66,27 @@ def trace(method):
 
     return timed
 
-def to_json(in_gdb, out_file):
+@contextlib.contextmanager
+def _trace_phase(timings, name):
+    """Times a phase of a transform, logging it and recording its duration in timings."""
+    _get_logger().info(name)
+    ts = time.time()
+    yield
+    timings[name] = time.time() - ts
+    _get_logger().debug("Phase %r %2.2f sec" % (name, timings[name]))
+
+def to_json(in_gdb, out_file, workers=1):
     """
     Convert GDB into a JSON gdb schema representation.
 
     The JSON file can can be used as an intermediate file from which schema changes can be performed and from which
     new File GDB or XML Workspaces versions can be generated.
+
+    Each table, feature class and relationship class is described once, by a pool of worker processes when there is
+    more than one worker, and written to the output file as soon as it is described (in the order they are listed).
+    Spatial reference strings, often shared by many feature classes, are written once to a 'spatialReferences' list,
+    which feature classes refer to by their 'srId' (earlier versions wrote the string to each feature class's 'sr',
+    which is still read).
     """
 
     _get_logger().info("Transform GDB schema to JSON, from '{0}' to '{1}'...".format(in_gdb, out_file))
@@ -65,113 +98,134 @@ def to_json(in_gdb, out_file):
 
     _get_logger().info("Profiling source gdb...")
     domains = arcpy.da.ListDomains(in_gdb)
-    datasets = [c for c in arcpy.Describe(in_gdb).children]
-    tables = [c for c in datasets if c.dataType == TABLE]
-    fcs = [c for c in datasets if c.dataType == FEATURE_CLASS]
-    rs =  [c for c in datasets if c.dataType == RELATIONSHIP]
+    tasks = _list_datasets(in_gdb)
 
     _get_logger().info("Exporting...")
+    srs = collections.OrderedDict()
     with io.open(out_file, "w", encoding = "utf-8") as f:
+        f.write('{\n    "schema": [')
 
-        domains = list(map(lambda x: _domain_to_json(x), domains))
-        fcs = list(map(lambda x: _fc_to_json(x), fcs))
-        tables = list(map(lambda x: _t_to_json(x), tables))
-        rs = list(map(lambda x: _r_to_json(x), rs))
+        count = 0
+        for x in itertools.chain((_domain_to_json(d) for d in domains), _imap(_dataset_to_json, tasks, workers)):
+            if 'sr' in x:
+                x['srId'] = srs.setdefault(x.pop('sr'), len(srs))
+            f.write(("," if count else "") + "\n" + _json_dumps_indented(x, 8))
+            count += 1
 
-        _json_to_file(f,  {
-            'schema': domains + fcs + tables + rs
-        })
+        f.write('\n    ],\n    "spatialReferences": ' + _json_dumps_indented(list(srs), 4).lstrip() + '\n}')
 
-    _get_logger().info("Transform done.")
+    _get_logger().info("Transform done, {0} elements and {1} spatial references.".format(count, len(srs)))
 
-def to_gdb(in_file, out_gdb):
+def to_gdb(in_file, out_gdb, staging_workspace=None, workers=1, dry_run=False):
     """
     Convert a JSON gdb schema representation into a file/sde geodatabase
+
+    The schema is indexed by element type in a single pass, and planned as a graph of operations (see plan_gdb), which
+    are run in phases: domains, tables/feature classes, global IDs, domain bindings, indexes and relationships.  Tables
+    and feature classes are created directly in the output geodatabase, with their fields added in one batch per table
+    where possible (see _add_fields).  If a staging workspace (e.g. 'in_memory') is given, tables are built there first
+    and copied to the output geodatabase instead.
+
+    With more than one worker, domains are created in the output geodatabase, then each table/feature class is built
+    (along with its global IDs, domain bindings and indexes) by a pool of worker processes, each in its own scratch copy
+    of the output geodatabase.  Tables are copied into the output geodatabase as they are built, then relationships are
+    created.
+
+    With dry_run, nothing is built: the plan is logged (see format_plan) and returned instead.
+
+    Returns the time taken by each phase, in seconds, keyed on the phase name, along with the total 'duration', or the
+    plan (from plan_gdb) with dry_run.
     """
 
-    _get_logger().info("Transform JSOB to GDB, from '{0}' to '{1}'...".format(in_file, out_gdb))
+    _get_logger().info("Transform JSON to GDB, from '{0}' to '{1}'...".format(in_file, out_gdb))
+    start_time = time.time()
+    timings = collections.OrderedDict()
 
     if not arcpy.Exists(in_file):
         _get_logger().debug("Input file: {0}".format(in_file))
         raise IOError("Input file not found")
 
+    with _trace_phase(timings, "Parse JSON"):
+        plan = plan_gdb(in_file, staging_workspace)
+
+    if dry_run:
+        _get_logger().info("Plan for '{0}':\n{1}".format(out_gdb, format_plan(plan)))
+        return plan
+
     if arcpy.Exists(out_gdb):
         shutil.rmtree(out_gdb, ignore_errors = False)
 
-    _get_logger().info("Creating output File GDB...")
-    out_gdb_mem = "in_memory"
-    arcpy.env.workspace = out_gdb
-    out_path = os.path.dirname(out_gdb)
-    out_name = os.path.basename(out_gdb)
-    arcpy.CreateFileGDB_management(out_path, out_name)
+    with _trace_phase(timings, "Create GDB"):
+        arcpy.env.workspace = out_gdb
+        out_path = os.path.dirname(out_gdb)
+        out_name = os.path.basename(out_gdb)
+        arcpy.CreateFileGDB_management(out_path, out_name)
 
-    with open(in_file) as f:
+    nodes_by_phase = collections.OrderedDict((phase, []) for phase in GDB_PHASES)
+    for node in plan:
+        nodes_by_phase[node['phase']].append(node)
 
-        _get_logger().info("Parsing json")
-        schema = json.load(f, encoding = "utf-8")
+    if workers > 1 and len(nodes_by_phase["Tables"]) > 1:
+        with _trace_phase(timings, "Domains"):
+            _run_phase(out_gdb, "Domains", nodes_by_phase["Domains"], staging_workspace)
 
-        # Domains
-        _get_logger().info("Domains")
-        for x in schema['schema']:
-            if x['type'] == DOMAIN:
-                _json_to_domain(OUTPUT_GDB, out_gdb, x)
-
-        # Enable in-memory mode
-        arcpy.env.workspace = out_gdb_mem
-
-        # Tables
-        _get_logger().info("Tables")
-        for x in schema['schema']:
-            if x['type'] == TABLE:
-                _json_to_t(OUTPUT_GDB, out_gdb_mem, x)
-            elif x['type'] == FEATURE_CLASS:
-                _json_to_fc(OUTPUT_GDB, out_gdb_mem, x)
-
-        # Move tables from memory to disk
-        for x in schema['schema']:
-            if x['type'] == TABLE:
-                _t_from_memory_to_disk(out_gdb_mem, out_gdb, x)
-            elif x['type'] == FEATURE_CLASS:
-                _fc_from_memory_to_disk(out_gdb_mem, out_gdb, x)
-
-        # Disable in-memory mode
-        arcpy.env.workspace = out_gdb
+        with _trace_phase(timings, "Tables"):
+            _build_datasets_parallel(out_gdb, plan, staging_workspace, workers)
 
-        # Add global ID columns (not supported by in-memory workspaces)
-        _get_logger().info("Global Ids'")
-        for x in schema['schema']:
-            if x['type'] == TABLE or x['type'] == FEATURE_CLASS:
-                _add_global_id(out_gdb, x)
+        with _trace_phase(timings, "Relationships"):
+            _run_phase(out_gdb, "Relationships", nodes_by_phase["Relationships"], staging_workspace)
+    else:
+        for phase, nodes in nodes_by_phase.items():
+            if phase == "Bind domains" and not staging_workspace:
+                continue
+            with _trace_phase(timings, phase):
+                _run_phase(out_gdb, phase, nodes, staging_workspace)
 
-        # Add global ID columns (not supported by in-memory workspaces)
-        _get_logger().info("Bind domains")
-        for x in schema['schema']:
-            if x['type'] == TABLE or x['type'] == FEATURE_CLASS:
-                _bind_domain(out_gdb, x)
-
-        # Indexes
-        _get_logger().info("Indexes")
-        for x in schema['schema']:
-            if x['type'] == TABLE or x['type'] == FEATURE_CLASS:
-                _add_indices(OUTPUT_GDB, out_gdb, x)
-
-        # Relationships
-        _get_logger().info("Relationships")
-        for x in schema['schema']:
-            if x['type'] == RELATIONSHIP:
-                _add_r(out_gdb, x)
+    timings["duration"] = time.time() - start_time
+    _get_logger().info("Transform done in {0:.2f} sec.".format(timings["duration"]))
 
-    _get_logger().info("Transform done.")
+    return timings
+
+def plan_gdb(in_file, staging_workspace=None):
+    """
+    Plan the operations that build a geodatabase from a JSON gdb schema representation
+
+    Returns a list of operations, each a dictionary of its 'id', 'phase' (see GDB_PHASES), 'name' (of the schema
+    element), 'dependsOn' (the ids of the operations it must follow) and 'level'.  Operations on the same level don't
+    depend on each other, and can run concurrently.  Tables depend on the domains their fields use; global IDs, domain
+    bindings (only when staging) and indexes on their table, in that order; and relationships on both their tables.
+    """
+
+    with io.open(in_file, encoding = "utf-8") as f:
+        schema = _index_schema(json.load(f))
+
+    return _plan_schema(schema, staging_workspace)
+
+def format_plan(plan):
+    """Formats a plan (from plan_gdb) for display, one operation per line, grouped by level."""
+    lines = []
+    level = None
+    for node in sorted(plan, key = lambda n: n['level']):
+        if node['level'] != level:
+            level = node['level']
+            lines.append("Level {0}:".format(level))
+        line = "    {0}".format(node['id'])
+        if node['dependsOn']:
+            line += " (after {0})".format(", ".join(node['dependsOn']))
+        lines.append(line)
+
+    return "\n".join(lines)
 
 def to_xml(in_file, out_file):
     """
     Convert JSON gdb schema into an XML Workspace
 
-    Status: Incomplete. I've only been able to successfully output domains and tables (without indexes, which have 
-    broken run-time). I choose to use string templates for now given how verbose the xml libraries are to use.
+    The XML is streamed to the output file as the schema is walked, one element at a time, so memory use doesn't grow
+    with the size of the output.  Domains, tables, feature classes (with their spatial references), indexes and
+    relationships are written.
     """
 
-    _get_logger().info("Transform JSON to XML Workspace, from '{0}'' to '{1}'...")
+    _get_logger().info("Transform JSON to XML Workspace, from '{0}' to '{1}'...".format(in_file, out_file))
 
     if not arcpy.Exists(in_file):
         _get_logger().error("Input file not found: {0}".format(in_file))
@@ -180,51 +234,41 @@ def to_xml(in_file, out_file):
     if arcpy.Exists(out_file):
         os.remove(out_file)
 
-    _get_logger().info("Creating output xml workspace")
-    with open(in_file) as f:
-
+    with io.open(in_file, encoding = "utf-8") as f:
         _get_logger().info("Parsing json")
-        schema = json.load(f, encoding = "utf-8")
+        schema = _index_schema(json.load(f))
 
-        with io.open(out_file, 'w', encoding = "utf-8") as fo:
+    domains = dict((x['name'], x) for x in schema[DOMAIN])
 
-            _xml_to_file(
-                fo,
-                """<?xml version="1.0" encoding="UTF-8"?>
-                    <esri:Workspace xmlns:esri='http://www.esri.com/schemas/ArcGIS/10.3' xmlns:xsi='http://www.w3.org/2001/XMLSchema-instance' xmlns:xs='http://www.w3.org/2001/XMLSchema'>
-                        <WorkspaceDefinition xsi:type='esri:WorkspaceDefinition'>
-                        <WorkspaceType>esriLocalDatabaseWorkspace</WorkspaceType>
-                        <Version></Version>"""
-            )
+    _get_logger().info("Creating output xml workspace")
+    with io.open(out_file, 'wb') as fo:
+        w = _XmlWriter(fo)
+        w.start_document()
+        w.start("esri:Workspace", attrs = XML_NAMESPACES)
+        w.start("WorkspaceDefinition", "esri:WorkspaceDefinition")
+        w.element("WorkspaceType", "esriLocalDatabaseWorkspace")
+        w.element("Version", "")
 
-            # Domains
-            _get_logger().info("Domains")
-            _xml_to_file(fo, """<Domains xsi:type='esri:ArrayOfDomain'>""")
-            for x in schema['schema']:
-                if x['type'] == DOMAIN:
-                    res = _json_to_domain(OUTPUT_XML, None, x)
-                    _xml_to_file(fo, res)
-
-            _xml_to_file(fo, """</Domains>""")
-
-            # Tables
-            _xml_to_file(fo, """<DatasetDefinitions xsi:type='esri:ArrayOfDataElement'>""")
-            _get_logger().info("Tables")
-            for x in schema['schema']:
-                if x['type'] == TABLE:
-                    res = _json_to_t(OUTPUT_XML, None, x)
-                    _xml_to_file(fo, res)
-                # elif x['type'] == FEATURE_CLASS:
-                #     _json_to_fc(OUTPUT_XML, None, x)
-            _xml_to_file(fo, """</DatasetDefinitions>""")
-
-            _xml_to_file(
-                fo,
-                """</WorkspaceDefinition>
-                   <WorkspaceData xsi:type='esri:WorkspaceData'></WorkspaceData>
-                </esri:Workspace>"""
-            )
+        _get_logger().info("Domains")
+        w.start("Domains", "esri:ArrayOfDomain")
+        for x in schema[DOMAIN]:
+            _domain_to_xml(w, x)
+        w.end("Domains")
+
+        _get_logger().info("Datasets")
+        w.start("DatasetDefinitions", "esri:ArrayOfDataElement")
+        for dsid, x in enumerate(schema[TABLE] + schema[FEATURE_CLASS] + schema[RELATIONSHIP], 1):
+            if x['type'] == RELATIONSHIP:
+                _r_to_xml(w, x, dsid)
+            else:
+                _dataset_to_xml(w, x, dsid, domains)
+        w.end("DatasetDefinitions")
 
+        w.end("WorkspaceDefinition")
+        w.start("WorkspaceData", "esri:WorkspaceData")
+        w.end("WorkspaceData")
+        w.end("esri:Workspace")
+        w.end_document()
 
     _get_logger().info("Transform done.")
 
@@ -237,18 +281,266 @@ def _get_logger():
 #----------------
 # To XML methods
 #----------------
-def _xml_to_file(f, o):
-    try: 
-        f.write(unicode(o))
-    except:
-        f.write(str(o))
+class _XmlWriter(object):
+    """Writes XML elements as they are started and ended, indenting them, without building a document in memory."""
+
+    def __init__(self, f):
+        self._generator = XMLGenerator(f, "utf-8")
+        self._depth = 0
+        self._has_children = False
+
+    def start_document(self):
+        self._generator.startDocument()
+
+    def end_document(self):
+        self._generator.ignorableWhitespace("\n")
+        self._generator.endDocument()
+
+    def start(self, name, xsi_type = None, attrs = None):
+        attrs = dict(attrs or {})
+        if xsi_type:
+            attrs["xsi:type"] = xsi_type
+        if self._depth:
+            self._generator.ignorableWhitespace("\n" + "  " * self._depth)
+        self._generator.startElement(name, AttributesImpl(attrs))
+        self._depth += 1
+        self._has_children = False
+
+    def end(self, name):
+        self._depth -= 1
+        if self._has_children:
+            self._generator.ignorableWhitespace("\n" + "  " * self._depth)
+        self._generator.endElement(name)
+        self._has_children = True
+
+    def element(self, name, text, xsi_type = None):
+        self.start(name, xsi_type)
+        if text is not None:
+            self._generator.characters(_xml_text(text))
+        self._depth -= 1
+        self._generator.endElement(name)
+        self._has_children = True
+
+    def names(self, name, values):
+        self.start(name, "esri:Names")
+        for v in values:
+            self.element("Name", v)
+        self.end(name)
+
+def _xml_text(v):
+    if isinstance(v, bool):
+        return 'true' if v else 'false'
+    return "{0}".format(v)
+
+def _domain_to_xml(w, x):
+    coded = x['subType'] == CODED_VALUE
+    value_type = "xs:" + _json_type_to_xml_attr_type(x['fieldType'])
+
+    w.start("Domain", "esri:CodedValueDomain" if coded else "esri:RangeDomain")
+    w.element("DomainName", x['name'])
+    w.element("FieldType", _json_type_to_xml_type(x['fieldType']))
+    w.element("MergePolicy", "esriMPTDefaultValue")
+    w.element("SplitPolicy", "esriSPTDefaultValue")
+    w.element("Description", x.get('description') or "")
+    w.element("Owner", "")
+
+    if coded:
+        w.start("CodedValues", "esri:ArrayOfCodedValue")
+        for kv in x.get('values', []):
+            w.start("CodedValue", "esri:CodedValue")
+            w.element("Name", kv['v'])
+            w.element("Code", kv['k'], value_type)
+            w.end("CodedValue")
+        w.end("CodedValues")
+    else:
+        w.element("MaxValue", x.get('max'), value_type)
+        w.element("MinValue", x.get('min'), value_type)
+
+    w.end("Domain")
+
+def _sr_to_xml(w, sr_string):
+    # spatial references are exported as their WKT, followed by their tolerances and resolutions
+    wkt = (sr_string or "").split(";")[0]
+    if wkt.startswith("PROJCS"):
+        sr_type = "esri:ProjectedCoordinateSystem"
+    elif wkt.startswith("GEOGCS"):
+        sr_type = "esri:GeographicCoordinateSystem"
+    else:
+        sr_type = "esri:UnknownCoordinateSystem"
+
+    w.start("SpatialReference", sr_type)
+    if wkt:
+        w.element("WKT", wkt)
+    w.end("SpatialReference")
+
+def _field_to_xml(w, f, domains, x = None):
+    w.start("Field", "esri:Field")
+    w.element("Name", f['name'])
+    w.element("Type", _json_type_to_xml_type(f['type']))
+    w.element("IsNullable", bool(f['nullable']))
+    w.element("Length", f['length'])
+    w.element("Precision", f['precision'] or 0)
+    w.element("Scale", f['scale'] or 0)
+    if f['required']:
+        w.element("Required", True)
+    if not f['editable']:
+        w.element("Editable", False)
+    if f['type'] == 'Geometry' and x is not None:
+        w.start("GeometryDef", "esri:GeometryDef")
+        w.element("AvgNumPoints", 0)
+        w.element("GeometryType", _json_geometry_type_to_xml_type(x.get('geometryType')))
+        w.element("HasM", False)
+        w.element("HasZ", False)
+        _sr_to_xml(w, x.get('sr'))
+        w.end("GeometryDef")
+    if f['domain'] in domains:
+        _domain_to_xml(w, domains[f['domain']])
+    w.element("AliasName", f['aliasName'])
+    w.element("ModelName", f['name'])
+    w.end("Field")
+
+def _dataset_to_xml(w, x, dsid, domains):
+    is_fc = x['type'] == FEATURE_CLASS
+    oid_field = next((f['name'] for f in x['fields'] if f['type'] == 'OID'), "")
+    global_id_field = next((f['name'] for f in x['fields'] if f['type'] == 'GlobalID'), "")
+
+    w.start("DataElement", "esri:DEFeatureClass" if is_fc else "esri:DETable")
+    w.element("CatalogPath", "/{0}={1}".format("FC" if is_fc else "OC", x['name']))
+    w.element("Name", x['name'])
+    w.element("MetadataRetrieved", False)
+    w.element("DatasetType", "esriDTFeatureClass" if is_fc else "esriDTTable")
+    w.element("DSID", dsid)
+    w.element("Versioned", False)
+    w.element("CanVersion", False)
+    w.element("ConfigurationKeyword", "")
+    w.element("HasOID", bool(oid_field))
+    w.element("OIDFieldName", oid_field)
+
+    w.start("Fields", "esri:Fields")
+    w.start("FieldArray", "esri:ArrayOfField")
+    for f in x['fields']:
+        _field_to_xml(w, f, domains, x)
+    w.end("FieldArray")
+    w.end("Fields")
+
+    w.start("Indexes", "esri:Indexes")
+    w.start("IndexArray", "esri:ArrayOfIndex")
+    for i in x['indexes']:
+        w.start("Index", "esri:Index")
+        w.element("Name", i['name'])
+        w.element("IsUnique", bool(i['unique']))
+        w.element("IsAscending", bool(i['ascending']))
+        w.start("Fields", "esri:Fields")
+        w.start("FieldArray", "esri:ArrayOfField")
+        for f in i['fields']:
+            _field_to_xml(w, f, domains, x)
+        w.end("FieldArray")
+        w.end("Fields")
+        w.end("Index")
+    w.end("IndexArray")
+    w.end("Indexes")
+
+    w.element("CLSID", "{52353152-891A-11D0-BEC6-00805F7C4268}" if is_fc else "{7A566981-C114-11D2-8A28-006097AFF44E}")
+    w.element("EXTCLSID", "")
+    w.element("AliasName", x['name'])
+    w.element("ModelName", "")
+    w.element("HasGlobalID", bool(global_id_field))
+    w.element("GlobalIDFieldName", global_id_field)
+    w.element("RasterFieldName", "")
+    w.start("ExtensionProperties", "esri:PropertySet")
+    w.start("PropertyArray", "esri:ArrayOfPropertySetProperty")
+    w.end("PropertyArray")
+    w.end("ExtensionProperties")
+    w.start("ControllerMemberships", "esri:ArrayOfControllerMembership")
+    w.end("ControllerMemberships")
+    w.element("EditorTrackingEnabled", False)
+    w.element("IsTimeInUTC", True)
+    w.element("ChangeTracked", False)
+    w.element("FieldFilteringEnabled", False)
+
+    if is_fc:
+        w.element("FeatureType", "esriFTSimple")
+        w.element("ShapeType", _json_geometry_type_to_xml_type(x.get('geometryType')))
+        w.element("ShapeFieldName", x.get('geometryField', ""))
+        w.element("HasM", False)
+        w.element("HasZ", False)
+        w.element("HasSpatialIndex", True)
+        w.element("AreaFieldName", next((f['name'] for f in x['fields'] if f['name'].lower().endswith("_area")), ""))
+        w.element("LengthFieldName",
+                  next((f['name'] for f in x['fields'] if f['name'].lower().endswith("_length")), ""))
+        _sr_to_xml(w, x.get('sr'))
+
+    w.end("DataElement")
+
+def _r_to_xml(w, x, dsid):
+    keys = dict((k[1], k[0]) for k in x['originClassKeys'] + x['destinationClassKeys'])
+
+    w.start("DataElement", "esri:DERelationshipClass")
+    w.element("CatalogPath", "/RC={0}".format(x['name']))
+    w.element("Name", x['name'])
+    w.element("MetadataRetrieved", False)
+    w.element("DatasetType", "esriDTRelationshipClass")
+    w.element("DSID", dsid)
+    w.element("Versioned", False)
+    w.element("CanVersion", False)
+    w.element("ConfigurationKeyword", "")
+    w.element("Cardinality", "esriRelCardinality" + x['cardinality'])
+    w.element("Notification", "esriRelNotificationNone")
+    w.element("IsComposite", bool(x['isComposite']))
+    w.names("OriginClassNames", x['originClassNames'])
+    w.names("DestinationClassNames", x['destinationClassNames'])
+    w.element("KeyType", "esriRelKeyTypeSingle")
+    w.element("ClassKey", "esriRelClassKeyUndefined")
+    w.element("ForwardPathLabel", "To child")
+    w.element("BackwardPathLabel", "To parent")
+    w.element("IsReflexive", False)
+    w.element("OriginPrimaryKey", keys.get('OriginPrimary', ""))
+    w.element("DestinationPrimaryKey", keys.get('DestinationPrimary', ""))
+    w.element("OriginForeignKey", keys.get('OriginForeign', ""))
+    w.element("DestinationForeignKey", keys.get('DestinationForeign', ""))
+    w.start("RelationshipRules", "esri:ArrayOfRelationshipRule")
+    w.end("RelationshipRules")
+    w.element("IsAttributed", False)
+    w.end("DataElement")
 
 #----------------
 # To JSON methods
 #----------------
 
-def _json_to_file(f, o):
-    f.write(json.dumps(o, sort_keys=False, indent=4, ensure_ascii=False))
+def _json_dumps_indented(o, indent):
+    return "\n".join(" " * indent + line for line in json.dumps(o, indent=4, ensure_ascii=False).split("\n"))
+
+def _list_datasets(in_gdb):
+    """Lists the (path, type) of every table, feature class and relationship class in a geodatabase."""
+    datasets = []
+    for data_type in (FEATURE_CLASS, TABLE, RELATIONSHIP):
+        for dirpath, _, names in arcpy.da.Walk(in_gdb, datatype = data_type):
+            datasets.extend((os.path.join(dirpath, name), data_type) for name in names)
+    return datasets
+
+def _imap(func, tasks, workers):
+    """Maps a function over tasks, in a pool of worker processes when there is more than one worker, in order."""
+    if workers <= 1 or len(tasks) <= 1:
+        for result in map(func, tasks):
+            yield result
+        return
+
+    pool = multiprocessing.Pool(min(workers, len(tasks)))
+    try:
+        for result in pool.imap(func, tasks):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+def _dataset_to_json(task):
+    path, data_type = task
+    x = arcpy.Describe(path)
+    if data_type == FEATURE_CLASS:
+        return _fc_to_json(x)
+    elif data_type == TABLE:
+        return _t_to_json(x)
+    return _r_to_json(x)
 
 def _fields_to_json(fields):
     return [
@@ -341,60 +633,52 @@ def _domain_to_json(x):
 #---------------
 
 @trace
-def _add_fields(output_target, out_gdb, x):
+def _add_fields(output_target, out_gdb, x, bind_domains=True):
 
     if output_target == OUTPUT_GDB:
 
-        for f in x['fields']:
-            type = _json_type_to_gdb_type(f['type'])
-            if type in ['TEXT', 'FLOAT', 'DOUBLE', 'SHORT', 'LONG', 'DATE', 'BLOB', 'RASTER', 'GUID']:
-                arcpy.AddField_management(
-                    in_table=out_gdb + '/' + x['name'],
-                    field_name=f['name'],
-                    field_type=type,
-                    field_alias=f['aliasName'],
-                    field_length=f['length'],
-                    field_precision=f['precision'],
-                    field_scale=f['scale'],
-                    field_is_nullable='NULLABLE' if f['nullable'] else 'NON_NULLABLE',
-                    field_is_required='REQUIRED' if f['required'] else 'NON_REQUIRED',
-                    field_domain=f['domain'] if f['domain'] else 'None'
-                )
-
-    elif output_target == OUTPUT_XML:
-
-        return list(map(lambda f:
-            """<Field xsi:type="esri:Field">
-                <Name>%(name)s</Name>
-                <AliasName>%(alias)s</AliasName>
-                <Type>%(type)s</Type>
-                <IsNullable>%(nullable)s</IsNullable>
-                <Length>%(length)s</Length>
-                <Precision>%(precision)s</Precision>
-                <Scale>%(scale)s</Scale>
-                <Required>%(required)s</Required>
-                <Editable>%(editable)s</Editable>
-                <ModelName>%(name)s</ModelName>
-            </Field>""" % {
-                'name': f['name'],
-                'alias': f['aliasName'],
-                'type': _json_type_to_xml_type(f['type']),
-                'length': f['length'],
-                'nullable': 'true' if f['nullable'] else 'false',
-                'editable': 'true' if f['editable'] else 'false',
-                'required': 'true' if f['required'] else 'false',
-                'scale': f['scale'] or 0,
-                'precision': f['precision'] or 0
-            }
-        , x['fields']))
-
+        in_table = out_gdb + '/' + x['name']
+        fields = [f for f in x['fields'] if _json_type_to_gdb_type(f['type']) in GDB_FIELD_TYPES]
+
+        # AddFields adds many fields in one geoprocessing call, but can't set nullability, required or precision/scale,
+        # fields that need these are added one at a time
+        batch = []
+        single = []
+        for f in fields:
+            if _can_batch_field(f):
+                batch.append(f)
+            else:
+                single.append(f)
+
+        if batch:
+            arcpy.AddFields_management(
+                in_table=in_table,
+                field_description=[_field_description(f, bind_domains) for f in batch])
+
+        for f in single:
+            arcpy.AddField_management(
+                in_table=in_table,
+                field_name=f['name'],
+                field_type=_json_type_to_gdb_type(f['type']),
+                field_alias=f['aliasName'],
+                field_length=f['length'],
+                field_precision=f['precision'],
+                field_scale=f['scale'],
+                field_is_nullable='NULLABLE' if f['nullable'] else 'NON_NULLABLE',
+                field_is_required='REQUIRED' if f['required'] else 'NON_REQUIRED',
+                field_domain=f['domain'] if f['domain'] and bind_domains else 'None'
+            )
 
 @trace
-def _add_global_id(out_gdb, x):
-    for f in x['fields']:
-        type = _json_type_to_gdb_type(f['type'])
-        if type == 'GLOBALID':
-            arcpy.AddGlobalIDs_management(in_datasets=[out_gdb + '/' + x['name']])
+def _add_global_ids(out_gdb, xs):
+    """Adds global IDs to every table/feature class with a global ID field, in one geoprocessing call."""
+    in_datasets = [
+        out_gdb + '/' + x['name'] for x in xs
+        if any(_json_type_to_gdb_type(f['type']) == 'GLOBALID' for f in x['fields'])
+    ]
+
+    if in_datasets:
+        arcpy.AddGlobalIDs_management(in_datasets=in_datasets)
 
 @trace
 def _bind_domain(out_gdb, x):
@@ -411,7 +695,7 @@ def _add_indices(output_target, out_gdb, x):
 
     if output_target == OUTPUT_GDB:
         for i in x['indexes']:
-            if i['fields'][0]['type'] not in ['OID', 'Geometry', 'GlobalID']:
+            if _is_index_added(i):
                 arcpy.AddIndex_management(
                     in_table=out_gdb + '/' + x['name'],
                     index_name=i['name'],
@@ -419,26 +703,6 @@ def _add_indices(output_target, out_gdb, x):
                     unique='UNIQUE' if i['unique'] else 'NON_UNIQUE',
                     ascending='ASCENDING' if i['ascending'] else 'NON_ASCENDING')
 
-    elif output_target == OUTPUT_XML:
-
-        return list(map(lambda i:
-            """<Index xsi:type="esri:Index">
-                    <Name>%(name)s</Name>
-                    <IsUnique>%(isUnique)s</IsUnique>
-                    <IsAscending>%(isAscending)s</IsAscending>
-                    <Fields xsi:type="esri:Fields">
-                        <FieldArray xsi:type="esri:ArrayOfField">
-                            %(fields)s
-                        </FieldArray>
-                    </Fields>
-                </Index>""" % {
-                'name': i['name'],
-                'isUnique':'true' if i['unique'] else 'false',
-                'isAscending':'true' if i['ascending'] else 'false',
-                'fields':  "\n".join(_add_fields(output_target, None, i))
-            }
-        , x['indexes']))
-
 @trace
 def _add_r(out_gdb, x):
 
@@ -463,83 +727,29 @@ def _add_r(out_gdb, x):
     )
 
 @trace
-def _json_to_t(output_target, out_gdb, x):
+def _json_to_t(output_target, out_gdb, x, bind_domains=True):
 
     if output_target == OUTPUT_GDB:
 
         arcpy.CreateTable_management(out_gdb, x['name'])
-        _add_fields(output_target, out_gdb, x)
-
-    elif output_target == OUTPUT_XML:
-
-        template = """<DataElement xsi:type="esri:DETable">
-                <CatalogPath>/OC= %(name)s</CatalogPath>
-                <Name>%(name)s</Name>
-                <MetadataRetrieved>false</MetadataRetrieved>
-                <DatasetType>esriDTTable</DatasetType>
-                <DSID>%(dsId)s</DSID>
-                <Versioned>false</Versioned>
-                <CanVersion>false</CanVersion>
-                <ConfigurationKeyword />
-                <HasOID>true</HasOID>
-                <OIDFieldName>OBJECTID</OIDFieldName>
-                <Fields xsi:type="esri:Fields">
-                    <FieldArray xsi:type="esri:ArrayOfField">
-                        %(fields)s
-                    </FieldArray>
-                </Fields>
-                <Indexes xsi:type="esri:Indexes">
-                    <IndexArray xsi:type="esri:ArrayOfIndex">
-                        %(indexes)s
-                    </IndexArray>
-                </Indexes>
-                <!--
-                <CLSID>{7A566981-C114-11D2-8A28-006097AFF44E}</CLSID>
-                -->
-                <EXTCLSID />
-                <!--
-                <RelationshipClassNames xsi:type="esri:Names">
-                <Name>LR_SRM_WA_R_WF_ASSET</Name>
-                </RelationshipClassNames>
-                -->
-                <AliasName>LR_SRM_WA_WF_ASSET</AliasName>
-                <ModelName />
-                <HasGlobalID>false</HasGlobalID>
-                <GlobalIDFieldName />
-                <RasterFieldName />
-                <ExtensionProperties xsi:type="esri:PropertySet">
-                <PropertyArray xsi:type="esri:ArrayOfPropertySetProperty" />
-                </ExtensionProperties>
-                <ControllerMemberships xsi:type="esri:ArrayOfControllerMembership" />
-                <EditorTrackingEnabled>false</EditorTrackingEnabled>
-                <CreatorFieldName />
-                <CreatedAtFieldName />
-                <EditorFieldName />
-                <EditedAtFieldName />
-                <IsTimeInUTC>true</IsTimeInUTC>
-                <ChangeTracked>false</ChangeTracked>
-                <FieldFilteringEnabled>false</FieldFilteringEnabled>
-                <FilteredFieldNames xsi:type="esri:Names" />
-            </DataElement>"""
-
-        return template % {
-            'dsId': 0,
-            'name': x['name'],
-            'type': _json_type_to_xml_type(x['type']),
-            'fields': "\n".join(_add_fields(output_target, out_gdb, x)),
-            'indexes': "\n".join(_add_indices(output_target, out_gdb, x))
-        }
+        _add_fields(output_target, out_gdb, x, bind_domains)
 
 @trace
-def _json_to_fc(output_target, out_gdb, x):
+def _json_to_fc(output_target, out_gdb, x, bind_domains=True):
     if output_target == OUTPUT_GDB:
         arcpy.CreateFeatureclass_management(
             out_gdb,
             x['name'],
             geometry_type=x['geometryType'],
-            spatial_reference=arcpy.SpatialReference().loadFromString(x['sr']))
+            spatial_reference=_load_sr(x['sr']))
+
+        _add_fields(output_target, out_gdb, x, bind_domains)
 
-        _add_fields(output_target, out_gdb, x)
+def _json_to_dataset(out_gdb, x, bind_domains=True):
+    if x['type'] == TABLE:
+        _json_to_t(OUTPUT_GDB, out_gdb, x, bind_domains)
+    else:
+        _json_to_fc(OUTPUT_GDB, out_gdb, x, bind_domains)
 
 @trace
 def _json_to_domain(output_target, out_gdb, x):
@@ -554,31 +764,17 @@ def _json_to_domain(output_target, out_gdb, x):
             domain_type='CODED' if x['subType'] == 'CodedValue' else 'RANGE',
             domain_description=x['description'])
 
-        for kv in x['values']:
-            arcpy.AddCodedValueToDomain_management(out_gdb, x['name'], kv['k'], kv['v'])
-
-    elif output_target == OUTPUT_XML:
-
-        template = """<Domain xsi:type='esri:CodedValueDomain'>
-                <DomainName>%(name)s</DomainName>
-                <FieldType>%(type)s</FieldType>
-                <MergePolicy>esriMPTDefaultValue</MergePolicy>
-                <SplitPolicy>esriSPTDefaultValue</SplitPolicy>
-                <Description></Description>
-                <Owner></Owner>
-                <CodedValues xsi:type='esri:ArrayOfCodedValue'>
-                    %(domains)s
-                </CodedValues>
-            </Domain>"""
+        if x['subType'] == CODED_VALUE:
+            for kv in x['values']:
+                arcpy.AddCodedValueToDomain_management(out_gdb, x['name'], kv['k'], kv['v'])
+        elif x['subType'] == RANGE:
+            arcpy.SetValueForRangeDomain_management(out_gdb, x['name'], x['min'], x['max'])
 
-        domains = list(map(lambda kv:
-            """<CodedValue xsi:type='esri:CodedValue'>
-                <Name>%(v)s</Name>
-                <Code xsi:type='xs:%(type)s'>%(k)s</Code>
-            </CodedValue>""" % {'type': _json_type_to_xml_attr_type(x['fieldType']), 'k': kv['k'], 'v': kv['v']}
-        , x['values']))
-
-        return template % {'name': x['name'], 'type': _json_type_to_xml_type(x['fieldType']), 'domains': "\n".join(domains) }
+def _dataset_from_staging_to_disk(in_gdb, out_gdb, x):
+    if x['type'] == TABLE:
+        _t_from_memory_to_disk(in_gdb, out_gdb, x)
+    else:
+        _fc_from_memory_to_disk(in_gdb, out_gdb, x)
 
 @trace
 def _t_from_memory_to_disk(in_gdb, out_gdb, x):
@@ -594,6 +790,149 @@ def _fc_from_memory_to_disk(in_gdb, out_gdb, x):
         out_name=x['name'],
         template=in_gdb + '/' + x['name'])
 
+def _can_batch_field(f):
+    return (hasattr(arcpy, "AddFields_management") and f['nullable'] and not f['required'] and not f['precision']
+            and not f['scale'])
+
+def _field_description(f, bind_domains=True):
+    """Gets the AddFields description of a field: name, type, alias, length, default value and domain."""
+    type = _json_type_to_gdb_type(f['type'])
+    return [
+        f['name'],
+        type,
+        f['aliasName'] or '',
+        f['length'] if type == 'TEXT' else '',
+        '',
+        f['domain'] if f['domain'] and bind_domains else ''
+    ]
+
+def _plan_schema(schema, staging_workspace=None):
+    plan = []
+    levels = {}
+
+    def add(phase, x, depends_on):
+        node = {
+            'id': "{0}/{1}".format(phase, x['name']),
+            'phase': phase,
+            'name': x['name'],
+            'dependsOn': depends_on,
+            'level': max([levels[d] + 1 for d in depends_on] or [0]),
+            'element': x
+        }
+        levels[node['id']] = node['level']
+        plan.append(node)
+        return node['id']
+
+    domain_ids = dict((x['name'], add("Domains", x, [])) for x in schema[DOMAIN])
+
+    # each table's operations are chained, so they never contend for a schema lock
+    chains = []
+    for x in schema[TABLE] + schema[FEATURE_CLASS]:
+        depends_on = sorted(set(domain_ids[f['domain']] for f in x['fields'] if f['domain'] in domain_ids))
+        chains.append((x, add("Tables", x, depends_on)))
+
+    for phase, included in [
+        ("Global IDs", lambda x: any(_json_type_to_gdb_type(f['type']) == 'GLOBALID' for f in x['fields'])),
+        ("Bind domains", lambda x: staging_workspace and any(f['domain'] for f in x['fields'])),
+        ("Indexes", lambda x: any(_is_index_added(i) for i in x['indexes']))
+    ]:
+        for i, (x, last_id) in enumerate(chains):
+            if included(x):
+                chains[i] = (x, add(phase, x, [last_id]))
+
+    last_ids = dict((x['name'], last_id) for x, last_id in chains)
+    for x in schema[RELATIONSHIP]:
+        names = x['originClassNames'] + x['destinationClassNames']
+        add("Relationships", x, sorted(set(last_ids[n] for n in names if n in last_ids)))
+
+    return plan
+
+def _run_phase(out_gdb, phase, nodes, staging_workspace=None):
+    """Runs the operations of a phase of a plan, in the output geodatabase."""
+    xs = [n['element'] for n in nodes]
+
+    if phase == "Domains":
+        for x in xs:
+            _json_to_domain(OUTPUT_GDB, out_gdb, x)
+    elif phase == "Tables":
+        if staging_workspace:
+            # domains don't exist in the staging workspace, they are bound once the tables are on disk
+            for x in xs:
+                _json_to_dataset(staging_workspace, x, bind_domains = False)
+            for x in xs:
+                _dataset_from_staging_to_disk(staging_workspace, out_gdb, x)
+        else:
+            for x in xs:
+                _json_to_dataset(out_gdb, x)
+    elif phase == "Global IDs":
+        # Add global ID columns (not supported by in-memory workspaces)
+        _add_global_ids(out_gdb, xs)
+    elif phase == "Bind domains":
+        for x in xs:
+            _bind_domain(out_gdb, x)
+    elif phase == "Indexes":
+        for x in xs:
+            _add_indices(OUTPUT_GDB, out_gdb, x)
+    elif phase == "Relationships":
+        for x in xs:
+            _add_r(out_gdb, x)
+
+def _build_datasets_parallel(out_gdb, plan, staging_workspace, workers):
+    """Builds each table's chain of operations in a pool of worker processes, copying the tables to the output."""
+    chains = collections.OrderedDict()
+    for node in plan:
+        if node['phase'] not in ("Domains", "Relationships"):
+            chains.setdefault(node['name'], []).append((node['phase'], node['element']))
+
+    scratch_dir = tempfile.mkdtemp(prefix = "schematransform_")
+    pool = multiprocessing.Pool(min(workers, len(chains)), _init_build_worker, (out_gdb, scratch_dir))
+    try:
+        tasks = [(name, chain, staging_workspace) for name, chain in chains.items()]
+        for name, worker_gdb, duration in pool.imap_unordered(_build_dataset_worker, tasks):
+            _get_logger().debug("%r built in %2.2f sec" % (name, duration))
+            _copy_dataset(worker_gdb, out_gdb, name)
+    finally:
+        pool.terminate()
+        pool.join()
+        shutil.rmtree(scratch_dir, ignore_errors = True)
+
+_worker_gdb = None
+
+def _init_build_worker(template_gdb, scratch_dir):
+    """Gives each worker process its own scratch geodatabase, a copy of the output geodatabase with its domains."""
+    global _worker_gdb
+    _worker_gdb = os.path.join(scratch_dir, "worker_{0}.gdb".format(os.getpid()))
+    shutil.copytree(template_gdb, _worker_gdb, ignore = shutil.ignore_patterns("*.lock"))
+
+def _build_dataset_worker(task):
+    name, chain, staging_workspace = task
+    ts = time.time()
+    for phase, x in chain:
+        _run_phase(_worker_gdb, phase, [{'element': x}], staging_workspace)
+    return name, _worker_gdb, time.time() - ts
+
+@trace
+def _copy_dataset(in_gdb, out_gdb, name):
+    arcpy.Copy_management(in_gdb + '/' + name, out_gdb + '/' + name)
+
+def _is_index_added(i):
+    return i['fields'][0]['type'] not in ['OID', 'Geometry', 'GlobalID']
+
+def _index_schema(schema):
+    """Indexes the elements of a schema by type, in a single pass, resolving their shared spatial references."""
+    srs = schema.get('spatialReferences', [])
+    index = {DOMAIN: [], TABLE: [], FEATURE_CLASS: [], RELATIONSHIP: []}
+    for x in schema['schema']:
+        if 'srId' in x:
+            x = dict(x, sr = srs[x['srId']])
+        index.setdefault(x['type'], []).append(x)
+    return index
+
+def _load_sr(sr_string):
+    sr = arcpy.SpatialReference()
+    sr.loadFromString(sr_string)
+    return sr
+
 def _json_type_to_gdb_type(type):
     # type = type.lower()
     if type == 'String':
@@ -636,8 +975,29 @@ def _json_type_to_xml_type(type):
         return 'esriFieldTypeGlobalID'
     elif type == 'OID':
         return 'esriFieldTypeOID'
+    elif type == 'Geometry':
+        return 'esriFieldTypeGeometry'
+    elif type == 'Blob':
+        return 'esriFieldTypeBlob'
+    elif type == 'Guid':
+        return 'esriFieldTypeGUID'
+    elif type == 'Raster':
+        return 'esriFieldTypeRaster'
     return type
 
+def _json_geometry_type_to_xml_type(type):
+    if type == 'Polygon':
+        return 'esriGeometryPolygon'
+    elif type == 'Polyline':
+        return 'esriGeometryPolyline'
+    elif type == 'Point':
+        return 'esriGeometryPoint'
+    elif type == 'Multipoint':
+        return 'esriGeometryMultipoint'
+    elif type == 'MultiPatch':
+        return 'esriGeometryMultiPatch'
+    return 'esriGeometryNull'
+
 def _json_type_to_xml_attr_type(type):
     # type = type.lower()
     if type == 'String':
@@ -652,6 +1012,12 @@ def _json_type_to_xml_attr_type(type):
         return 'short'
     elif type == 'SmallInteger':
         return 'short'
+    elif type == 'Float':
+        return 'float'
+    elif type == 'Double':
+        return 'double'
+    elif type == 'Date':
+        return 'dateTime'
     return type
 
 def _normalise_cardinality(type):
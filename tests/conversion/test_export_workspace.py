@@ -0,0 +1,101 @@
+# coding=utf-8
+"""This module tests exporting every table in a workspace, against fake tables yielding synthetic rows."""
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+# Standard libary imports
+import json
+import os
+
+# Third party imports
+import pytest
+
+# Local import
+import arcpyext
+from arcpyext.conversion import _export_workspace, _helpers, _table_to_csv
+from ..helpers import FIELDS, FakeSearchCursor
+
+
+@pytest.fixture
+def fake_workspace(monkeypatch):
+    FakeSearchCursor.calls = []
+    FakeSearchCursor.row_count = 5
+
+    def walk(workspace, datatype=None):
+        yield workspace, ["Dataset"], ["Countries"]
+        yield os.path.join(workspace, "Dataset"), [], ["Rivers", "Broken"]
+
+    def get_table_signature(table):
+        if table.endswith("Broken"):
+            raise IOError("'{}' does not exist".format(table))
+        return "{}:{}".format(table, FakeSearchCursor.row_count)
+
+    monkeypatch.setattr(_export_workspace.arcpy.da, "Walk", walk)
+    monkeypatch.setattr(_export_workspace, "get_table_signature", get_table_signature)
+    monkeypatch.setattr(_helpers.arcpy, "ListFields", lambda table: FIELDS)
+    monkeypatch.setattr(_table_to_csv.arcpy.da, "SearchCursor", FakeSearchCursor)
+    return "workspace.gdb"
+
+
+def test_export_workspace(fake_workspace, tmpdir):
+    output_dir = str(tmpdir.join("output"))
+
+    manifest = arcpyext.conversion.export_workspace(fake_workspace, output_dir, workers=1)
+
+    tables = manifest["tables"]
+    assert sorted(tables) == ["Broken", "Countries", "Rivers"]
+    assert tables["Countries"]["status"] == "exported"
+    assert tables["Countries"]["rows"] == 5
+    assert tables["Countries"]["bytes"] == os.path.getsize(os.path.join(output_dir, "Countries.csv"))
+    assert tables["Rivers"]["table"] == os.path.join(fake_workspace, "Dataset", "Rivers")
+    assert tables["Broken"]["status"] == "failed"
+    assert "does not exist" in tables["Broken"]["error"]
+
+    with open(os.path.join(output_dir, "manifest.json")) as fp:
+        assert json.load(fp)["tables"]["Rivers"]["rows"] == 5
+
+
+def test_export_workspace_skips_unchanged(fake_workspace, tmpdir):
+    output_dir = str(tmpdir.join("output"))
+    arcpyext.conversion.export_workspace(fake_workspace, output_dir, workers=1)
+    FakeSearchCursor.calls = []
+
+    manifest = arcpyext.conversion.export_workspace(fake_workspace, output_dir, workers=1)
+
+    assert FakeSearchCursor.calls == []
+    assert manifest["tables"]["Countries"]["status"] == "skipped"
+    assert manifest["tables"]["Countries"]["rows"] == 5
+    # failed tables are always tried again
+    assert manifest["tables"]["Broken"]["status"] == "failed"
+
+    # a changed table, or a forced export, is exported again
+    FakeSearchCursor.row_count = 6
+    manifest = arcpyext.conversion.export_workspace(fake_workspace, output_dir, workers=1)
+    assert manifest["tables"]["Countries"]["status"] == "exported"
+
+    manifest = arcpyext.conversion.export_workspace(fake_workspace, output_dir, workers=1, force=True)
+    assert manifest["tables"]["Rivers"]["status"] == "exported"
+
+
+def test_export_workspace_options_changed(fake_workspace, tmpdir):
+    output_dir = str(tmpdir.join("output"))
+    arcpyext.conversion.export_workspace(fake_workspace, output_dir, workers=1)
+
+    # different export options mean the previous files are out of date
+    manifest = arcpyext.conversion.export_workspace(fake_workspace, output_dir, workers=1, where_clause="VALUE > 1")
+    assert manifest["tables"]["Countries"]["status"] == "exported"
+
+    manifest = arcpyext.conversion.export_workspace(fake_workspace, output_dir, workers=1, where_clause="VALUE > 1")
+    assert manifest["tables"]["Countries"]["status"] == "skipped"
+
+
+def test_export_workspace_unknown_format(fake_workspace, tmpdir):
+    with pytest.raises(ValueError):
+        arcpyext.conversion.export_workspace(fake_workspace, str(tmpdir), output_format="dbf")
@@ -0,0 +1,87 @@
+# coding=utf-8
+"""This module tests writing tables to columnar formats, against a fake cursor yielding synthetic rows."""
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+# Third party imports
+import pytest
+
+pyarrow = pytest.importorskip("pyarrow")
+import pyarrow.ipc
+import pyarrow.parquet
+
+# Local import
+import arcpyext
+from arcpyext.conversion import _helpers, _table_to_columnar
+from ..helpers import FIELDS, FakeSearchCursor
+
+
+@pytest.fixture
+def fake_table(monkeypatch):
+    FakeSearchCursor.calls = []
+    FakeSearchCursor.row_count = 25
+    monkeypatch.setattr(_helpers.arcpy, "ListFields", lambda table: FIELDS)
+    monkeypatch.setattr(_table_to_columnar.arcpy.da, "SearchCursor", FakeSearchCursor)
+    return "table"
+
+
+def test_table_to_parquet_typed_row_groups(fake_table, tmpdir):
+    output_path = str(tmpdir.join("output.parquet"))
+
+    stats = arcpyext.conversion.table_to_parquet(fake_table, output_path, row_group_size=10)
+
+    assert stats["rows"] == 25
+    parquet_file = pyarrow.parquet.ParquetFile(output_path)
+    assert parquet_file.metadata.num_row_groups == 3
+    schema = parquet_file.schema_arrow
+    assert schema.names == ["OBJECTID", "NAME", "VALUE"]
+    assert schema.field("OBJECTID").type == pyarrow.int64()
+    assert schema.field("VALUE").type == pyarrow.float64()
+    assert parquet_file.read().column("NAME")[24].as_py() == "Name, 24"
+
+
+def test_table_to_parquet_geometry_subset(fake_table, tmpdir):
+    output_path = str(tmpdir.join("output.parquet"))
+
+    arcpyext.conversion.table_to_parquet(fake_table,
+                                         output_path,
+                                         use_field_alias_as_column_header=True,
+                                         where_clause="VALUE > 1",
+                                         field_names=["NAME"],
+                                         include_geometry=True)
+
+    assert FakeSearchCursor.calls == [("table", ["NAME", "SHAPE@WKB"], "VALUE > 1")]
+    result = pyarrow.parquet.read_table(output_path)
+    assert result.schema.names == ["Name", "Shape"]
+    assert result.schema.field("Shape").type == pyarrow.binary()
+    assert result.column("Shape")[0].as_py()[:1] == b"\x01"
+
+
+def test_table_to_arrow_ipc(fake_table, tmpdir):
+    output_path = str(tmpdir.join("output.arrow"))
+
+    stats = arcpyext.conversion.table_to_arrow_ipc(fake_table, output_path, row_group_size=10)
+
+    assert stats["rows"] == 25
+    with pyarrow.ipc.open_file(output_path) as reader:
+        assert reader.num_record_batches == 3
+        assert reader.read_all().num_rows == 25
+
+
+def test_table_to_arrow_ipc_empty_table(fake_table, tmpdir):
+    FakeSearchCursor.row_count = 0
+    output_path = str(tmpdir.join("output.arrow"))
+
+    arcpyext.conversion.table_to_arrow_ipc(fake_table, output_path)
+
+    with pyarrow.ipc.open_file(output_path) as reader:
+        table = reader.read_all()
+    assert table.num_rows == 0
+    assert table.schema.names == ["OBJECTID", "NAME", "VALUE"]
@@ -0,0 +1,84 @@
+# coding=utf-8
+"""This module tests writing tables to Excel workbooks, against a fake cursor yielding synthetic rows."""
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+# Standard libary imports
+import re
+import zipfile
+
+# Third party imports
+import pytest
+
+# Local import
+import arcpyext
+from arcpyext.conversion import _helpers, _table_to_ooxml_workbook
+from ..helpers import FIELDS, FakeSearchCursor
+
+
+@pytest.fixture
+def fake_table(monkeypatch):
+    FakeSearchCursor.calls = []
+    FakeSearchCursor.row_count = 25
+    monkeypatch.setattr(_helpers.arcpy, "ListFields", lambda table: FIELDS)
+    monkeypatch.setattr(_table_to_ooxml_workbook.arcpy.da, "SearchCursor", FakeSearchCursor)
+    return "table"
+
+
+def _read_parts(file_path, pattern):
+    """Reads the workbook parts whose names match a pattern, in name order."""
+    with zipfile.ZipFile(file_path) as workbook:
+        names = sorted(n for n in workbook.namelist() if re.match(pattern, n))
+        return [workbook.read(n).decode("utf8") for n in names]
+
+
+def test_table_to_ooxml_workbook_single_sheet(fake_table, tmpdir):
+    output_path = str(tmpdir.join("output.xlsx"))
+
+    stats = arcpyext.conversion.table_to_ooxml_workbook(fake_table, output_path)
+
+    assert stats["rows"] == 25
+    assert stats["sheets"] == 1
+    tables = _read_parts(output_path, r"xl/tables/table\d+\.xml")
+    assert len(tables) == 1
+    assert 'ref="A1:C26"' in tables[0]
+
+
+def test_table_to_ooxml_workbook_sheet_rollover(fake_table, tmpdir):
+    output_path = str(tmpdir.join("output.xlsx"))
+
+    stats = arcpyext.conversion.table_to_ooxml_workbook(fake_table, output_path, max_rows_per_sheet=11)
+
+    assert stats["sheets"] == 3
+    refs = sorted(re.search(r'ref="([^"]+)"', t).group(1) for t in _read_parts(output_path, r"xl/tables/table\d+\.xml"))
+    assert refs == ["A1:C11", "A1:C11", "A1:C6"]
+
+
+def test_table_to_ooxml_workbook_constant_memory(fake_table, tmpdir):
+    output_path = str(tmpdir.join("output.xlsx"))
+
+    stats = arcpyext.conversion.table_to_ooxml_workbook(fake_table,
+                                                        output_path,
+                                                        use_field_alias_as_column_header=True,
+                                                        constant_memory=True,
+                                                        max_rows_per_sheet=11)
+
+    assert stats["rows"] == 25
+    assert stats["sheets"] == 3
+    assert _read_parts(output_path, r"xl/tables/") == []
+    sheets = _read_parts(output_path, r"xl/worksheets/sheet\d+\.xml")
+    assert len(sheets) == 3
+    assert all("Object ID" in s for s in sheets)
+    assert '<autoFilter ref="A1:C6"/>' in sheets[2]
+
+
+def test_table_to_ooxml_workbook_invalid_max_rows(fake_table, tmpdir):
+    with pytest.raises(ValueError):
+        arcpyext.conversion.table_to_ooxml_workbook(fake_table, str(tmpdir.join("output.xlsx")), max_rows_per_sheet=1)
@@ -0,0 +1,187 @@
+# coding=utf-8
+"""This module tests editing rows in chunks of edit operations."""
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+# Standard libary imports
+import os.path
+
+# Third party imports
+import arcpy
+import pytest
+
+# Local import
+import arcpyext
+from arcpyext.exceptions import BulkEditError
+
+
+@pytest.fixture(scope="module")
+def workspace():
+    return os.path.normpath("{0}/samples/test_data_states.gdb".format(os.path.dirname(__file__)))
+
+
+@pytest.fixture(scope="module")
+def in_table(workspace):
+    return "{0}/States".format(workspace)
+
+
+@pytest.fixture
+def edit_session(request, workspace):
+    edit = arcpy.da.Editor(workspace)
+    edit.startEditing()
+
+    def finalizer():
+        edit.stopEditing(False)
+
+    request.addfinalizer(finalizer)
+
+    return edit
+
+
+def _count(in_table, where_clause):
+    return len(arcpyext.data.read_rows(in_table, where_clause, ["STATE"]))
+
+
+def test_create_rows_chunked(in_table, edit_session):
+    progress = []
+    rows = (("Bulk", ) for _ in range(25))
+
+    stats = arcpyext.data.create_rows_chunked(edit_session,
+                                              in_table,
+                                              rows, ["STATE"],
+                                              chunk_size=10,
+                                              progress_callback=progress.append)
+
+    assert stats["rows"] == 25
+    assert stats["chunks"] == 3
+    assert [p["rows"] for p in progress] == [10, 20, 25]
+    assert _count(in_table, "STATE = 'Bulk'") == 25
+
+
+def test_create_rows_chunked_resume(in_table, edit_session):
+    def rows(fail):
+        for i in range(25):
+            if fail and i == 15:
+                yield ("Bulk", "not a field")
+            yield ("Bulk", )
+
+    with pytest.raises(BulkEditError) as error_info:
+        arcpyext.data.create_rows_chunked(edit_session, in_table, rows(True), ["STATE"], chunk_size=10)
+
+    # only the failed chunk is rolled back
+    assert error_info.value.stats["rows"] == 10
+    assert _count(in_table, "STATE = 'Bulk'") == 10
+
+    stats = arcpyext.data.create_rows_chunked(edit_session,
+                                              in_table,
+                                              rows(False), ["STATE"],
+                                              chunk_size=10,
+                                              skip_rows=error_info.value.stats["rows"])
+
+    assert stats["rows"] == 25
+    assert stats["chunks"] == 2
+    assert _count(in_table, "STATE = 'Bulk'") == 25
+
+
+@pytest.mark.parametrize(("field_names", ), [("*", ), (["STATE"], ), ("STATE", )])
+def test_update_rows_func_chunked(in_table, edit_session, field_names):
+    state_index = [f.name for f in arcpy.ListFields(in_table)].index("STATE") if field_names == "*" else 0
+
+    def update_row(row):
+        row[state_index] = "Test"
+        return row
+
+    stats = arcpyext.data.update_rows_func_chunked(edit_session,
+                                                   in_table,
+                                                   update_row,
+                                                   "STATE = 'Michigan'",
+                                                   field_names,
+                                                   chunk_size=10)
+
+    assert stats["rows"] == 34
+    assert stats["chunks"] == 4
+    assert _count(in_table, "STATE = 'Test'") == 34
+
+
+def test_update_rows_func_chunked_resume(in_table, edit_session):
+    updated_oids = []
+
+    def update_row(row):
+        updated_oids.append(row[1])
+        if len(updated_oids) == 15:
+            raise ValueError("Update failed")
+        return ["Test", row[1]]
+
+    with pytest.raises(BulkEditError) as error_info:
+        arcpyext.data.update_rows_func_chunked(edit_session,
+                                               in_table,
+                                               update_row,
+                                               "STATE = 'Michigan'", ["STATE", "OID@"],
+                                               chunk_size=10)
+
+    last_oid = error_info.value.stats["lastOID"]
+    assert last_oid == updated_oids[9]
+    assert _count(in_table, "STATE = 'Test'") == 10
+
+    stats = arcpyext.data.update_rows_func_chunked(edit_session,
+                                                   in_table,
+                                                   lambda row: ["Test"],
+                                                   "STATE = 'Michigan'", ["STATE"],
+                                                   chunk_size=10,
+                                                   after_oid=last_oid)
+
+    assert stats["rows"] == 24
+    assert _count(in_table, "STATE = 'Test'") == 34
+
+
+def test_delete_rows_by_oids(in_table, edit_session):
+    oids = [row[0] for row in arcpyext.data.read_rows(in_table, "STATE = 'Michigan'", ["OID@"])]
+    progress = []
+
+    # object IDs that don't exist are ignored
+    stats = arcpyext.data.delete_rows_by_oids(edit_session,
+                                              in_table,
+                                              oids + [999999],
+                                              batch_size=10,
+                                              progress_callback=progress.append)
+
+    assert stats["rows"] == 34
+    assert stats["chunks"] == 4
+    assert [p["rows"] for p in progress] == [10, 20, 30, 34]
+    assert _count(in_table, "STATE = 'Michigan'") == 0
+    assert _count(in_table, None) == 14
+
+
+@pytest.mark.parametrize(("delete_missing", "expected_deleted", "expected_count"), [(True, 14, 35), (False, 0, 49)])
+def test_merge_rows(in_table, edit_session, delete_missing, expected_deleted, expected_count):
+    counts = arcpyext.data.merge_rows(edit_session,
+                                      in_table, [("Michigan", ), ("Bulk", )], ["STATE"], ["STATE"],
+                                      delete_missing=delete_missing)
+
+    assert counts["inserted"] == 1
+    assert counts["updated"] == 0
+    assert counts["deleted"] == expected_deleted
+    assert counts["unchanged"] == 34
+    assert _count(in_table, None) == expected_count
+
+
+def test_merge_rows_unchanged_geometry(in_table, edit_session):
+    # geometries read again from the table are different objects, but the same shapes, so aren't updated
+    rows = arcpyext.data.read_rows(in_table, None, ["OID@", "SHAPE@"])
+
+    counts = arcpyext.data.merge_rows(edit_session, in_table, rows, ["OID@"], ["OID@", "SHAPE@"])
+
+    assert counts["updated"] == 0
+    assert counts["unchanged"] == 48
+
+
+def test_merge_rows_duplicate_key(in_table, edit_session):
+    with pytest.raises(ValueError):
+        arcpyext.data.merge_rows(edit_session, in_table, [("Bulk", ), ("Bulk", )], ["STATE"], ["STATE"])
@@ -48,6 +48,14 @@ def test_delete_rows(in_table, edit_session, where_clause, expected_count, field
     rows = arcpyext.data.read_rows(in_table)
     assert(len(rows) == expected_count)
 
+@pytest.mark.parametrize(("where_clause", "expected_deleted"), [
+    ("STATE = 'Michigan'", 34),
+    ("STATE = 'Arizona'", 0)
+])
+def test_delete_rows_count(in_table, edit_session, where_clause, expected_deleted):
+    deleted = arcpyext.data.delete_rows(edit_session, in_table, where_clause)
+    assert(deleted == expected_deleted)
+
 @pytest.mark.parametrize(("pre_edit_where", "post_edit_where", "expected_count", "field_names"), [
     ("STATE = 'Wisconsin'", "STATE = 'Wisconsin'", 0, ("STATE")),
     ("STATE = 'Wisconsin'", "STATE = 'Test'", 14, ("STATE"))
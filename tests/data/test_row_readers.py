@@ -0,0 +1,108 @@
+# coding=utf-8
+"""This module tests reading rows lazily, one row or one chunk of rows at a time."""
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+# Standard libary imports
+import os.path
+import types
+
+# Third party imports
+import numpy
+import pytest
+
+# Local import
+import arcpyext
+from arcpyext.data import _row_readers
+
+
+@pytest.fixture(scope="module")
+def in_table():
+    return os.path.normpath("{0}/samples/test_data_states.gdb/States".format(os.path.dirname(__file__)))
+
+
+def test_iter_rows_is_lazy(in_table):
+    rows = arcpyext.data.iter_rows(in_table, ["STATE"], "STATE = 'Michigan'")
+
+    assert isinstance(rows, types.GeneratorType)
+    assert next(rows) == ("Michigan", )
+    assert len(list(rows)) == 33
+
+
+@pytest.mark.parametrize(("row_type", "get_state"), [
+    ("tuple", lambda row: row[1]),
+    ("dict", lambda row: row["STATE"]),
+    ("namedtuple", lambda row: row.STATE),
+])
+def test_iter_rows_row_types(in_table, row_type, get_state):
+    rows = list(arcpyext.data.iter_rows(in_table, ["OID@", "STATE"], "STATE = 'Michigan'", row_type))
+
+    assert len(rows) == 34
+    assert all(get_state(row) == "Michigan" for row in rows)
+
+
+def test_iter_rows_requires_field_names(in_table):
+    with pytest.raises(ValueError):
+        list(arcpyext.data.iter_rows(in_table, "*"))
+
+
+def test_iter_row_chunks(in_table):
+    chunks = list(arcpyext.data.iter_row_chunks(in_table, ["STATE"], 20))
+
+    assert [len(c) for c in chunks] == [20, 20, 8]
+    assert all(len(row) == 1 for chunk in chunks for row in chunk)
+
+
+def test_iter_row_chunks_arrays(in_table):
+    chunks = list(arcpyext.data.iter_row_chunks(in_table, ["OID@", "STATE", "SHAPE@XY"], 20, row_type="array"))
+
+    assert [len(c) for c in chunks] == [20, 20, 8]
+    assert all(isinstance(c, numpy.ndarray) for c in chunks)
+    assert chunks[0].dtype["OID@"] == numpy.dtype("<i8")
+    assert chunks[0]["SHAPE@XY"].shape == (20, 2)
+    assert numpy.count_nonzero(numpy.concatenate(chunks)["STATE"] == "Michigan") == 34
+
+
+@pytest.mark.parametrize(("use_table_to_numpy", "chunk_size"), [(True, 65536), (False, 65536), (False, 5)])
+def test_read_array(in_table, use_table_to_numpy, chunk_size):
+    array = arcpyext.data.read_array(in_table, ["OID@", "STATE", "SHAPE@XY"],
+                                     "STATE = 'Michigan'",
+                                     use_table_to_numpy=use_table_to_numpy,
+                                     chunk_size=chunk_size)
+
+    assert array.shape == (34, )
+    assert list(array.dtype.names) == ["OID@", "STATE", "SHAPE@XY"]
+    assert (array["STATE"] == "Michigan").all()
+    assert len(numpy.unique(array["OID@"])) == 34
+
+
+def test_read_array_geometry(in_table):
+    array = arcpyext.data.read_array(in_table, ["STATE", "SHAPE@"], chunk_size=10)
+
+    assert array.shape == (48, )
+    assert array.dtype["SHAPE@"] == numpy.dtype("O")
+    assert all(shape.area > 0 for shape in array["SHAPE@"])
+
+
+def test_get_dtype_guid(monkeypatch):
+    class Field(object):
+        def __init__(self, name, type, length=0):
+            self.name = name
+            self.type = type
+            self.length = length
+
+    fields = [Field("OBJECTID", "OID"), Field("GUID_FIELD", "Guid", 38), Field("GLOBALID", "GlobalID", 38)]
+    monkeypatch.setattr(_row_readers.arcpy, "ListFields", lambda in_table: fields)
+
+    dtype = _row_readers.get_dtype("table", ["OBJECTID", "GUID_FIELD", "GLOBALID"])
+
+    # GUID fields have a NumPy type, so don't stop the array being read by TableToNumPyArray
+    assert dtype["GUID_FIELD"] == numpy.dtype("<U38")
+    assert dtype["GLOBALID"] == numpy.dtype("<U38")
@@ -7,6 +7,15 @@ from future.standard_library import install_aliases
 install_aliases()
 # pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
 
+import collections
+import os
+
+import pytest
+
+# Benchmarks report timings without asserting on them, and are slow, so only run when asked for
+benchmark = pytest.mark.skipif(not os.environ.get("ARCPYEXT_BENCHMARKS"),
+                               reason="Benchmarks only run when ARCPYEXT_BENCHMARKS is set")
+
 TRUEISH_TEST_PARAMS = [
     (True, True),
     ("TRUE", True),
@@ -22,4 +31,41 @@ TRUEISH_TEST_PARAMS = [
     (0, False),
     (2, False),
     (-1, False)
-]
\ No newline at end of file
+]
+
+Field = collections.namedtuple("Field", ["name", "aliasName", "type"])
+
+FIELDS = [
+    Field("OBJECTID", "Object ID", "OID"),
+    Field("Shape", "Shape", "Geometry"),
+    Field("NAME", "Name", "String"),
+    Field("VALUE", "Value", "Double"),
+    Field("DOC", "Document", "Blob")
+]
+
+
+class FakeSearchCursor(object):
+    """A search cursor yielding synthetic rows, recording the arguments it was created with."""
+
+    calls = []
+    row_count = 0
+
+    def __init__(self, table, field_names, where_clause=None):
+        FakeSearchCursor.calls.append((table, list(field_names), where_clause))
+        self._field_names = field_names
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def __iter__(self):
+        values = {
+            "OBJECTID": lambda i: i,
+            "NAME": lambda i: "Name, {}".format(i),
+            "VALUE": lambda i: i / 2,
+            "SHAPE@WKB": lambda i: bytearray(b"\x01\x01\x00\x00\x00") + bytearray(16)
+        }
+        getters = [values[n] for n in self._field_names]
+        return (tuple(g(i) for g in getters) for i in range(FakeSearchCursor.row_count))
@@ -0,0 +1,160 @@
+# coding=utf-8
+"""This module tests the functions of the mapping module that work on many documents."""
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+# Standard libary imports
+import csv
+import io
+import json
+import os.path
+
+# Third party imports
+import pytest
+
+# Local import
+import arcpyext
+from arcpyext.mapping import _mapping
+
+
+@pytest.fixture
+def stub_describe_map(monkeypatch):
+    def iter_describe_map(file_path):
+        if "broken" in file_path:
+            raise ValueError("MXD path '{}' not found or document invalid.".format(file_path))
+        return iter([])
+
+    monkeypatch.setattr(_mapping._mh, "_iter_describe_map", iter_describe_map)
+
+
+def test_describe_many_in_process(stub_describe_map):
+    paths = ["a.mxd", "broken.mxd", "b.mxd"]
+
+    results = list(arcpyext.mapping.describe_many(paths, workers=1))
+
+    assert [r["filePath"] for r in results] == paths
+    assert all(r["duration"] is not None for r in results)
+
+    assert results[0]["description"] == {"filePath": "a.mxd", "maps": []}
+    assert results[0]["error"] is None
+
+    # failures are isolated to the document that failed
+    assert results[1]["description"] is None
+    assert results[1]["error"].startswith("ValueError")
+    assert results[2]["error"] is None
+
+
+def test_describe_many_process_pool():
+    missing_dir = os.path.abspath("{0}/../samples/missing".format(os.path.dirname(__file__)))
+    paths = [os.path.join(missing_dir, "{}.mxd".format(i)) for i in range(4)]
+
+    results = list(arcpyext.mapping.describe_many(paths, workers=2))
+
+    assert sorted(r["filePath"] for r in results) == sorted(paths)
+    assert all(r["description"] is None and r["error"] for r in results)
+
+
+class _StubDocument(object):
+    def __init__(self, path, on_save):
+        self.path = path
+        self.save = lambda: on_save(path)
+
+
+@pytest.fixture
+def stub_change_data_sources(monkeypatch):
+    calls = {"opened": [], "saved": [], "changed": []}
+
+    def open_document(path):
+        calls["opened"].append(path)
+        if "locked" in path and calls["opened"].count(path) == 1:
+            raise IOError("Document is locked.")
+        if "shared" in path and calls["opened"].count(path) == 1:
+            raise RuntimeError("Cannot open document: sharing violation.")
+        if "corrupt" in path:
+            raise RuntimeError("Cannot open document.")
+        return _StubDocument(path, calls["saved"].append)
+
+    def change_data_sources(document, data_sources):
+        calls["changed"].append((document.path, data_sources))
+        if data_sources == "bad":
+            raise arcpyext.exceptions.ChangeDataSourcesError("Number of layers does not match number of data sources.")
+        return ([{
+            "map": "Layers",
+            "type": "layer",
+            "index": 0,
+            "name": "Layer 1",
+            "status": "changed",
+            "oldDataSource": "C:\\Data\\A.gdb\\DS",
+            "newDataSource": {"workspacePath": data_sources},
+            "error": None,
+            "duration": 0.1,
+            "method": "layer"
+        }], [])
+
+    monkeypatch.setattr(_mapping, "open_document", open_document)
+    monkeypatch.setattr(_mapping, "_change_data_sources", change_data_sources)
+    return calls
+
+
+def test_change_data_sources_many_in_process(stub_change_data_sources):
+    jobs = [("a.mxd", "A.gdb"), ("locked.mxd", "B.gdb"), ("a.mxd", "C.gdb"), ("bad.mxd", "bad")]
+
+    results = list(arcpyext.mapping.change_data_sources_many(jobs, workers=1, save=True, retry_delay=0))
+
+    # jobs for the same document are applied to one opened document, saved once
+    assert [r["filePath"] for r in results] == ["a.mxd", "locked.mxd", "bad.mxd"]
+    assert stub_change_data_sources["opened"].count("a.mxd") == 1
+    assert [c for c in stub_change_data_sources["changed"] if c[0] == "a.mxd"] == [("a.mxd", "A.gdb"),
+                                                                                 ("a.mxd", "C.gdb")]
+    assert stub_change_data_sources["saved"] == ["a.mxd", "locked.mxd"]
+    assert len(results[0]["layers"]) == 2
+
+    # transient errors are retried
+    assert results[1]["attempts"] == 2
+    assert results[1]["error"] is None
+    assert results[1]["saved"] is True
+
+    # other errors are not
+    assert results[2]["attempts"] == 1
+    assert results[2]["error"].startswith("ChangeDataSourcesError")
+    assert results[2]["saved"] is False
+
+
+def test_change_data_sources_many_runtime_errors(stub_change_data_sources):
+    jobs = [("shared.mxd", "A.gdb"), ("corrupt.mxd", "A.gdb")]
+
+    results = list(arcpyext.mapping.change_data_sources_many(jobs, workers=1, retry_delay=0))
+
+    # a runtime error about a lock is retried, any other fails straight away
+    assert [(r["attempts"], r["error"]) for r in results] == [(2, None), (1, "RuntimeError: Cannot open document.")]
+    assert stub_change_data_sources["opened"].count("corrupt.mxd") == 1
+
+
+def test_write_change_report(tmpdir, stub_change_data_sources):
+    jobs = [("a.mxd", "A.gdb"), ("bad.mxd", "bad")]
+    results = list(arcpyext.mapping.change_data_sources_many(jobs, workers=1, retry_delay=0))
+
+    json_path = str(tmpdir.join("report.json"))
+    summary = arcpyext.mapping.write_change_report(iter(results), json_path)
+    assert summary == {"changed": 1, "skipped": 0, "broken": 0, "failed": 0, "failedDocuments": 1}
+    with io.open(json_path, "r", encoding="utf-8") as fp:
+        assert json.load(fp) == results
+
+    csv_path = str(tmpdir.join("report.csv"))
+    arcpyext.mapping.write_change_report(results, csv_path)
+    with io.open(csv_path, "r", encoding="utf-8") as fp:
+        rows = list(csv.DictReader(fp))
+
+    assert [(r["filePath"], r["type"], r["status"]) for r in rows] == [("a.mxd", "layer", "changed"),
+                                                                       ("bad.mxd", "document", "failed")]
+    assert json.loads(rows[0]["newDataSource"]) == {"workspacePath": "A.gdb"}
+
+    with pytest.raises(ValueError):
+        arcpyext.mapping.write_change_report(results, str(tmpdir.join("report.txt")))
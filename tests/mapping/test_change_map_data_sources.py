@@ -0,0 +1,168 @@
+# coding=utf-8
+"""This module tests changing the data sources of the layers and tables of a map together."""
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+# Third party imports
+import pytest
+
+# Local import
+from arcpyext.exceptions import DataSourceUpdateError
+from arcpyext.mapping import _mapping
+
+OLD_PROPS = {"dataset": "States", "connection_info": {"database": "C:\\Data\\Old.gdb"}}
+OTHER_PROPS = {"dataset": "Counties", "connection_info": {"database": "C:\\Data\\Other.gdb"}}
+NEW_PROPS = {"connection_info": {"database": "C:\\Data\\New.gdb"}}
+
+
+class FakeLayer(object):
+    def __init__(self, name, conn_props):
+        self.name = name
+        self.isBroken = False
+        self._conn_props = conn_props
+        self.reads = 0
+        self.updates = 0
+
+    @property
+    def connectionProperties(self):
+        self.reads += 1
+        return self._conn_props
+
+    def supports(self, name):
+        return name == "CONNECTIONPROPERTIES"
+
+    def updateConnectionProperties(self, current, new):
+        self.updates += 1
+        self._conn_props = _mapping._mh._merge_conn_props(self._conn_props, new)
+
+
+class FakeMap(object):
+    def __init__(self, layers):
+        self.name = "Map"
+        self.layers = layers
+        self.updates = 0
+
+    def updateConnectionProperties(self, current, new):
+        self.updates += 1
+        for layer in self.layers:
+            if _mapping._mh._conn_props_match(layer._conn_props, current):
+                layer._conn_props = _mapping._mh._merge_conn_props(layer._conn_props, new)
+
+
+@pytest.fixture
+def pro_only():
+    if not _mapping._mh.__name__.endswith("_mapping3"):
+        pytest.skip("Changing data sources at map level requires ArcGIS Pro")
+
+
+def test_change_data_sources_records(monkeypatch):
+    layers = [FakeLayer("A", OLD_PROPS), FakeLayer("B", OLD_PROPS)]
+    tables = [FakeLayer("T", OTHER_PROPS)]
+    error = DataSourceUpdateError("Layer is now broken.", layers[1])
+
+    def change_map_data_sources(map_frame, items):
+        layers[1].isBroken = True
+        return [{"oldDataSource": OLD_PROPS, "error": None, "duration": 0.1, "method": "map"},
+                {"oldDataSource": OLD_PROPS, "error": error, "duration": 0.1, "method": "map"},
+                None]
+
+    monkeypatch.setattr(_mapping._mh, "_list_maps", lambda doc: [FakeMap(layers)])
+    monkeypatch.setattr(_mapping._mh, "_list_layers", lambda doc, map_frame: layers)
+    monkeypatch.setattr(_mapping._mh, "_list_tables", lambda doc, map_frame: tables)
+    monkeypatch.setattr(_mapping._mh, "_change_map_data_sources", change_map_data_sources)
+
+    records, errors = _mapping._change_data_sources(None, [{"layers": [NEW_PROPS, NEW_PROPS], "tables": [None]}])
+
+    assert [(r["type"], r["name"], r["status"], r["method"]) for r in records] == [("layer", "A", "changed", "map"),
+                                                                                  ("layer", "B", "broken", "map"),
+                                                                                  ("table", "T", "skipped", None)]
+    assert errors == [error]
+
+
+def test_change_map_data_sources_grouped(pro_only):
+    layers = [FakeLayer("A", OLD_PROPS), FakeLayer("B", OLD_PROPS), FakeLayer("C", OTHER_PROPS)]
+    map_frame = FakeMap(layers)
+
+    results = _mapping._mh._change_map_data_sources(map_frame, [(l, NEW_PROPS) for l in layers])
+
+    # the layers with the same source are changed at once, the other on its own
+    assert [r["method"] for r in results] == ["map", "map", "layer"]
+    assert all(r["error"] is None for r in results)
+    assert map_frame.updates == 1
+    assert [l.updates for l in layers] == [0, 0, 1]
+    assert [l.reads for l in layers] == [1, 1, 1]
+    assert all(l._conn_props["connection_info"]["database"] == "C:\\Data\\New.gdb" for l in layers)
+    assert results[0]["oldDataSource"] == OLD_PROPS
+
+
+def test_change_map_data_sources_unchanged_match(pro_only):
+    # a layer with the same source that isn't being changed prevents changing the others at map level
+    layers = [FakeLayer("A", OLD_PROPS), FakeLayer("B", OLD_PROPS), FakeLayer("C", OLD_PROPS)]
+    map_frame = FakeMap(layers)
+
+    results = _mapping._mh._change_map_data_sources(map_frame, [(layers[0], NEW_PROPS), (layers[1], NEW_PROPS),
+                                                                (layers[2], None)])
+
+    assert [r["method"] for r in results[:2]] == ["layer", "layer"]
+    assert results[2] is None
+    assert map_frame.updates == 0
+    assert layers[2]._conn_props == OLD_PROPS
+
+
+class BrokenLayer(FakeLayer):
+    @property
+    def connectionProperties(self):
+        self.reads += 1
+        raise RuntimeError("Layer is broken")
+
+
+def test_change_map_data_sources_unreadable_layer(pro_only):
+    # a layer whose connection properties can't be read gets an error, the others are still changed
+    layers = [FakeLayer("A", OLD_PROPS), FakeLayer("B", OLD_PROPS), BrokenLayer("C", OLD_PROPS)]
+    map_frame = FakeMap(layers)
+
+    results = _mapping._mh._change_map_data_sources(map_frame, [(l, NEW_PROPS) for l in layers])
+
+    assert isinstance(results[2]["error"], DataSourceUpdateError)
+    assert results[2]["oldDataSource"] is None
+    assert layers[2].reads == 1
+    assert all(r["error"] is None for r in results[:2])
+    assert all(l._conn_props["connection_info"]["database"] == "C:\\Data\\New.gdb" for l in layers[:2])
+
+
+def test_change_map_data_sources_unsupported_layer(pro_only):
+    # a layer without connection properties doesn't stop the layers it shares the map with from being changed
+    layers = [FakeLayer("A", OLD_PROPS), FakeLayer("B", OLD_PROPS), FakeLayer("C", OLD_PROPS)]
+    layers[2].supports = lambda name: False
+    map_frame = FakeMap(layers)
+
+    results = _mapping._mh._change_map_data_sources(map_frame, [(layers[0], NEW_PROPS), (layers[1], NEW_PROPS),
+                                                                (layers[2], None)])
+
+    assert [r["method"] for r in results[:2]] == ["map", "map"]
+    assert layers[2].reads == 0
+
+
+def test_change_map_data_sources_map_failure(pro_only):
+    # when the map level change fails, each layer is changed from its current connection properties
+    layers = [FakeLayer("A", OLD_PROPS), FakeLayer("B", OLD_PROPS)]
+    map_frame = FakeMap(layers)
+
+    def update_connection_properties(current, new):
+        layers[0]._conn_props = _mapping._mh._merge_conn_props(layers[0]._conn_props, new)
+        raise RuntimeError("Map update failed")
+
+    map_frame.updateConnectionProperties = update_connection_properties
+
+    results = _mapping._mh._change_map_data_sources(map_frame, [(l, NEW_PROPS) for l in layers])
+
+    assert [r["method"] for r in results] == ["layer", "layer"]
+    assert all(r["error"] is None for r in results)
+    assert [l.reads for l in layers] == [2, 2]
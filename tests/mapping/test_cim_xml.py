@@ -0,0 +1,73 @@
+# coding=utf-8
+"""This module tests describing ArcGIS Pro projects from their CIM XML."""
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+# Standard libary imports
+import os.path
+
+# Third party imports
+import pytest
+
+# Local import
+import arcpyext
+
+SAMPLES_PATH = os.path.abspath("{0}/../samples/".format(os.path.dirname(__file__)))
+PROJ_A_PATH = os.path.join(SAMPLES_PATH, "test_mapping_complex.aprx")
+PROJ_B_PATH = os.path.join(SAMPLES_PATH, "test_mapping_complex_b.aprx")
+
+
+@pytest.fixture(scope="module")
+def proj_a_desc():
+    return arcpyext.mapping.describe_aprx(PROJ_A_PATH)
+
+
+def test_describe_aprx(proj_a_desc):
+    assert proj_a_desc["filePath"] == PROJ_A_PATH
+    assert len(proj_a_desc["maps"]) == 1
+    assert proj_a_desc["maps"][0]["name"] == "Layers"
+    assert proj_a_desc["maps"][0]["spatialReference"].startswith('GEOGCS["GCS_GDA_1994"')
+
+    layers = proj_a_desc["maps"][0]["layers"]
+    assert [(l["index"], l["serviceId"], l["longName"]) for l in layers] == [
+        (0, 1, "Layer 1"), (1, 2, "Layer 2"), (2, 33, "New Group Layer"), (3, 3, "New Group Layer\\Layer 3"),
+        (4, 4, "New Group Layer\\Unchanged")
+    ]
+
+    layer = layers[0]
+    assert layer["isFeatureLayer"] is True
+    assert layer["isGroupLayer"] is False
+    assert layer["isBroken"] is False
+    assert layer["definitionQuery"] == "FID <1"
+    assert layer["datasetName"] == "statesp020_clip1.shp"
+    assert layer["datasetType"] == "Shape File"
+    assert os.path.normcase(layer["database"]) == os.path.normcase(SAMPLES_PATH)
+    assert layer["fields"][0] == {"alias": "FID", "index": 0, "name": "FID", "type": None, "visible": True}
+
+    group_layer = layers[2]
+    assert group_layer["isGroupLayer"] is True
+    assert group_layer["fields"] == []
+    assert group_layer["dataSource"] is None
+
+    tables = proj_a_desc["maps"][0]["tables"]
+    assert len(tables) == 1
+    assert tables[0]["serviceId"] == 34
+    assert tables[0]["datasetType"] == "File Geodatabase"
+    assert tables[0]["isBroken"] is False
+
+
+def test_describe_aprx_compare(proj_a_desc):
+    result = arcpyext.mapping.compare(proj_a_desc, arcpyext.mapping.describe_aprx(PROJ_B_PATH))
+
+    assert len(result["diff"]) == 0
+    assert len(result["maps"][0]["diff"]) == 1
+    assert len(result["maps"][0]["layers"]["added"]) == 1
+    assert len(result["maps"][0]["layers"]["updated"]) == 2
+    assert len(result["maps"][0]["layers"]["removed"]) == 1
@@ -0,0 +1,220 @@
+# coding=utf-8
+"""This module tests comparing document descriptions, skipping unchanged maps and layers by their content hash."""
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+# Standard libary imports
+import copy
+import random
+
+# Third party imports
+import pytest
+
+# Local import
+import arcpyext
+from arcpyext.mapping import _mapping
+from arcpyext.mapping._compare_helpers import (dictionaries_eq_ignore_case, get_datasource_info,
+                                               get_fields_compare_info, is_superset)
+from arcpyext.mapping.compare_types import LayerChangeTypes
+
+
+def _create_layer(index, rng):
+    return {
+        "database": "C:\\Data\\A.gdb",
+        "dataSource": "C:\\Data\\A.gdb\\DS_{}".format(index),
+        "datasetName": "DS_{}".format(index),
+        "definitionQuery": None,
+        "fields": [{"alias": "Name", "index": 0, "name": "NAME", "type": "String", "visible": True}],
+        "index": index,
+        "isBroken": rng.random() < 0.05,
+        "longName": "Layer {}".format(index),
+        "name": "Layer {}".format(index),
+        "server": None,
+        "service": None,
+        "serviceId": None if rng.random() < 0.05 else index,
+        "visible": True
+    }
+
+
+def _create_description(map_count, layer_count, rng):
+    return _mapping._build_description("a.mxd", [
+        item for i in range(map_count) for item in [("map", {"name": "Map {}".format(i), "spatialReference": "SR"})] +
+        [("layer", _create_layer(l, rng)) for l in range(layer_count)]
+    ])
+
+
+def _change_description(description, rng):
+    """Copies a description, changing some of its layers, and updating its content hashes."""
+    description = copy.deepcopy(description)
+
+    for map_desc in description["maps"]:
+        if rng.random() < 0.5:
+            # leave half of the maps unchanged
+            continue
+
+        for layer in map_desc["layers"]:
+            roll = rng.random()
+            if roll < 0.05:
+                layer["name"] = "Renamed {}".format(layer["name"])
+            elif roll < 0.1:
+                layer["visible"] = False
+            elif roll < 0.15:
+                layer["fields"] = []
+            elif roll < 0.2:
+                layer["isBroken"] = True
+
+    return _mapping.update_content_hashes(description)
+
+
+def _summarise(result):
+    """Summarises the result of a comparison as plain values."""
+    return [(
+        [c.type.name for c in m["diff"]],
+        [l["index"] for l in m["layers"]["added"]],
+        sorted((l["index"], [c.type.name for c in l["diff"]]) for l in m["layers"]["updated"]),
+        [l["index"] for l in m["layers"]["removed"]],
+    ) for m in result["maps"]]
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_compare_parity(seed, monkeypatch):
+    rng = random.Random(seed)
+    was = _create_description(10, 50, rng)
+    now = _change_description(was, rng)
+
+    result = arcpyext.mapping.compare(was, now)
+    assert result["stats"]["maps"] == 10
+    assert result["stats"]["layers"] == 500
+    assert result["stats"]["layersUnchanged"] > 0
+
+    # compare again, never matching content hashes
+    monkeypatch.setattr(_mapping, "get_map_content_hash", lambda map_desc: object())
+    monkeypatch.setattr(_mapping, "get_layer_content_hash", lambda layer_desc: object())
+    full_result = arcpyext.mapping.compare(was, now)
+
+    assert full_result["stats"]["mapsUnchanged"] == 0
+    assert _summarise(result) == _summarise(full_result)
+
+
+def test_compare_unchanged_maps_skipped():
+    rng = random.Random(4)
+    was = _create_description(3, 20, rng)
+    for map_desc in was["maps"]:
+        for layer in map_desc["layers"]:
+            layer["isBroken"] = False
+            layer["serviceId"] = layer["index"]
+    _mapping.update_content_hashes(was)
+
+    now = copy.deepcopy(was)
+    now["maps"][0]["layers"][0]["name"] = "Renamed"
+    _mapping.update_content_hashes(now)
+
+    result = arcpyext.mapping.compare(was, now)
+
+    assert result["stats"] == {"maps": 3, "mapsUnchanged": 2, "layers": 60, "layersUnchanged": 59}
+    assert [l["name"] for l in result["maps"][0]["layers"]["updated"]] == ["Renamed"]
+
+
+def test_compare_computes_missing_content_hashes():
+    rng = random.Random(5)
+    was = _create_description(2, 20, rng)
+    now = _change_description(was, rng)
+    expected = _summarise(arcpyext.mapping.compare(was, now))
+
+    # descriptions without hashes (e.g. from describe_aprx) are hashed as they are compared
+    for description in (was, now):
+        for map_desc in description["maps"]:
+            del map_desc["contentHash"]
+            for layer in map_desc["layers"]:
+                del layer["contentHash"]
+
+    assert _summarise(arcpyext.mapping.compare(was, now)) == expected
+
+
+def _scan_layer_changes(was_layer, now_layer):
+    """The original datasource and field change tests, kept as the reference for parity testing."""
+    changes = []
+
+    if not dictionaries_eq_ignore_case(get_datasource_info(was_layer), get_datasource_info(now_layer)):
+        changes.append("LAYER_DATASOURCE_CHANGED")
+
+    was_fields = get_fields_compare_info(was_layer["fields"] or [])
+    now_fields = get_fields_compare_info(now_layer["fields"] or [])
+    if is_superset(now_fields, was_fields) and not is_superset(was_fields, now_fields):
+        changes.append("LAYER_FIELDS_ADDED")
+    if not is_superset(now_fields, was_fields):
+        changes.append("LAYER_FIELDS_REMOVED")
+
+    return changes
+
+
+def _create_fields_layer(field_count, rng):
+    layer = _create_layer(0, rng)
+    layer["isBroken"] = False
+    layer["serviceId"] = 0
+    layer["fields"] = [{
+        "alias": "Field {}".format(i),
+        "index": i,
+        "name": "FIELD_{}".format(i),
+        "type": rng.choice(["String", "Integer", "Double"]),
+        "visible": rng.random() < 0.9
+    } for i in range(field_count)]
+    return layer
+
+
+def _change_fields_layer(layer, rng):
+    layer = copy.deepcopy(layer)
+    roll = rng.random()
+    if roll < 0.2:
+        layer["fields"].append({"alias": "New", "index": 0, "name": "NEW", "type": "String", "visible": True})
+    elif roll < 0.4:
+        del layer["fields"][rng.randrange(len(layer["fields"]))]
+    elif roll < 0.5:
+        layer["fields"][rng.randrange(len(layer["fields"]))]["type"] = "Date"
+    elif roll < 0.6:
+        layer["fields"][rng.randrange(len(layer["fields"]))]["visible"] = False
+    elif roll < 0.7:
+        layer["fields"] = None
+    elif roll < 0.8:
+        layer["database"] = layer["database"].upper()
+    elif roll < 0.9:
+        layer["datasetName"] = "Other"
+    return layer
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_layer_change_keys_parity(seed):
+    rng = random.Random(seed)
+
+    for _ in range(200):
+        was = _create_fields_layer(rng.randint(1, 20), rng)
+        now = _change_fields_layer(was, rng)
+
+        changes = LayerChangeTypes.compare(was, now)
+        names = [c.type.name for c in changes if c.type.name in ("LAYER_DATASOURCE_CHANGED", "LAYER_FIELDS_ADDED",
+                                                                 "LAYER_FIELDS_REMOVED")]
+        assert names == _scan_layer_changes(was, now)
+
+        # reported values are the original (not normalized) values
+        for change in changes:
+            assert change.was == change.type.value.get_value(was)
+            assert change.now == change.type.value.get_value(now)
+
+
+def test_layer_change_keys_many_fields():
+    rng = random.Random(42)
+    was = _create_fields_layer(1000, rng)
+    now = copy.deepcopy(was)
+    del now["fields"][500]
+    now["fields"].append({"alias": "New", "index": 0, "name": "NEW", "type": "String", "visible": True})
+
+    changes = LayerChangeTypes.compare(was, now)
+
+    assert [c.type.name for c in changes if c.type.name.startswith("LAYER_FIELDS_")] == _scan_layer_changes(was, now)
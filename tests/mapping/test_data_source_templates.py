@@ -0,0 +1,130 @@
+# coding=utf-8
+"""This module tests the matching of layers against data source templates."""
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+from future.utils import iteritems
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+# Standard libary imports
+import random
+import timeit
+
+# Third party imports
+import pytest
+
+# Local import
+import arcpyext
+from arcpyext.mapping._compare_helpers import lowercase_dict
+from arcpyext.mapping._data_source_templates import DataSourceTemplateIndex, freeze
+from ..helpers import benchmark
+
+
+def _scan_match(templates, layer_or_table):
+    """The original linear template matching, kept as the reference for parity testing."""
+    template_sets = [
+        dict(list(iteritems(template)) + [("matchCriteria", set(iteritems(lowercase_dict(template["matchCriteria"]))))])
+        for template in templates
+    ]
+
+    for template in template_sets:
+        if template["matchCriteria"].issubset(set(freeze(layer_or_table))):
+            return templates[template_sets.index(template)]
+
+    return None
+
+
+def _create_layers(count, rng):
+    return [{
+        "database": rng.choice(["C:\\Data\\A.gdb", "c:\\data\\a.GDB", "C:\\Data\\B.gdb"]),
+        "datasetName": "DS_{}".format(rng.randint(0, 50)),
+        "fields": [{"name": "OBJECTID", "visible": True}, {"name": "Name_{}".format(rng.randint(0, 3)), "visible": True}],
+        "index": i,
+        "name": "Layer {}".format(i),
+        "serviceId": rng.choice([None, rng.randint(0, 50)]),
+        "userName": rng.choice(["GIS", "gis", "Editor", None])
+    } for i in range(count)]
+
+
+def _create_templates(count, rng):
+    criteria_choices = [
+        lambda: {"datasetName": "ds_{}".format(rng.randint(0, 50))},
+        lambda: {"datasetName": "DS_{}".format(rng.randint(0, 50)), "database": "c:\\data\\a.gdb"},
+        lambda: {"userName": rng.choice(["GIS", "Editor"])},
+        lambda: {"serviceId": rng.randint(0, 50)},
+        lambda: {"missingKey": "value"}
+    ]
+
+    return [{
+        "dataSource": {"workspacePath": "C:\\Data\\New_{}.gdb".format(i)},
+        "matchCriteria": rng.choice(criteria_choices)()
+    } for i in range(count)]
+
+
+@pytest.mark.parametrize(("seed", "template_count"), [(1, 1), (2, 10), (3, 100), (4, 300)])
+def test_template_index_parity(seed, template_count):
+    rng = random.Random(seed)
+    layers = _create_layers(500, rng)
+    templates = _create_templates(template_count, rng)
+    template_index = DataSourceTemplateIndex(templates)
+
+    for layer in layers:
+        assert template_index.match(layer) is _scan_match(templates, layer)
+
+
+def test_template_index_first_match_wins():
+    templates = [{
+        "dataSource": {"workspacePath": "first"},
+        "matchCriteria": {"datasetName": "DS", "userName": "GIS"}
+    }, {
+        "dataSource": {"workspacePath": "second"},
+        "matchCriteria": {"datasetName": "ds"}
+    }, {
+        "dataSource": {"workspacePath": "all"},
+        "matchCriteria": {}
+    }]
+    template_index = DataSourceTemplateIndex(templates)
+
+    assert template_index.match({"datasetName": "ds", "userName": "gis"}) is templates[0]
+    assert template_index.match({"datasetName": "Ds", "userName": "Other"}) is templates[1]
+    assert template_index.match({"datasetName": "Other"}) is templates[2]
+    assert DataSourceTemplateIndex(list(reversed(templates))).match({"datasetName": "ds"}) is templates[2]
+
+
+def test_create_replacement_data_sources_list_from_description():
+    description = {
+        "filePath": "a.mxd",
+        "maps": [{
+            "layers": [{"datasetName": "DS_1", "dataSource": "C:\\Data\\A.gdb\\DS_1"}, {"isGroupLayer": True}],
+            "tables": [{"datasetName": "Other", "dataSource": "C:\\Data\\A.gdb\\Other"}]
+        }]
+    }
+    templates = [{"dataSource": {"workspacePath": "C:\\Data\\B.gdb"}, "matchCriteria": {"datasetName": "ds_1"}}]
+
+    assert arcpyext.mapping.create_replacement_data_sources_list(description, templates) == [{
+        "layers": [{"workspacePath": "C:\\Data\\B.gdb"}, None],
+        "tables": [None]
+    }]
+
+
+@benchmark
+def test_template_index_benchmark():
+    rng = random.Random(42)
+    layers = _create_layers(3000, rng)
+    templates = _create_templates(300, rng)
+
+    def indexed():
+        template_index = DataSourceTemplateIndex(templates)
+        return [template_index.match(l) for l in layers]
+
+    def scan():
+        return [_scan_match(templates, l) for l in layers]
+
+    indexed_time = min(timeit.repeat(indexed, number=1, repeat=3))
+    scan_time = min(timeit.repeat(scan, number=1, repeat=3))
+    print("3,000 layers, 300 templates: indexed {:.4f}s, linear {:.4f}s".format(indexed_time, scan_time))
@@ -0,0 +1,155 @@
+# coding=utf-8
+"""This module tests the description cache of the mapping module."""
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+# Standard libary imports
+import io
+import json
+
+# Third party imports
+import pytest
+
+# Local import
+import arcpyext
+from arcpyext.mapping import _mapping
+
+
+@pytest.fixture
+def describe_calls(monkeypatch):
+    calls = []
+
+    def iter_describe_map(file_path):
+        calls.append(file_path)
+        yield ("map", {"name": "Layers", "spatialReference": None})
+
+    monkeypatch.setattr(_mapping._mh, "_iter_describe_map", iter_describe_map)
+    return calls
+
+
+@pytest.fixture
+def cache(tmpdir):
+    cache = arcpyext.mapping.enable_description_cache(str(tmpdir.join("cache.sqlite")))
+    yield cache
+    arcpyext.mapping.disable_description_cache()
+
+
+def _write_document(path, content):
+    with io.open(path, "wb") as fp:
+        fp.write(content)
+    return path
+
+
+def test_describe_uses_cache(tmpdir, cache, describe_calls):
+    doc_path = _write_document(str(tmpdir.join("a.mxd")), b"version 1")
+
+    first = arcpyext.mapping.describe(doc_path)
+    second = arcpyext.mapping.describe(doc_path)
+
+    assert first == second
+    assert len(describe_calls) == 1
+
+    # bypassing the cache always describes the document
+    arcpyext.mapping.describe(doc_path, use_cache=False)
+    assert len(describe_calls) == 2
+
+
+def test_describe_cache_shared_between_instances(tmpdir, cache, describe_calls):
+    doc_path = _write_document(str(tmpdir.join("a.mxd")), b"version 1")
+    arcpyext.mapping.describe(doc_path)
+
+    # a new cache on the same database (e.g. in another process) sees the description
+    other_cache = _mapping.DescriptionCache(cache.db_path)
+    assert other_cache.get(other_cache.fingerprint(doc_path)) is not None
+
+
+def test_describe_cache_invalidated_on_change(tmpdir, cache, describe_calls):
+    doc_path = _write_document(str(tmpdir.join("a.mxd")), b"version 1")
+    arcpyext.mapping.describe(doc_path)
+
+    _write_document(doc_path, b"version 2, longer")
+    arcpyext.mapping.describe(doc_path)
+    assert len(describe_calls) == 2
+
+    # only the latest version of a document is kept
+    assert cache.get(cache.fingerprint(doc_path)) is not None
+
+
+def test_iter_describe_uses_cache(tmpdir, cache, describe_calls):
+    doc_path = _write_document(str(tmpdir.join("a.mxd")), b"version 1")
+
+    # a partially iterated document isn't cached
+    next(arcpyext.mapping.iter_describe(doc_path))
+    assert cache.get(cache.fingerprint(doc_path)) is None
+
+    items = list(arcpyext.mapping.iter_describe(doc_path))
+    assert list(arcpyext.mapping.iter_describe(doc_path)) == items
+    assert len(describe_calls) == 2
+
+    maps = arcpyext.mapping.describe(doc_path)["maps"]
+    assert [{k: v for (k, v) in m.items() if k != "contentHash"} for m in maps] == [{
+        "name": "Layers",
+        "spatialReference": None,
+        "layers": [],
+        "tables": []
+    }]
+    assert len(describe_calls) == 2
+
+
+def test_describe_cache_rehashes_cached_description(tmpdir, cache, describe_calls):
+    doc_path = _write_document(str(tmpdir.join("a.mxd")), b"version 1")
+    expected = arcpyext.mapping.describe(doc_path)
+
+    # a cached description with stale hashes has them recomputed when it is loaded
+    fingerprint = cache.fingerprint(doc_path)
+    stale = json.loads(json.dumps(expected))
+    stale["maps"][0]["contentHash"] = "stale"
+    cache.put(fingerprint, stale)
+
+    assert arcpyext.mapping.describe(doc_path) == expected
+    assert len(describe_calls) == 1
+
+
+def test_describe_cache_evicts_least_recently_used(tmpdir, describe_calls):
+    description = {"filePath": "x" * 100, "maps": []}
+
+    # room for two descriptions
+    cache = _mapping.DescriptionCache(str(tmpdir.join("cache.sqlite")), max_size=len(json.dumps(description)) * 2)
+
+    paths = [_write_document(str(tmpdir.join("{}.mxd".format(i))), b"doc") for i in range(3)]
+    fingerprints = [cache.fingerprint(p) for p in paths]
+
+    cache.put(fingerprints[0], description)
+    cache.put(fingerprints[1], description)
+    # touch the first description, making the second the least recently used
+    assert cache.get(fingerprints[0]) is not None
+    cache.put(fingerprints[2], description)
+
+    assert cache.get(fingerprints[0]) is not None
+    assert cache.get(fingerprints[1]) is None
+    assert cache.get(fingerprints[2]) is not None
+
+
+def test_describe_cache_unserializable_description(tmpdir, cache, monkeypatch):
+    def iter_describe_map(file_path):
+        yield ("map", {"name": "Layers", "spatialReference": object()})
+
+    monkeypatch.setattr(_mapping._mh, "_iter_describe_map", iter_describe_map)
+    doc_path = _write_document(str(tmpdir.join("a.mxd")), b"version 1")
+
+    # the description is still returned, it just isn't cached
+    assert arcpyext.mapping.describe(doc_path)["maps"][0]["name"] == "Layers"
+    assert cache.get(cache.fingerprint(doc_path)) is None
+
+
+def test_describe_cache_missing_document(tmpdir):
+    cache = _mapping.DescriptionCache(str(tmpdir.join("cache.sqlite")))
+    assert cache.fingerprint(str(tmpdir.join("missing.mxd"))) is None
+    assert cache.get(None) is None
@@ -0,0 +1,64 @@
+# coding=utf-8
+"""This module tests the incremental description of map documents/projects."""
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+# Third party imports
+import pytest
+
+# Local import
+import arcpyext
+from arcpyext.mapping import _mapping
+
+ITEMS = [
+    ("map", {"name": "Layers", "spatialReference": "SR"}),
+    ("layer", {"index": 0, "name": "Layer 1", "longName": "Layer 1", "isBroken": False, "dataSource": "a"}),
+    ("layer", {"index": 1, "name": "Layer 2", "longName": "Layer 2", "isBroken": True, "dataSource": "b"}),
+    ("table", {"index": 0, "name": "Table 1", "isBroken": False, "dataSource": "c"}),
+    ("map", {"name": "Other", "spatialReference": "SR"}),
+    ("layer", {"index": 0, "name": "Layer 3", "longName": "Layer 3", "isBroken": False, "dataSource": "d"})
+]
+
+
+@pytest.fixture
+def consumed(monkeypatch):
+    consumed = []
+
+    def iter_describe_map(file_path):
+        for item in ITEMS:
+            consumed.append(item)
+            yield item
+
+    monkeypatch.setattr(_mapping._mh, "_iter_describe_map", iter_describe_map)
+    return consumed
+
+
+def test_describe_built_from_items(consumed):
+    description = arcpyext.mapping.describe("a.mxd", use_cache=False)
+
+    assert description["filePath"] == "a.mxd"
+    assert [m["name"] for m in description["maps"]] == ["Layers", "Other"]
+    assert [l["name"] for l in description["maps"][0]["layers"]] == ["Layer 1", "Layer 2"]
+    assert [t["name"] for t in description["maps"][0]["tables"]] == ["Table 1"]
+    assert description["maps"][1]["tables"] == []
+
+    # iterating a description gives back the same items
+    assert list(_mapping._iter_description(description)) == ITEMS
+
+
+def test_is_valid_stops_at_first_broken_item(consumed):
+    assert arcpyext.mapping.is_valid("a.mxd") is False
+    assert len(consumed) == 3
+
+    description = _mapping._build_description("a.mxd", ITEMS)
+    assert arcpyext.mapping.is_valid(description) is False
+
+    description["maps"][0]["layers"][1]["isBroken"] = False
+    assert arcpyext.mapping.is_valid(description) is True
@@ -0,0 +1,158 @@
+# coding=utf-8
+"""This module tests the layer matching used when comparing map documents/projects."""
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+# Standard libary imports
+import random
+import timeit
+
+# Third party imports
+import pytest
+
+# Local import
+from arcpyext.mapping._compare_helpers import dictionaries_eq_ignore_case, get_datasource_info
+from arcpyext.mapping._mapping import _match_layers
+from ..helpers import benchmark
+
+
+def _scan_match_layers(was_layers, now_layers):
+    """The original pair-wise implementation of _match_layers, kept as the reference for parity testing."""
+
+    added = []
+    matched = []
+    removed = []
+    resolved_was = {}
+    resolved_now = {}
+    is_resolved_was = lambda x: x['index'] in resolved_was
+    is_resolved_now = lambda x: x['index'] in resolved_now
+    attr_eq = lambda a, b, k: b[k] == a[k] if k in a and k in b else False
+    same_id = lambda a, b: attr_eq(a, b, 'serviceId')
+    same_name = lambda a, b: attr_eq(a, b, 'name')
+    same_datasource = lambda a, b: dictionaries_eq_ignore_case(get_datasource_info(a), get_datasource_info(b))
+    unresolved = lambda a, b: not is_resolved_was(a) and not is_resolved_now(b)
+
+    tests = [
+        lambda a, b: same_id(a, b) and same_name(a, b) and same_datasource(a, b),
+        lambda a, b: same_id(a, b) and same_name(a, b) and unresolved(a, b),
+        lambda a, b: same_id(a, b) and same_datasource(a, b) and unresolved(a, b),
+        lambda a, b: same_id(a, b) and unresolved(a, b),
+        lambda a, b: same_name(a, b) and same_datasource(a, b) and unresolved(a, b),
+        lambda a, b: same_name(a, b) and unresolved(a, b)
+    ]
+
+    for now_layer in now_layers:
+        found = False
+
+        for was_layer in was_layers:
+            found = any(test(was_layer, now_layer) for test in tests)
+            if found:
+                resolved_was[was_layer['index']] = now_layer
+                resolved_now[now_layer['index']] = was_layer
+                break
+
+        if found is False:
+            resolved_now[now_layer['index']] = None
+            added.append(now_layer)
+
+    for was_layer in was_layers:
+        if not is_resolved_was(was_layer):
+            resolved_was[was_layer['index']] = None
+            removed.append(was_layer)
+
+    for was_layer in was_layers:
+        resolved_layer = resolved_was[was_layer["index"]]
+        if resolved_layer:
+            matched.append((was_layer, resolved_layer))
+
+    return (added, matched, removed)
+
+
+def _create_layers(count, rng, name_pool=None):
+    name_pool = name_pool or count
+    return [{
+        "database": rng.choice(["C:\\Data\\A.gdb", "c:\\data\\a.GDB", "C:\\Data\\B.gdb"]),
+        "datasetName": "DS_{}".format(rng.randint(0, name_pool)),
+        "index": i,
+        "name": "Layer {}".format(rng.randint(0, name_pool)),
+        "server": None,
+        "service": None,
+        "serviceId": rng.choice([None, rng.randint(0, name_pool)]),
+        "workspacePath": None
+    } for i in range(count)]
+
+
+def _mutate_layers(layers, rng):
+    """Creates a 'now' version of some 'was' layers, with layers added, removed, re-ordered, renamed, re-numbered and
+    re-sourced."""
+
+    now_layers = []
+    for layer in layers:
+        roll = rng.random()
+        if roll < 0.05:
+            # removed
+            continue
+
+        layer = layer.copy()
+        if roll < 0.15:
+            layer["name"] = "Renamed {}".format(layer["name"])
+        elif roll < 0.25:
+            layer["serviceId"] = rng.randint(0, len(layers))
+        elif roll < 0.35:
+            layer["datasetName"] = layer["datasetName"].upper()
+        elif roll < 0.4:
+            layer["database"] = "C:\\Data\\Other.gdb"
+        now_layers.append(layer)
+
+    now_layers.extend(_create_layers(len(layers) // 10, rng))
+    rng.shuffle(now_layers)
+
+    for i, layer in enumerate(now_layers):
+        layer["index"] = i
+
+    return now_layers
+
+
+def _as_indexes(result):
+    added, matched, removed = result
+    return ([l["index"] for l in added], [(w["index"], n["index"]) for w, n in matched], [l["index"] for l in removed])
+
+
+@pytest.mark.parametrize(("seed", "layer_count", "name_pool"), [(1, 50, None), (2, 200, None), (3, 200, 20),
+                                                               (4, 300, 5), (5, 0, None), (6, 1000, None)])
+def test_match_layers_parity(seed, layer_count, name_pool):
+    rng = random.Random(seed)
+    was_layers = _create_layers(layer_count, rng, name_pool)
+    now_layers = _mutate_layers(was_layers, rng)
+
+    assert _as_indexes(_match_layers(was_layers, now_layers)) == _as_indexes(_scan_match_layers(was_layers, now_layers))
+
+
+def test_match_layers_parity_duplicates():
+    # duplicate layers may be matched more than once by the first test, the last match wins
+    layer = {"index": 0, "name": "Layer", "serviceId": 1, "datasetName": "DS"}
+    was_layers = [dict(layer, index=0), dict(layer, index=1)]
+    now_layers = [dict(layer, index=0), dict(layer, index=1), dict(layer, index=2, serviceId=2)]
+
+    assert _as_indexes(_match_layers(was_layers, now_layers)) == _as_indexes(_scan_match_layers(was_layers, now_layers))
+
+
+@benchmark
+def test_match_layers_benchmark():
+    rng = random.Random(42)
+    was_layers = _create_layers(10000, rng)
+    now_layers = _mutate_layers(was_layers, rng)
+
+    indexed_time = min(timeit.repeat(lambda: _match_layers(was_layers, now_layers), number=1, repeat=3))
+    # the pair-wise implementation is only run on a tenth of the new layers (against all of the old layers), to keep
+    # the benchmark to a reasonable time
+    sample = len(now_layers) // 10
+    scan_time = timeit.timeit(lambda: _scan_match_layers(was_layers, now_layers[:sample]), number=1) * 10
+    print("10,000 layers: indexed {:.4f}s, pair-wise (estimated) {:.4f}s".format(indexed_time, scan_time))
@@ -0,0 +1,132 @@
+# coding=utf-8
+"""This module tests planning data source changes from document descriptions."""
+
+# Python 2/3 compatibility
+# pylint: disable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+from future.builtins.disabled import *
+from future.builtins import *
+from future.standard_library import install_aliases
+install_aliases()
+# pylint: enable=wildcard-import,unused-wildcard-import,wrong-import-order,wrong-import-position
+
+# Third party imports
+import pytest
+
+# Local import
+import arcpyext
+from arcpyext.exceptions import ChangeDataSourcesError
+from arcpyext.mapping import _mapping
+
+LAYER_DESC = {
+    "dataSource": "C:\\Data\\Connection.sde\\GIS.Boundaries\\GIS.States",
+    "database": "Production",
+    "datasetName": "GIS.States",
+    "datasetType": "SDE",
+    "index": 0,
+    "isGroupLayer": False,
+    "longName": "Group\\States",
+    "name": "States",
+    "server": "dbserver",
+    "service": "sde:sqlserver:dbserver",
+    "userName": "GIS"
+}
+
+GROUP_LAYER_DESC = {"dataSource": None, "index": 1, "isGroupLayer": True, "longName": "Group", "name": "Group"}
+
+TABLE_DESC = {
+    "dataSource": "C:\\Data\\Tables.gdb\\Lookup",
+    "database": "C:\\Data\\Tables.gdb",
+    "datasetName": "Lookup",
+    "datasetType": "File Geodatabase",
+    "index": 0,
+    "name": "Lookup",
+    "server": None,
+    "service": None,
+    "userName": None
+}
+
+
+def _description(layers, tables):
+    return {"filePath": "a.mxd", "maps": [{"name": "Layers", "layers": layers, "tables": tables}]}
+
+
+@pytest.mark.skipif(not _mapping.ARCPY_2, reason="Map document data sources are only planned on ArcMap")
+def test_plan_data_source_changes_map_document():
+    description = _description([LAYER_DESC, GROUP_LAYER_DESC], [TABLE_DESC])
+    data_sources = [{
+        "layers": [{
+            "workspacePath": "C:\\Data\\States.gdb",
+            "workspaceType": "FILEGDB_WORKSPACE"
+        }, {
+            "workspacePath": "C:\\Data\\States.gdb"
+        }],
+        "tables": [None]
+    }]
+
+    plan = arcpyext.mapping.plan_data_source_changes(description, data_sources)
+
+    # the schema is removed for file geodatabases
+    assert plan[0]["status"] == "change"
+    assert plan[0]["name"] == "Group\\States"
+    assert plan[0]["planned"] == {
+        "workspacePath": "C:\\Data\\States.gdb",
+        "datasetName": "States",
+        "workspaceType": "FILEGDB_WORKSPACE"
+    }
+    assert plan[1]["status"] == "invalid"
+    assert plan[2]["status"] == "skip"
+
+
+@pytest.mark.skipif(_mapping.ARCPY_2, reason="Connection properties are only planned on ArcGIS Pro")
+def test_plan_data_source_changes_project():
+    description = _description([LAYER_DESC, GROUP_LAYER_DESC], [TABLE_DESC])
+    data_sources = [{
+        "layers": [{
+            "connection_info": {
+                "database": "Staging"
+            }
+        }, {
+            "dataset": "Group"
+        }],
+        "tables": [{
+            "dataset": "Lookup_v2",
+            "connection_info": {
+                "authentication_mode": "OSA"
+            }
+        }]
+    }]
+
+    plan = arcpyext.mapping.plan_data_source_changes(description, data_sources)
+
+    assert plan[0]["status"] == "change"
+    assert plan[0]["planned"] == {
+        "dataset": "GIS.States",
+        "workspace_factory": "SDE",
+        "connection_info": {
+            "database": "Staging",
+            "server": "dbserver",
+            "instance": "sde:sqlserver:dbserver",
+            "user": "GIS"
+        }
+    }
+    assert plan[1]["status"] == "invalid"
+    assert plan[2]["status"] == "change"
+    assert plan[2]["planned"] == {
+        "dataset": "Lookup_v2",
+        "workspace_factory": "File Geodatabase",
+        "connection_info": {
+            "database": "C:\\Data\\Tables.gdb",
+            "authentication_mode": "OSA"
+        }
+    }
+
+
+def test_plan_data_source_changes_mismatched():
+    description = _description([LAYER_DESC], [])
+
+    with pytest.raises(ChangeDataSourcesError):
+        arcpyext.mapping.plan_data_source_changes(description, [{"layers": [], "tables": []}])
+
+    with pytest.raises(ChangeDataSourcesError):
+        arcpyext.mapping.plan_data_source_changes(description, [])
@@ -0,0 +1,114 @@
+import copy
+import io
+import json
+import os
+
+import arcpy
+import pytest
+
+import arcpyext
+
+output_dir = os.path.normpath("{0}/output".format(os.path.dirname(__file__)))
+
+@pytest.fixture(scope="module")
+def in_json():
+    return os.path.normpath("{0}/input/input.json".format(os.path.dirname(__file__)))
+
+@pytest.fixture(scope="module")
+def old_schema(in_json):
+    with io.open(in_json, encoding="utf-8") as f:
+        return json.load(f)
+
+def _element(schema, name):
+    return next(x for x in schema["schema"] if x["name"] == name)
+
+@pytest.fixture(scope="module")
+def new_schema(old_schema):
+    schema = copy.deepcopy(old_schema)
+
+    permit = _element(schema, "LR_SRM_PERMIT")
+    new_field = dict(permit["fields"][-1], name="NEW_FIELD", aliasName="New field", type="String", length=20,
+                     nullable=True, required=False, domain="")
+    permit["fields"] = [f for f in permit["fields"] if f["name"] != "SRN_SEGMENTS"] + [new_field]
+    next(f for f in permit["fields"] if f["name"] == "LGA")["aliasName"] = "Local government area"
+
+    _element(schema, "LR_SRM_TIME_OF_DAY")["values"].append({"k": "NT", "v": "Night"})
+
+    schema["schema"] = [x for x in schema["schema"] if x["name"] != "LR_SRM_R_PERMIT_STOCKSCHEDULE"]
+    return schema
+
+def test_diff_unchanged(in_json):
+    differences = arcpyext.schematransform.diff(in_json, in_json)
+    assert all(not changes for kind in differences.values() for changes in kind.values())
+
+def test_diff(old_schema, new_schema):
+    differences = arcpyext.schematransform.diff(old_schema, new_schema)
+
+    assert [a["name"] for a in differences["domains"]["altered"]] == ["LR_SRM_TIME_OF_DAY"]
+    assert [x["name"] for x in differences["relationships"]["removed"]] == ["LR_SRM_R_PERMIT_STOCKSCHEDULE"]
+
+    datasets = differences["datasets"]
+    assert not datasets["added"] and not datasets["removed"]
+    assert [a["name"] for a in datasets["altered"]] == ["LR_SRM_PERMIT"]
+
+    fields = datasets["altered"][0]["fields"]
+    assert [f["name"] for f in fields["added"]] == ["NEW_FIELD"]
+    assert [f["name"] for f in fields["removed"]] == ["SRN_SEGMENTS"]
+    assert [f["name"] for f in fields["altered"]] == ["LGA"]
+
+    # differences can be saved
+    json.dumps(differences)
+
+def test_diff_geometry_type_not_applied(old_schema):
+    schema = copy.deepcopy(old_schema)
+    _element(schema, "LR_SRM_WA")["geometryType"] = "Point"
+
+    differences = arcpyext.schematransform.diff(old_schema, schema)
+    assert differences["datasets"]["altered"][0]["new"] == {"geometryType": "Point"}
+
+    with pytest.raises(ValueError):
+        arcpyext.schematransform.apply_diff(os.path.dirname(__file__), differences)
+
+def _field_diff(old_schema, **changes):
+    schema = copy.deepcopy(old_schema)
+    next(f for f in _element(schema, "LR_SRM_PERMIT")["fields"] if f["name"] == "LGA").update(changes)
+    return arcpyext.schematransform.diff(old_schema, schema)
+
+def test_diff_field_precision_not_applied(old_schema):
+    differences = _field_diff(old_schema, precision=10)
+
+    with pytest.raises(ValueError):
+        arcpyext.schematransform.apply_diff(os.path.dirname(__file__), differences)
+
+def test_diff_field_type_not_applied_with_rows(old_schema, monkeypatch):
+    class Result(object):
+        def getOutput(self, index):
+            return "1"
+
+    deleted = []
+    monkeypatch.setattr(arcpy, "GetCount_management", lambda in_table: Result())
+    monkeypatch.setattr(arcpy, "Delete_management", lambda in_data: deleted.append(in_data))
+    differences = _field_diff(old_schema, type="Double")
+    differences["relationships"]["removed"] = [{"name": "LR_SRM_R_PERMIT_STOCKSCHEDULE"}]
+
+    # nothing is changed before the field is found to be unalterable
+    with pytest.raises(ValueError):
+        arcpyext.schematransform.apply_diff(os.path.dirname(__file__), differences)
+    assert not deleted
+
+def test_apply_diff(in_json, old_schema, new_schema):
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    gdb = os.path.join(output_dir, "diff.gdb")
+    arcpyext.schematransform.to_gdb(in_json, gdb)
+
+    operations = arcpyext.schematransform.apply_diff(gdb, arcpyext.schematransform.diff(old_schema, new_schema))
+    assert len(operations) == 5
+
+    fields = dict((f.name, f) for f in arcpy.ListFields(os.path.join(gdb, "LR_SRM_PERMIT")))
+    assert "NEW_FIELD" in fields and "SRN_SEGMENTS" not in fields
+    assert fields["LGA"].aliasName == "Local government area"
+    assert not arcpy.Exists(os.path.join(gdb, "LR_SRM_R_PERMIT_STOCKSCHEDULE"))
+
+    domain = next(d for d in arcpy.da.ListDomains(gdb) if d.name == "LR_SRM_TIME_OF_DAY")
+    assert domain.codedValues["NT"] == "Night"
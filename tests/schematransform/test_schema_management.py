@@ -1,5 +1,7 @@
+import json
 import os
 import shutil
+from xml.etree import ElementTree
 
 import arcpy
 import pytest
@@ -36,17 +38,82 @@ def out_gdb():
 def out_xml():
     return os.path.normpath("{0}/output/output.xml".format(os.path.dirname(__file__)))
 
+@pytest.fixture(scope="module")
+def baseline_gdb(in_json):
+    """A geodatabase built directly on disk by a single process, for comparing other builds with."""
+    gdb = os.path.normpath("{0}/output/baseline.gdb".format(os.path.dirname(__file__)))
+    arcpyext.schematransform.to_gdb(in_json, gdb)
+    return gdb
+
 # @pytest.mark.parametrize(("in_filter"), [
 #     "*"
 # ])
 def test_to_json(in_gdb, out_json):
     arcpyext.schematransform.to_json(in_gdb, out_json)
-    assert(1==1)
+
+    with open(out_json) as f:
+        schema = json.load(f)
+    feature_classes = [x for x in schema["schema"] if x["type"] == "FeatureClass"]
+    assert all(0 <= x["srId"] < len(schema["spatialReferences"]) for x in feature_classes)
+    assert len(set(schema["spatialReferences"])) == len(schema["spatialReferences"])
+
+def test_to_json_parallel(in_gdb, out_json):
+    baseline_json = out_json.replace("output.json", "baseline.json")
+    arcpyext.schematransform.to_json(in_gdb, baseline_json)
+    parallel_json = out_json.replace("output.json", "output_parallel.json")
+    arcpyext.schematransform.to_json(in_gdb, parallel_json, workers=2)
+
+    with open(baseline_json) as f, open(parallel_json) as f_parallel:
+        assert json.load(f) == json.load(f_parallel)
 
 def test_to_gdb(in_json, out_gdb):
-    arcpyext.schematransform.to_gdb(in_json, out_gdb)
-    assert(1==1)
+    timings = arcpyext.schematransform.to_gdb(in_json, out_gdb)
+    assert list(timings.keys()) == [
+        "Parse JSON", "Create GDB", "Domains", "Tables", "Global IDs", "Indexes", "Relationships", "duration"
+    ]
+    assert arcpy.Exists(os.path.join(out_gdb, "LR_SRM_PERMIT"))
+
+def test_to_gdb_staged(in_json, out_gdb, baseline_gdb):
+    staged_gdb = out_gdb.replace("output.gdb", "output_staged.gdb")
+    timings = arcpyext.schematransform.to_gdb(in_json, staged_gdb, staging_workspace="in_memory")
+    assert "Bind domains" in timings
+
+    # building directly on disk and staging in memory give the same fields
+    def fields(gdb):
+        return [(f.name, f.type, f.domain) for f in arcpy.ListFields(os.path.join(gdb, "LR_SRM_PERMIT"))]
+    assert fields(staged_gdb) == fields(baseline_gdb)
+
+def test_plan_gdb(in_json):
+    plan = arcpyext.schematransform.plan_gdb(in_json)
+    levels = dict((n["id"], n["level"]) for n in plan)
+
+    # every operation follows the operations it depends on
+    assert all(levels[d] < n["level"] for n in plan for d in n["dependsOn"])
+    assert set(n["level"] for n in plan if n["phase"] == "Domains") == {0}
+    assert all(n["dependsOn"] for n in plan if n["phase"] == "Relationships")
+
+def test_to_gdb_dry_run(in_json, out_gdb):
+    dry_run_gdb = out_gdb.replace("output.gdb", "output_dry_run.gdb")
+    plan = arcpyext.schematransform.to_gdb(in_json, dry_run_gdb, dry_run=True)
+    assert "Relationships/LR_SRM_R_PERMIT_TRAVEL" in [n["id"] for n in plan]
+    assert "Relationships/LR_SRM_R_PERMIT_TRAVEL" in arcpyext.schematransform.format_plan(plan)
+    assert not arcpy.Exists(dry_run_gdb)
+
+def test_to_gdb_parallel(in_json, out_gdb, baseline_gdb):
+    parallel_gdb = out_gdb.replace("output.gdb", "output_parallel.gdb")
+    arcpyext.schematransform.to_gdb(in_json, parallel_gdb, workers=2)
+
+    def fields(gdb):
+        return sorted((f.name, f.type, f.domain) for f in arcpy.ListFields(os.path.join(gdb, "LR_SRM_PERMIT")))
+    assert fields(parallel_gdb) == fields(baseline_gdb)
 
 def test_to_xml(in_json, out_xml):
     arcpyext.schematransform.to_xml(in_json, out_xml)
-    assert(1==1)    
+
+    root = ElementTree.parse(out_xml).getroot()
+    xsi_type = "{http://www.w3.org/2001/XMLSchema-instance}type"
+    data_elements = [(e.find("Name").text, e.get(xsi_type)) for e in root.iter("DataElement")]
+    assert ("LR_SRM_WA", "esri:DEFeatureClass") in data_elements
+    assert ("LR_SRM_PERMIT", "esri:DETable") in data_elements
+    assert ("LR_SRM_R_PERMIT_TRAVEL", "esri:DERelationshipClass") in data_elements
+    assert len(list(root.iter("Index"))) > 0    